@@ -29,14 +29,20 @@ celery_app.conf.update(
 
 celery_app.autodiscover_tasks(['app.tasks'])
 
-try:
-    from app.tasks.update_prices import update_all_prices
-    from app.tasks.portfolio_history_task import save_portfolio_history_snapshot
-    from app.tasks.portfolio_history_task import save_daily_global_snapshot
-    from app.tasks.update_symbol_sectors import update_symbol_sectors
-except ImportError as e:
-    import logging
-    logging.warning(f"Could not import tasks: {e}")
+# Task modules are imported by the worker at boot (loader.import_default_modules) – an ImportError there
+# aborts startup instead of leaving a worker with no registered tasks. Importing them from here instead
+# would re-enter a task module that is itself importing celery_app (partially initialized)
+TASK_MODULES = (
+    "app.tasks.update_prices",
+    "app.tasks.portfolio_history_task",
+    "app.tasks.update_symbol_sectors",
+    "app.tasks.refresh_symbol_info",
+    "app.tasks.history_rollup_task",
+    "app.tasks.history_partition_task",
+    "app.tasks.update_price_warehouse",
+    "app.tasks.backfill_history",
+)
+celery_app.conf.imports = TASK_MODULES
 
 celery_app.conf.beat_schedule = {
     "update-stock-prices-every-1-min": {
@@ -51,9 +57,21 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.portfolio_history_task.save_daily_global_snapshot",
         "schedule": crontab(hour=16, minute=30, day_of_week='mon-fri'),
     },
-    "update-symbol-sectors-twice-daily": {
-        "task": "app.tasks.update_symbol_sectors.update_symbol_sectors",
-        "schedule": crontab(hour='9,21', minute=0),  # 9 AM and 9 PM daily
-        # No day_of_week restriction – sector data can update any day (safe & simple)
+    "update-price-warehouse-daily": {
+        "task": "app.tasks.update_price_warehouse.update_price_warehouse",
+        "schedule": crontab(hour=17, minute=15, day_of_week='mon-fri'),  # After the close – one bulk daily download
+    },
+    "rollup-history-hourly": {
+        "task": "app.tasks.history_rollup_task.rollup_history",
+        "schedule": crontab(minute=10),  # Hourly, after the top-of-hour snapshot lands
+    },
+    "maintain-history-partitions-daily": {
+        "task": "app.tasks.history_partition_task.maintain_history_partitions",
+        "schedule": crontab(hour=2, minute=30),  # Daily – keeps future monthly partitions ahead of inserts
+    },
+    "refresh-symbol-info-hourly": {
+        "task": "app.tasks.refresh_symbol_info.refresh_symbol_info",
+        "schedule": crontab(minute=0),  # Hourly – only fields past their TTL (profile / sectors / dividends) are fetched
+        # No day_of_week restriction – metadata can update any day (safe & simple)
     },
 }
\ No newline at end of file
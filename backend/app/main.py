@@ -1,7 +1,6 @@
 # backend/app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import redis
 from dotenv import load_dotenv
 from pathlib import Path
 import os
@@ -18,11 +17,8 @@ logging.basicConfig(
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-REDIS_URL = os.getenv("REDIS_URL")
-if not REDIS_URL:
-    raise ValueError("REDIS_URL not found in .env file")
-
-r = redis.Redis.from_url(REDIS_URL)
+# Shared connection lives in app.redis_client (utils import it from there); re-exported for older imports
+from app.redis_client import r
 
 app = FastAPI()
 
@@ -33,12 +29,18 @@ from app.routers.portfolios import router as portfolios_router
 from app.routers.budget import router as budget_router
 from app.routers.transactions import router as transactions_router
 from app.routers.accounts import router as accounts_router
+from app.routers.exports import router as exports_router
+from app.routers.risk import router as risk_router
+from app.utils.response_cache import get_cache_stats
+from app.utils.fx import get_fx_matrix
 
 app.include_router(holdings_router)
 app.include_router(portfolios_router)
 app.include_router(budget_router)
 app.include_router(transactions_router)
 app.include_router(accounts_router)
+app.include_router(exports_router)
+app.include_router(risk_router)
 app.include_router(debug_router, prefix="/debug")
 
 # Existing CORS middleware (kept unchanged)
@@ -48,6 +50,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Export-Watermark"],  # history pagination cursor / export watermark
 )
 
 # Existing endpoints (kept unchanged)
@@ -62,15 +65,17 @@ def get_price(ticker: str):
         return {"ticker": ticker, "price": float(cached), "source": "cache"}
     return {"ticker": ticker, "price": "fallback_value", "source": "db/fmp"}
 
-# Current FX rate endpoint (for frontend currency toggle)
+# Shared on-disk provider response cache (Yahoo .info etc.) – hit/miss/eviction counters
+@app.get("/cache/stats")
+def get_response_cache_stats():
+    return get_cache_stats()
+
+# Current FX rates (for frontend currency toggle) – usdcad_rate kept for existing clients
 @app.get("/fx/current")
 def get_current_fx_rate():
-    rate_str = r.get("fx:USDCAD")
-    if rate_str:
-        rate = float(rate_str.decode("utf-8"))
-    else:
-        rate = 1.37  # Realistic fallback
+    fx = get_fx_matrix()
     return {
-        "usdcad_rate": rate,  # 1 USD = rate CAD
+        "usdcad_rate": fx.rate("USD", "CAD"),  # 1 USD = rate CAD
+        **fx.to_dict(),  # matrix[i][j] = units of currencies[j] per 1 currencies[i]
         "timestamp": datetime.utcnow().isoformat()
     }
\ No newline at end of file
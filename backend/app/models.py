@@ -8,7 +8,11 @@ from sqlalchemy import (
     Enum, 
     Table, 
     Boolean, 
-    DateTime
+    DateTime,
+    Date,
+    Index,
+    UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -23,6 +27,9 @@ class HoldingType(enum.Enum):
 class Currency(enum.Enum):
     CAD = "CAD"
     USD = "USD"
+    GBP = "GBP"
+    EUR = "EUR"
+    AUD = "AUD"
 
 class User(Base):
     __tablename__ = "users"
@@ -44,6 +51,8 @@ class Portfolio(Base):
     user = relationship("User", back_populates="portfolios")
     holdings = relationship("Holding", back_populates="portfolio")
     history = relationship("PortfolioHistory", back_populates="portfolio")
+    cash_flows = relationship("PortfolioCashFlow", back_populates="portfolio", passive_deletes=True)
+    target_allocations = relationship("TargetAllocation", back_populates="portfolio", passive_deletes=True)
 
 class Holding(Base):
     __tablename__ = "holdings"
@@ -89,9 +98,10 @@ class UnderlyingHolding(Base):
 # NEW: Per-portfolio history snapshots
 class PortfolioHistory(Base):
     __tablename__ = "portfolio_history"
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned by month on timestamp (see history_partition_task) – the partition key must be in the PK
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     portfolio_id = Column(Integer, ForeignKey("portfolios.id"))
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
     
     total_value = Column(Float)  # current market value
     daily_change = Column(Float)  # dollar change today
@@ -99,12 +109,67 @@ class PortfolioHistory(Base):
     all_time_gain = Column(Float)  # total gain since inception
     all_time_percent = Column(Float)  # % return since inception
 
+    # End-of-day rows (4:30 PM EOD task or history backfill) – kept past raw retention
+    is_eod = Column(Boolean, default=False, server_default="false")
+
     portfolio = relationship("Portfolio", back_populates="history")
 
+    # Range + keyset reads per portfolio (WHERE portfolio_id = ? AND timestamp > ? ORDER BY timestamp)
+    __table_args__ = (
+        Index("ix_portfolio_history_portfolio_timestamp", "portfolio_id", "timestamp"),
+        Index("ix_portfolio_history_eod", "portfolio_id", "timestamp", postgresql_where=text("is_eod")),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+# Newest PortfolioHistory values per portfolio, upserted in the same transaction as each snapshot
+# ("latest for all portfolios" becomes a primary-key scan instead of GROUP BY max(timestamp))
+class PortfolioLatestSnapshot(Base):
+    __tablename__ = "portfolio_latest_snapshots"
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+
+    total_value = Column(Float)
+    daily_change = Column(Float)
+    daily_percent = Column(Float)
+    all_time_gain = Column(Float)
+    all_time_percent = Column(Float)
+
+# External money moved into (amount > 0) or out of (amount < 0) a portfolio – used for XIRR / TWR
+class PortfolioCashFlow(Base):
+    __tablename__ = "portfolio_cash_flows"
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    currency = Column(Enum(Currency), nullable=False, server_default=Currency.CAD.value)
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    portfolio = relationship("Portfolio", back_populates="cash_flows")
+
+    __table_args__ = (
+        Index("ix_portfolio_cash_flows_portfolio_date", "portfolio_id", "date"),
+    )
+
+# Target weights a portfolio is rebalanced against – all rows of one portfolio share the same kind
+class TargetAllocation(Base):
+    __tablename__ = "target_allocations"
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)  # 'symbol' or 'sector'
+    key = Column(String, nullable=False)  # symbol or sector name
+    weight_percent = Column(Float, nullable=False)  # of total portfolio value incl. cash
+
+    portfolio = relationship("Portfolio", back_populates="target_allocations")
+
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "kind", "key", name="uq_target_allocations_portfolio_kind_key"),
+    )
+
 class GlobalHistory(Base):
     __tablename__ = "global_history"
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
     
     total_value = Column(Float)
     daily_change = Column(Float)
@@ -115,6 +180,51 @@ class GlobalHistory(Base):
     # Flag to mark true end-of-day snapshots (for clean daily graphs)
     is_eod = Column(Boolean, default=False, server_default="false")
 
+    # Daily chart reads only EOD rows – small partial index instead of scanning every snapshot
+    __table_args__ = (
+        Index("ix_global_history_eod_timestamp", "timestamp", postgresql_where=text("is_eod")),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+# Compacted history buckets (one row per hour / trading day, last snapshot in the bucket wins).
+# Filled by the rollup_history task; raw rows past retention are deleted once rolled up.
+class PortfolioHistoryRollup(Base):
+    __tablename__ = "portfolio_history_rollups"
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), primary_key=True)
+    resolution = Column(String, primary_key=True)  # 'hour' | 'day'
+    bucket_start = Column(DateTime, primary_key=True)  # UTC; 'day' buckets start at Toronto midnight
+    timestamp = Column(DateTime, nullable=False)  # timestamp of the snapshot kept for this bucket
+
+    total_value = Column(Float)
+    daily_change = Column(Float)
+    daily_percent = Column(Float)
+    all_time_gain = Column(Float)
+    all_time_percent = Column(Float)
+    samples = Column(Integer)  # raw snapshots compacted into this bucket
+
+    # Reads filter on the kept snapshot's timestamp, not bucket_start
+    __table_args__ = (
+        Index("ix_portfolio_history_rollups_lookup", "portfolio_id", "resolution", "timestamp"),
+    )
+
+class GlobalHistoryRollup(Base):
+    __tablename__ = "global_history_rollups"
+    resolution = Column(String, primary_key=True)  # 'hour' | 'day'
+    bucket_start = Column(DateTime, primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+
+    total_value = Column(Float)
+    daily_change = Column(Float)
+    daily_percent = Column(Float)
+    all_time_gain = Column(Float)
+    all_time_percent = Column(Float)
+    samples = Column(Integer)
+    is_eod = Column(Boolean, default=False, server_default="false")
+
+    __table_args__ = (
+        Index("ix_global_history_rollups_lookup", "resolution", "timestamp"),
+    )
+
 class SymbolSectorCache(Base):
     __tablename__ = "symbol_sector_cache"
 
@@ -125,6 +235,72 @@ class SymbolSectorCache(Base):
     class Config:
         from_attributes = True
 
+# Normalized (symbol, sector, weight) rows – source of truth for SQL sector aggregation.
+# SymbolSectorCache.weightings is still written for backward compatibility.
+class SymbolSectorWeight(Base):
+    __tablename__ = "symbol_sector_weights"
+
+    symbol = Column(String, primary_key=True)
+    sector = Column(String, primary_key=True)
+    weight = Column(Float, nullable=False)  # 0-1, sums to 1 per symbol
+
+    __table_args__ = (
+        # Covering index so the allocation join is an index-only scan
+        Index("ix_symbol_sector_weights_symbol_covering", "symbol", postgresql_include=["sector", "weight"]),
+        Index("ix_symbol_sector_weights_sector", "sector"),
+    )
+
+# Daily FX closes as units of `currency` per 1 USD (USD{CURRENCY}=X) – crosses are derived from two rows.
+# Filled by bulk download (utils.fx_history) and by the EOD snapshot, so past rates are never lost.
+# is_live marks snapshot rows (live matrix at EOD) – a later download replaces them with the official close.
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+
+    currency = Column(String(3), primary_key=True)
+    date = Column(Date, primary_key=True)
+    usd_rate = Column(Float, nullable=False)
+    is_live = Column(Boolean, nullable=False, default=False, server_default="false")
+
+# Per-symbol dividend history (ex-date, pay date, cash amount per share in the quote currency) used by the
+# dividend calendar. Only rewritten when Yahoo reports an ex-date newer than the last stored one.
+class DividendEvent(Base):
+    __tablename__ = "dividend_events"
+
+    symbol = Column(String, primary_key=True)
+    ex_date = Column(Date, primary_key=True)
+    pay_date = Column(Date, nullable=True)  # None when the provider has no payment date (Yahoo fallback)
+    amount = Column(Float, nullable=False)
+
+# Shared per-symbol metadata, filled only by the refresh_symbol_info pipeline.
+# Each field group has its own *_updated_at so it can be refreshed on its own TTL.
+class SymbolInfo(Base):
+    __tablename__ = "symbol_info"
+
+    symbol = Column(String, primary_key=True, index=True)
+
+    # Profile (FMP /profile → Yahoo .info fallback)
+    name = Column(String, nullable=True)
+    exchange = Column(String, nullable=True)
+    currency = Column(String(3), nullable=True)
+    profile_updated_at = Column(DateTime, nullable=True)
+
+    # Sector weights live in symbol_sector_weights
+    sectors_updated_at = Column(DateTime, nullable=True)
+
+    # Dividends (Yahoo .info: trailing preferred, forward fallback)
+    dividend_rate = Column(Float, nullable=True)  # annual per share, native currency
+    dividend_yield_percent = Column(Float, nullable=True)
+    ex_dividend_date = Column(Date, nullable=True)  # latest declared ex-date – triggers a dividend_events refresh
+    dividends_updated_at = Column(DateTime, nullable=True)
+
+    last_refreshed = Column(DateTime, nullable=True)
+
+    sector_weights = relationship(
+        "SymbolSectorWeight",
+        primaryjoin="SymbolInfo.symbol == foreign(SymbolSectorWeight.symbol)",
+        viewonly=True,
+    )
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -0,0 +1,14 @@
+# backend/app/redis_client.py (NEW – the shared Redis connection, importable without pulling in app.main)
+# - Utils and tasks import `r` from here; app.main re-exports it for older code
+from dotenv import load_dotenv
+from pathlib import Path
+import redis
+import os
+
+load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+REDIS_URL = os.getenv("REDIS_URL")
+if not REDIS_URL:
+    raise ValueError("REDIS_URL not found in .env file")
+
+r = redis.Redis.from_url(REDIS_URL)
@@ -4,17 +4,26 @@
 # - holding_id=h.id already correct
 # - Schema default = False is good backup, but explicit pass prevents any None
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import BudgetItem, Holding, Currency, Category, Transaction
+from app.models import BudgetItem, Holding, Category, Transaction, Portfolio
 from app.schemas import (
     BudgetItemCreate, BudgetItemResponse, BudgetSummaryResponse,
-    DividendBreakdownItem, ItemType,
-    CategoryCreate, CategoryResponse
+    DividendBreakdownItem, DividendCalendarResponse, ItemType,
+    CategoryCreate, CategoryResponse,
+    ProjectionResponse,
 )
-from app.main import r
-from typing import List
+from app.utils.risk import symbol_exposures, exposure_returns
+from app.utils.fx import get_fx_matrix, conversion_factors
+from app.utils.monte_carlo import METHODS, monthly_returns, project
+from app.utils.dividends import dividend_calendar
+from app.utils.drip import DRIP_MAX_YEARS, prepare_drip, simulate_batch
+from datetime import date, timedelta
+from typing import List, Optional
+import numpy as np
+import json
 
 router = APIRouter(prefix="/budget", tags=["budget"])
 
@@ -60,26 +69,25 @@ def delete_item(item_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"ok": True}
 
-@router.get("/summary", response_model=BudgetSummaryResponse)
-def get_summary(db: Session = Depends(get_db)):
-    holdings = db.query(Holding).all()
+def build_budget_summary(db: Session, holdings: Optional[List[Holding]] = None) -> BudgetSummaryResponse:
+    """Dividend income (CAD) + budget items → monthly surplus; shared by /summary and /projection"""
+    if holdings is None:
+        holdings = db.query(Holding).all()
     items = db.query(BudgetItem).filter(BudgetItem.user_id == USER_ID).all()
 
-    # Latest FX rate (1 USD → CAD)
-    rate_str = r.get("fx:USDCAD")
-    rate = float(rate_str.decode("utf-8") if rate_str else 1.37)
+    # Native → CAD per holding (stored holding currency, latest cached FX matrix)
+    factors = conversion_factors([h.symbol for h in holdings], currencies=[h.currency.value for h in holdings])
 
     # Dividend calculation
     dividend_monthly = 0.0
     dividend_annual = 0.0
     breakdown = []
 
-    for h in holdings:
+    for h, factor in zip(holdings, factors):
         if not h.dividend_annual_per_share:
             continue
         annual_native = h.dividend_annual_per_share * h.quantity
-        is_cad = h.currency == Currency.CAD
-        annual_cad = annual_native if is_cad else annual_native * rate
+        annual_cad = float(annual_native * factor)
         monthly_cad = annual_cad / 12
 
         dividend_annual += annual_cad
@@ -114,7 +122,132 @@ def get_summary(db: Session = Depends(get_db)):
         income_items=[i for i in items if i.item_type == "income"],
         expense_items=[i for i in items if i.item_type == "expense"],
     )
-    
+
+@router.get("/summary", response_model=BudgetSummaryResponse)
+def get_summary(db: Session = Depends(get_db)):
+    return build_budget_summary(db)
+
+@router.get("/dividend-calendar", response_model=DividendCalendarResponse)
+def get_dividend_calendar(
+    portfolio_id: Optional[int] = Query(None, description="One portfolio instead of all holdings"),
+    db: Session = Depends(get_db),
+):
+    """
+    Month-by-month dividend income (CAD) for the next 12 months per holding and portfolio, from each symbol's
+    cached payment history (frequency, ex / pay dates, latest regular amount).
+    """
+    query = db.query(Portfolio.id, Portfolio.name)
+    if portfolio_id is not None:
+        query = query.filter(Portfolio.id == portfolio_id)
+    portfolios = {pid: name for pid, name in query.order_by(Portfolio.display_order, Portfolio.id).all()}
+    if portfolio_id is not None and not portfolios:
+        raise HTTPException(404, "Portfolio not found")
+
+    holdings = db.query(Holding).filter(Holding.portfolio_id.in_(list(portfolios))).all() if portfolios else []
+    return dividend_calendar(db, holdings, portfolios, get_fx_matrix())
+
+@router.get("/drip")
+def get_drip_simulation(
+    years: int = Query(20, ge=1, le=DRIP_MAX_YEARS),
+    start: Optional[date] = Query(None, description="Backtest start (default: 5 years ago)"),
+    price_growth: Optional[float] = Query(None, gt=-100, description="% per year; default = each symbol's dividend growth"),
+    dividend_growth: Optional[float] = Query(None, gt=-100, description="% per year for every symbol instead of its history"),
+    portfolio_id: Optional[int] = Query(None, description="One portfolio instead of all"),
+    db: Session = Depends(get_db),
+):
+    """
+    DRIP backtest (dividends reinvested at historical closes) and a `years`-year projection of shares, income,
+    value and yield on cost per holding. Streamed as NDJSON: one "meta" line, one line per portfolio as its
+    batch finishes, then a "total" line.
+    """
+    query = db.query(Portfolio.id, Portfolio.name)
+    if portfolio_id is not None:
+        query = query.filter(Portfolio.id == portfolio_id)
+    portfolios = {pid: name for pid, name in query.order_by(Portfolio.display_order, Portfolio.id).all()}
+    if portfolio_id is not None and not portfolios:
+        raise HTTPException(404, "Portfolio not found")
+
+    holdings = db.query(Holding).filter(Holding.portfolio_id.in_(list(portfolios))).all() if portfolios else []
+    holdings = [h for h in holdings if (h.quantity or 0) > 0]
+    start = start or date.today() - timedelta(days=5 * 365)
+    # Every query and warehouse read happens here, before streaming starts
+    inputs = prepare_drip(
+        db, holdings, get_fx_matrix(), start,
+        dividend_growth=dividend_growth / 100 if dividend_growth is not None else None,
+    )
+    members = np.array([h.portfolio_id for h in holdings], dtype=np.int64)
+    pg = price_growth / 100 if price_growth is not None else None
+
+    def body():
+        yield json.dumps({"type": "meta", "years": years, "start": start.isoformat(), "portfolios": len(portfolios)}) + "\n"
+        income, value = np.zeros(years), np.zeros(years)
+        for pid, name in portfolios.items():
+            batch = simulate_batch(inputs, np.nonzero(members == pid)[0], years, pg)
+            income += batch["totals"]["income_cad"]
+            value += batch["totals"]["value_cad"]
+            yield json.dumps({"type": "portfolio", "portfolio_id": pid, "name": name, **batch}) + "\n"
+        yield json.dumps({
+            "type": "total",
+            "income_cad": np.round(income, 2).tolist(),
+            "value_cad": np.round(value, 2).tolist(),
+        }) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@router.get("/projection", response_model=ProjectionResponse)
+def get_projection(
+    years: int = Query(10, ge=1, le=40),
+    paths: int = Query(5000, ge=100, le=20000),
+    method: str = Query("bootstrap", pattern=f"^({'|'.join(METHODS)})$"),
+    portfolio_id: Optional[int] = Query(None, description="Project one portfolio instead of all holdings"),
+    monthly_contribution: Optional[float] = Query(None, description="Override the budget's net monthly surplus (excluding dividends)"),
+    seed: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Monte Carlo projection of portfolio value and dividend income with monthly contributions from the
+    budget surplus. Returns 5/25/50/75/95th percentile bands per month.
+    Returns are adjusted closes (total return, dividends reinvested), so the default contribution is the
+    surplus minus expected dividend income – otherwise dividends would be counted twice.
+    """
+    query = db.query(Holding)
+    if portfolio_id is not None:
+        query = query.filter(Holding.portfolio_id == portfolio_id)
+    holdings = query.all()
+
+    exposures = symbol_exposures(holdings, get_fx_matrix())
+    if not exposures:
+        raise HTTPException(404, "No priced holdings to project")
+
+    data = exposure_returns(exposures)
+    if not data["symbols"]:
+        raise HTTPException(400, "No price history for the held symbols yet")
+    weights = data["values"] / data["values"].sum()
+    history = monthly_returns(data["returns"] @ weights)
+    if len(history) < 12:
+        raise HTTPException(400, "At least 12 months of common price history are needed for a projection")
+
+    summary = build_budget_summary(db, holdings)
+    start_value = float(sum(entry["value"] for entry in exposures.values()))
+    if monthly_contribution is None:
+        contribution = summary.net_surplus_monthly - summary.expected_dividend_income_monthly_cad
+        contribution_basis = "surplus_excluding_dividends"
+    else:
+        contribution = monthly_contribution
+        contribution_basis = "override"
+    dividend_yield = summary.expected_dividend_income_annual_cad / start_value
+
+    result = project(
+        history, start_value, contribution, dividend_yield, years, paths, method, seed,
+        cache_params={
+            "symbols": data["symbols"],
+            "weights": [round(w, 6) for w in weights.tolist()],
+            "history_end": str(data["dates"][-1]),
+            "history_months": len(history),
+        },
+    )
+    return {**result, "contribution_basis": contribution_basis, "returns_basis": "total_return"}
+
 @router.get("/categories", response_model=List[CategoryResponse])
 def get_categories(db: Session = Depends(get_db)):
     return db.query(Category).filter(Category.user_id == USER_ID).all()
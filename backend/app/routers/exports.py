@@ -0,0 +1,62 @@
+# backend/app/routers/exports.py (NEW – streaming Parquet / Arrow export of history and stored price series)
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database import get_db, SessionLocal
+from app.utils.parquet_export import (
+    EXPORT_BATCH_ROWS, EXPORT_DATASETS, FORMATS,
+    get_export_dataset, export_watermark, stream_export,
+)
+from typing import Optional
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+@router.get("/")
+def list_exports():
+    return {"datasets": list(EXPORT_DATASETS), "formats": list(FORMATS)}
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: str = Query("parquet", pattern=f"^({'|'.join(FORMATS)})$"),
+    after: Optional[str] = Query(None, description="Watermark of the previous export – only newer rows are returned"),
+    batch_rows: int = Query(EXPORT_BATCH_ROWS, ge=1000, le=500000, description="Rows per row group / record batch"),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream rows newer than `after` as one Parquet (or Arrow IPC stream) file, row group by row group.
+    The X-Export-Watermark header holds the newest exported key (row id for history, ISO time for prices) –
+    pass it back as `after` next time.
+    """
+    try:
+        spec = get_export_dataset(dataset)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if after is not None:
+        try:
+            after = spec.parse_watermark(after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid watermark '{after}' for {dataset}")
+
+    upto = export_watermark(db, spec)
+    if upto is not None and after is not None and upto <= after:
+        upto = None  # Nothing new – still send a valid (empty) file with the schema
+
+    def body():
+        # Own session: the request-scoped one is not meant to outlive the handler
+        stream_db = SessionLocal()
+        try:
+            yield from stream_export(stream_db, spec, after, upto, format, batch_rows)
+        finally:
+            stream_db.close()
+
+    watermark = upto if upto is not None else after
+    headers = {"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    if watermark is not None:
+        headers["X-Export-Watermark"] = spec.format_watermark(watermark)
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format], headers=headers)
@@ -2,8 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
 from app.models import Holding, UnderlyingHolding, Portfolio, HoldingType, Currency  # NEW: import Currency
-from app.schemas import HoldingCreate, HoldingUpdate, HoldingResponse, UnderlyingDetail
+from app.schemas import HoldingCreate, HoldingUpdate, HoldingResponse, UnderlyingDetail, DayPoint
 from app.utils.yahoo import batch_fetch_prices, get_cached_price
+from app.utils.symbol_info import resolve_currency, currency_from_suffix
+from app.utils.downsample import downsample
+from app.utils.chart_cache import chart_cache_key, get_cached_chart, set_cached_chart
 from typing import List, Dict, Optional
 import logging
 from datetime import datetime, timedelta
@@ -14,9 +17,13 @@ router = APIRouter(prefix="/holdings", tags=["holdings"])
 
 STALE_THRESHOLD = timedelta(minutes=10)
 
-def detect_currency(symbol: str) -> Currency:
-    """Detect currency from symbol - .TO suffix = CAD, else USD"""
-    return Currency.CAD if symbol.upper().endswith('.TO') else Currency.USD
+def detect_currency(symbol: str, db: Optional[Session] = None) -> Currency:
+    """Currency from the SymbolInfo store when known, else the exchange suffix (see utils.fx)"""
+    try:
+        return Currency(resolve_currency(db, symbol))
+    except ValueError:
+        # Store knows a currency the Holding enum can't hold yet – keep the suffix rule
+        return Currency(currency_from_suffix(symbol))
 
 def update_holding_prices(db: Session, holdings: List[Holding], price_map: Dict[str, dict], now: datetime) -> int:
     updated = 0
@@ -88,7 +95,7 @@ def get_holdings(
 @router.post("/", response_model=HoldingResponse, status_code=status.HTTP_201_CREATED)
 def create_holding(holding_data: HoldingCreate, db: Session = Depends(get_db)):
     # Auto-detect currency
-    detected_currency = detect_currency(holding_data.symbol)
+    detected_currency = detect_currency(holding_data.symbol, db)
     
     new_holding = Holding(
         symbol=holding_data.symbol.upper(),
@@ -141,7 +148,7 @@ def update_holding(holding_id: int, holding_data: HoldingUpdate, db: Session = D
 
     # If symbol changes, re-detect currency
     if "symbol" in update_dict:
-        update_dict["currency"] = detect_currency(update_dict["symbol"])
+        update_dict["currency"] = detect_currency(update_dict["symbol"], db)
 
     for key, value in update_dict.items():
         if key not in ["underlyings", "portfolio_id"]:
@@ -233,6 +240,30 @@ def get_all_holdings(db: Session = Depends(get_db)):
 
     return holdings
 
+@router.get("/{holding_id}/day-chart", response_model=List[DayPoint])
+def get_holding_day_chart(
+    holding_id: int,
+    max_points: Optional[int] = Query(None, ge=3, description="LTTB-downsample the intraday series to at most this many points"),
+    db: Session = Depends(get_db),
+):
+    """Intraday (5-min) price series for one holding, optionally downsampled for small charts."""
+    holding = db.query(Holding).filter(Holding.id == holding_id).first()
+    if not holding:
+        raise HTTPException(status_code=404, detail="Holding not found")
+
+    points = holding.day_chart or []
+    if max_points is None or len(points) <= max_points:
+        return points
+
+    # day_chart is rewritten together with last_price_update – no explicit invalidation needed
+    version = holding.last_price_update.isoformat() if holding.last_price_update else "none"
+    key = chart_cache_key(f"day:{holding_id}", version, max_points=max_points, n=len(points))
+    cached = get_cached_chart(key)
+    if cached is None:
+        cached = {"rows": downsample(points, max_points, x=lambda p: p["time"], y=lambda p: p["price"])}
+        set_cached_chart(key, cached)
+    return cached["rows"]
+
 class DividendUpdate(BaseModel):
     dividend_annual_per_share: Optional[float] = None
     dividend_yield_percent: Optional[float] = None
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Response
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, not_, case, exists, select, union_all
 from app.database import get_db
 from app.models import (
     Portfolio, 
     Holding, 
     UnderlyingHolding, 
-    PortfolioHistory, 
+    PortfolioLatestSnapshot,
+    PortfolioCashFlow,
+    TargetAllocation,
     GlobalHistory,
-    SymbolSectorCache,
+    SymbolSectorWeight,
     HoldingType,
+    Currency,
 )
 from app.schemas import (
     PortfolioCreate,
@@ -21,17 +24,44 @@ from app.schemas import (
     ReorderRequest,          
     GlobalSectorResponse,     
     SectorItem,
+    PortfolioAnalyticsResponse,
+    CashFlowCreate,
+    CashFlowResponse,
+    PortfolioXirrResponse,
+    BenchmarkComparisonResponse,
+    TargetAllocationSet,
+    TargetAllocationResponse,
+    RebalanceResponse,
+    IntradayCurveResponse,
 )
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from pydantic import BaseModel
 from collections import defaultdict
-from app.main import r
+from app.utils.history import (
+    RAW, RESOLUTIONS, HISTORY_PAGE_LIMIT_MAX,
+    resolve_range, pick_resolution, parse_cursor, next_cursor,
+    query_global_history, query_portfolio_history,
+)
+from app.utils.downsample import downsample
+from app.utils.chart_cache import history_version, ledger_version, bump_ledger_version, chart_cache_key, get_cached_chart, set_cached_chart
+from app.utils.analytics import get_portfolio_analytics, invalidate_portfolio_analytics
+from app.utils.xirr import get_xirr, invalidate_xirr
+from app.utils.benchmarks import BENCHMARK_SYMBOLS, benchmark_comparison, warehouse_marker
+from app.utils.rebalance import SYMBOL, MODES, rebalance
+from app.utils.intraday import GLOBAL, refresh_intraday_curves
+from app.utils.fx import SUFFIX_PRICE_UNITS, FxMatrix, get_fx_matrix, conversion_factors
 
 class ReorderRequest(BaseModel):
     order: List[int]
 
 router = APIRouter(prefix="/portfolios", tags=["portfolios"])
 
+def _holding_factors(holdings) -> dict:
+    """{holding_id: native → CAD multiplier} from the cached FX matrix (stored holding currency)"""
+    factors = conversion_factors([h.symbol for h in holdings], currencies=[h.currency.value for h in holdings])
+    return dict(zip((h.id for h in holdings), factors.tolist()))
+
 @router.get("/", response_model=List[PortfolioResponse])
 def get_portfolios(db: Session = Depends(get_db)):
     return db.query(Portfolio)\
@@ -121,20 +151,8 @@ def reorder_portfolios(request: ReorderRequest, db: Session = Depends(get_db)):
 
 @router.get("/history/latest/all", response_model=List[PortfolioHistoryResponse])
 def get_latest_portfolio_histories(db: Session = Depends(get_db)):
-    subq = db.query(
-        PortfolioHistory.portfolio_id,
-        func.max(PortfolioHistory.timestamp).label('max_timestamp')
-    ).group_by(PortfolioHistory.portfolio_id).subquery()
-
-    latest = db.query(PortfolioHistory).join(
-        subq,
-        and_(
-            PortfolioHistory.portfolio_id == subq.c.portfolio_id,
-            PortfolioHistory.timestamp == subq.c.max_timestamp
-        )
-    ).all()
-
-    return latest
+    # Maintained by the snapshot task – one row per portfolio
+    return db.query(PortfolioLatestSnapshot).order_by(PortfolioLatestSnapshot.portfolio_id).all()
 
 @router.get("/global/history/latest", response_model=GlobalHistoryResponse)
 def get_latest_global_history(db: Session = Depends(get_db)):
@@ -146,29 +164,38 @@ def get_latest_global_history(db: Session = Depends(get_db)):
     return latest
 
 @router.get("/global/history/daily", response_model=List[GlobalHistoryResponse])
-def get_daily_global_history(db: Session = Depends(get_db)):
+def get_daily_global_history(
+    response: Response,
+    start: Optional[datetime] = Query(None, alias="from", description="Inclusive start (UTC)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Inclusive end (UTC)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=HISTORY_PAGE_LIMIT_MAX),
+    max_points: Optional[int] = Query(None, ge=3, le=HISTORY_PAGE_LIMIT_MAX, description="LTTB-downsample the series to at most this many points"),
+    db: Session = Depends(get_db),
+):
     """
-    Fetch all end-of-day (EOD) global snapshots in chronological order.
+    Fetch end-of-day (EOD) global snapshots in chronological order.
     Perfect for clean daily performance graphs (one data point per trading day).
     """
-    return (
-        db.query(GlobalHistory)
-        .filter(GlobalHistory.is_eod == True)
-        .order_by(GlobalHistory.timestamp.asc())
-        .all()
+    params = {"from": start, "to": end, "cursor": cursor, "limit": limit}
+    start, end, _ = _history_window(None, start, end, RAW, None)
+    position = _history_cursor(cursor, RAW)
+    return _chart_series(
+        response, "global:daily", GlobalHistoryResponse,
+        lambda: query_global_history(db, RAW, start=start, end=end, cursor=position, limit=limit, eod_only=True),
+        max_points, limit, params,
     )
 
 @router.get("/summary", response_model=List[PortfolioSummary])
 def get_portfolios_summary(db: Session = Depends(get_db)):
     """
     Returns enriched summary for every portfolio (total value in CAD, performance, pie data).
-    Uses cached USDCAD rate from Redis.
+    Uses the cached FX matrix from Redis.
     """
     portfolios = db.query(Portfolio).all()
     holdings = db.query(Holding).all()
 
-    rate_str = r.get("fx:USDCAD")
-    rate = float(rate_str.decode("utf-8") if rate_str else 1.37)
+    factors = _holding_factors(holdings)
 
     port_holdings = defaultdict(list)
     for h in holdings:
@@ -184,14 +211,14 @@ def get_portfolios_summary(db: Session = Depends(get_db)):
         pie_data = []
 
         for h in ph:
-            is_cad = h.symbol.upper().endswith('.TO')
+            factor = factors[h.id]
             native_market = h.market_value or (h.current_price or 0) * h.quantity
             native_daily = (h.daily_change or 0) * h.quantity
             native_gain = h.all_time_gain_loss or ((h.current_price or 0) - h.purchase_price) * h.quantity
 
-            contrib_market = native_market if is_cad else native_market * rate
-            contrib_daily = native_daily if is_cad else native_daily * rate
-            contrib_gain = native_gain if is_cad else native_gain * rate
+            contrib_market = native_market * factor
+            contrib_daily = native_daily * factor
+            contrib_gain = native_gain * factor
 
             total_value += contrib_market
             daily_change += contrib_daily
@@ -233,9 +260,8 @@ def get_portfolios_summaries(db: Session = Depends(get_db)):
     )
     holdings = db.query(Holding).all()
 
-    # Get current FX rate (1 USD → CAD)
-    rate_str = r.get("fx:USDCAD")
-    rate = float(rate_str.decode("utf-8") if rate_str else 1.37)
+    # Native → CAD multiplier per holding (latest cached FX matrix)
+    factors = _holding_factors(holdings)
 
     # Group holdings by portfolio
     port_holdings = defaultdict(list)
@@ -252,14 +278,14 @@ def get_portfolios_summaries(db: Session = Depends(get_db)):
         pie_data = []
 
         for h in ph:
-            is_cad = h.symbol.upper().endswith('.TO')
+            factor = factors[h.id]
             native_market = h.market_value or (h.current_price or 0) * h.quantity
             native_daily = (h.daily_change or 0) * h.quantity
             native_gain = h.all_time_gain_loss or ((h.current_price or 0) - h.purchase_price) * h.quantity
 
-            contrib_market = native_market if is_cad else native_market * rate
-            contrib_daily = native_daily if is_cad else native_daily * rate
-            contrib_gain = native_gain if is_cad else native_gain * rate
+            contrib_market = native_market * factor
+            contrib_daily = native_daily * factor
+            contrib_gain = native_gain * factor
 
             total_value += contrib_market
             daily_change += contrib_daily
@@ -292,54 +318,403 @@ def get_portfolios_summaries(db: Session = Depends(get_db)):
 
     return summaries
 
+HISTORY_RANGE_DESCRIPTION = "1D, 1W, 1M, 3M, YTD, 1Y, 2Y, 3Y or ALL – ignored when 'from' is given"
+RESOLUTION_PATTERN = f"^({'|'.join(RESOLUTIONS)})$"
+
+def _history_window(period, start, end, resolution, points):
+    """Validate range params → (start, end, resolution); resolution is auto-picked when not forced"""
+    now = datetime.utcnow()
+    try:
+        start, end = resolve_range(period, start, end, now)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return start, end, resolution or pick_resolution(start, end, now, points)
+
+def _history_cursor(cursor: Optional[str], resolution: str):
+    if cursor is None:
+        return None
+    try:
+        return parse_cursor(cursor, resolution)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor '{cursor}'")
+
+def _set_next_cursor(response: Response, cursor: Optional[str]):
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+
+def _chart_series(response: Response, series: str, schema, fetch, max_points: Optional[int], limit: Optional[int], params: dict):
+    """
+    Run `fetch` and return its rows – or, with max_points, the LTTB-downsampled rows (on total_value),
+    cached per (series, request params, max_points) until the next snapshot bumps the history version.
+    The pagination cursor always comes from the full page, before downsampling.
+    """
+    if max_points is None:
+        rows = fetch()
+        _set_next_cursor(response, next_cursor(rows, limit))
+        return rows
+
+    key = chart_cache_key(series, history_version(), max_points=max_points, **params)
+    cached = get_cached_chart(key)
+    if cached is None:
+        rows = fetch()
+        sampled = downsample(rows, max_points, x=lambda row: row.timestamp.timestamp(), y=lambda row: row.total_value)
+        cached = {
+            "rows": [schema.model_validate(row).model_dump(mode="json") for row in sampled],
+            "next_cursor": next_cursor(rows, limit),
+        }
+        set_cached_chart(key, cached)
+    _set_next_cursor(response, cached["next_cursor"])
+    return cached["rows"]
+
 @router.get("/global-history", response_model=List[GlobalHistoryResponse])
-def get_global_history(db: Session = Depends(get_db)):
+def get_global_history(
+    response: Response,
+    period: Optional[str] = Query(None, description=HISTORY_RANGE_DESCRIPTION),
+    start: Optional[datetime] = Query(None, alias="from", description="Inclusive start (UTC)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Inclusive end (UTC)"),
+    resolution: Optional[str] = Query(None, pattern=RESOLUTION_PATTERN, description="Force raw, hour or day instead of auto-picking"),
+    points: Optional[int] = Query(None, ge=2, description="Target point count – picks the finest resolution that fits"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=HISTORY_PAGE_LIMIT_MAX),
+    max_points: Optional[int] = Query(None, ge=3, le=HISTORY_PAGE_LIMIT_MAX, description="LTTB-downsample the series to at most this many points"),
+    db: Session = Depends(get_db),
+):
+    """Global snapshots, newest first. No range/resolution params → all raw records within retention."""
+    params = {"period": period, "from": start, "to": end, "resolution": resolution, "points": points, "cursor": cursor, "limit": limit}
+    if resolution is None and period is None and start is None and points is None:
+        resolution = RAW
+    start, end, resolution = _history_window(period, start, end, resolution, points)
+    position = _history_cursor(cursor, resolution)
+    return _chart_series(
+        response, "global", GlobalHistoryResponse,
+        lambda: query_global_history(db, resolution, start=start, end=end, descending=True, cursor=position, limit=limit),
+        max_points, limit, params,
+    )
+
+@router.get("/{portfolio_id}/history", response_model=List[PortfolioHistoryResponse])
+def get_portfolio_history(
+    portfolio_id: int,
+    response: Response,
+    period: str = Query("1M", description=HISTORY_RANGE_DESCRIPTION),
+    start: Optional[datetime] = Query(None, alias="from", description="Inclusive start (UTC)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Inclusive end (UTC)"),
+    resolution: Optional[str] = Query(None, pattern=RESOLUTION_PATTERN, description="Force raw, hour or day instead of auto-picking"),
+    points: Optional[int] = Query(None, ge=2, description="Target point count – picks the finest resolution that fits"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=HISTORY_PAGE_LIMIT_MAX),
+    max_points: Optional[int] = Query(None, ge=3, le=HISTORY_PAGE_LIMIT_MAX, description="LTTB-downsample the series to at most this many points"),
+    db: Session = Depends(get_db),
+):
+    """Snapshots for one portfolio, oldest first, at the resolution that fits the range."""
+    if not db.query(Portfolio.id).filter(Portfolio.id == portfolio_id).first():
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    params = {"period": period, "from": start, "to": end, "resolution": resolution, "points": points, "cursor": cursor, "limit": limit}
+    start, end, resolution = _history_window(period, start, end, resolution, points)
+    position = _history_cursor(cursor, resolution)
+    return _chart_series(
+        response, f"portfolio:{portfolio_id}", PortfolioHistoryResponse,
+        lambda: query_portfolio_history(db, portfolio_id, resolution, start=start, end=end, cursor=position, limit=limit),
+        max_points, limit, params,
+    )
+
+@router.get("/{portfolio_id}/analytics", response_model=PortfolioAnalyticsResponse)
+def get_portfolio_performance(portfolio_id: int, db: Session = Depends(get_db)):
+    """Since-inception TWR, volatility, drawdown, Sharpe/Sortino and rolling returns from EOD snapshots."""
+    if not db.query(Portfolio.id).filter(Portfolio.id == portfolio_id).first():
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    analytics = get_portfolio_analytics(db, portfolio_id)
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="No end-of-day history for this portfolio yet")
+    return analytics
+
+def _benchmark_response(db: Session, portfolio_id: Optional[int], period: str, benchmarks: Optional[str]):
+    symbols = [s.strip().upper() for s in benchmarks.split(",") if s.strip()] if benchmarks else BENCHMARK_SYMBOLS
+    unknown = [s for s in symbols if s not in BENCHMARK_SYMBOLS]
+    if unknown or not symbols:
+        raise HTTPException(status_code=400, detail=f"Benchmarks must be among: {', '.join(BENCHMARK_SYMBOLS)}")
+    start, _, _ = _history_window(period, None, None, None, None)
+
+    series = "global" if portfolio_id is None else f"portfolio:{portfolio_id}"
+    key = chart_cache_key(
+        f"benchmarks:{series}", history_version(),
+        period=period.upper(), benchmarks=",".join(symbols), prices=warehouse_marker(symbols), ledger=ledger_version(),
+    )
+    cached = get_cached_chart(key)
+    if cached is not None:
+        return cached
+
+    result = benchmark_comparison(db, portfolio_id, symbols, start)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Not enough end-of-day history in this range")
+    set_cached_chart(key, result)
+    return result
+
+@router.get("/global/benchmarks", response_model=BenchmarkComparisonResponse)
+def get_global_benchmarks(
+    period: str = Query("1Y", description=HISTORY_RANGE_DESCRIPTION),
+    benchmarks: Optional[str] = Query(None, description="Comma-separated subset of the configured benchmarks"),
+    db: Session = Depends(get_db),
+):
+    """Global EOD value vs benchmark indices: growth-of-100 series plus beta, alpha and tracking error."""
+    return _benchmark_response(db, None, period, benchmarks)
+
+@router.get("/{portfolio_id}/benchmarks", response_model=BenchmarkComparisonResponse)
+def get_portfolio_benchmarks(
+    portfolio_id: int,
+    period: str = Query("1Y", description=HISTORY_RANGE_DESCRIPTION),
+    benchmarks: Optional[str] = Query(None, description="Comma-separated subset of the configured benchmarks"),
+    db: Session = Depends(get_db),
+):
+    """One portfolio's EOD value vs benchmark indices (cash flows removed from its returns)."""
+    _get_portfolio_or_404(db, portfolio_id)
+    return _benchmark_response(db, portfolio_id, period, benchmarks)
+
+def _get_portfolio_or_404(db: Session, portfolio_id: int):
+    if not db.query(Portfolio.id).filter(Portfolio.id == portfolio_id).first():
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+@router.get("/{portfolio_id}/cash-flows", response_model=List[CashFlowResponse])
+def get_cash_flows(portfolio_id: int, db: Session = Depends(get_db)):
+    _get_portfolio_or_404(db, portfolio_id)
+    return db.query(PortfolioCashFlow)\
+             .filter(PortfolioCashFlow.portfolio_id == portfolio_id)\
+             .order_by(PortfolioCashFlow.date, PortfolioCashFlow.id)\
+             .all()
+
+@router.post("/{portfolio_id}/cash-flows", response_model=CashFlowResponse, status_code=status.HTTP_201_CREATED)
+def create_cash_flow(portfolio_id: int, flow_data: CashFlowCreate, db: Session = Depends(get_db)):
+    _get_portfolio_or_404(db, portfolio_id)
+    if flow_data.amount == 0:
+        raise HTTPException(status_code=400, detail="Cash flow amount must be non-zero")
+
+    flow = PortfolioCashFlow(
+        portfolio_id=portfolio_id,
+        date=flow_data.date,
+        amount=flow_data.amount,
+        currency=flow_data.currency.value,
+        note=flow_data.note,
+    )
+    db.add(flow)
+    db.commit()
+    db.refresh(flow)
+
+    invalidate_xirr(portfolio_id)
+    invalidate_portfolio_analytics(portfolio_id)
+    bump_ledger_version()
+    return flow
+
+@router.delete("/{portfolio_id}/cash-flows/{flow_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_cash_flow(portfolio_id: int, flow_id: int, db: Session = Depends(get_db)):
+    flow = db.query(PortfolioCashFlow)\
+             .filter(PortfolioCashFlow.id == flow_id, PortfolioCashFlow.portfolio_id == portfolio_id)\
+             .first()
+    if not flow:
+        raise HTTPException(status_code=404, detail="Cash flow not found")
+
+    db.delete(flow)
+    db.commit()
+
+    invalidate_xirr(portfolio_id)
+    invalidate_portfolio_analytics(portfolio_id)
+    bump_ledger_version()
+    return None
+
+@router.get("/xirr/all", response_model=List[PortfolioXirrResponse])
+def get_all_portfolio_xirr(db: Session = Depends(get_db)):
+    """Money-weighted return for every portfolio with EOD history (solved in one batch)."""
+    results = get_xirr(db)
+    return [results[pid] for pid in sorted(results)]
+
+@router.get("/{portfolio_id}/xirr", response_model=PortfolioXirrResponse)
+def get_portfolio_xirr(portfolio_id: int, db: Session = Depends(get_db)):
+    """Money-weighted return from the cash-flow ledger and the latest EOD value."""
+    _get_portfolio_or_404(db, portfolio_id)
+    results = get_xirr(db, [portfolio_id])
+    if portfolio_id not in results:
+        raise HTTPException(status_code=404, detail="No end-of-day history for this portfolio yet")
+    return results[portfolio_id]
+
+def _intraday_response(db: Session, portfolio_id: Optional[int], max_points: Optional[int]):
+    # Incremental: only points after the cached curve's last one are computed
+    holdings = db.query(Holding).all()
+    curves = refresh_intraday_curves(holdings, [] if portfolio_id is GLOBAL else [portfolio_id], get_fx_matrix())
+    curve = curves[portfolio_id]
+    points = curve["points"]
+    if max_points is not None and len(points) > max_points:
+        points = downsample(points, max_points, x=lambda p: p["time"], y=lambda p: p["value"])
+    return {
+        "portfolio_id": portfolio_id,
+        "previous_close": curve["previous_close"],
+        "points": points,
+        "updated_at": curve["updated_at"],
+    }
+
+@router.get("/global/intraday", response_model=IntradayCurveResponse)
+def get_global_intraday(
+    max_points: Optional[int] = Query(None, ge=3, description="LTTB-downsample the curve to at most this many points"),
+    db: Session = Depends(get_db),
+):
+    """Today's combined CAD value of every holding on a 5-min grid (forward-filled bars × quantity × FX)."""
+    return _intraday_response(db, GLOBAL, max_points)
+
+@router.get("/{portfolio_id}/intraday", response_model=IntradayCurveResponse)
+def get_portfolio_intraday(
+    portfolio_id: int,
+    max_points: Optional[int] = Query(None, ge=3, description="LTTB-downsample the curve to at most this many points"),
+    db: Session = Depends(get_db),
+):
+    """Today's CAD value of one portfolio on a 5-min grid, built from its holdings' day charts."""
+    _get_portfolio_or_404(db, portfolio_id)
+    return _intraday_response(db, portfolio_id, max_points)
+
+def _target_response(db: Session, portfolio_id: int):
+    targets = db.query(TargetAllocation)\
+                .filter(TargetAllocation.portfolio_id == portfolio_id)\
+                .order_by(TargetAllocation.weight_percent.desc(), TargetAllocation.key)\
+                .all()
+    return {
+        "portfolio_id": portfolio_id,
+        "kind": targets[0].kind if targets else None,
+        "targets": [{"key": t.key, "weight_percent": t.weight_percent} for t in targets],
+    }
+
+@router.get("/{portfolio_id}/targets", response_model=TargetAllocationResponse)
+def get_target_allocations(portfolio_id: int, db: Session = Depends(get_db)):
+    _get_portfolio_or_404(db, portfolio_id)
+    return _target_response(db, portfolio_id)
+
+@router.put("/{portfolio_id}/targets", response_model=TargetAllocationResponse)
+def set_target_allocations(portfolio_id: int, target_data: TargetAllocationSet, db: Session = Depends(get_db)):
+    """Replace the portfolio's targets (one kind per portfolio; weights are % of total value incl. cash)."""
+    _get_portfolio_or_404(db, portfolio_id)
+    kind = target_data.kind.value
+    weights = {}
+    for item in target_data.targets:
+        key = item.key.strip().upper() if kind == SYMBOL else item.key.strip()
+        if not key:
+            raise HTTPException(status_code=400, detail="Target key must not be empty")
+        if key in weights:
+            raise HTTPException(status_code=400, detail=f"Duplicate target '{key}'")
+        if not 0 <= item.weight_percent <= 100:
+            raise HTTPException(status_code=400, detail="Target weights must be between 0 and 100")
+        weights[key] = item.weight_percent
+    if sum(weights.values()) > 100 + 1e-6:
+        raise HTTPException(status_code=400, detail="Target weights must not add up to more than 100")
+
+    db.query(TargetAllocation).filter(TargetAllocation.portfolio_id == portfolio_id).delete(synchronize_session=False)
+    db.add_all([TargetAllocation(portfolio_id=portfolio_id, kind=kind, key=key, weight_percent=w) for key, w in weights.items()])
+    db.commit()
+    return _target_response(db, portfolio_id)
+
+def _rebalance_or_400(db: Session, portfolio_ids: List[int], band_percent: float, mode: str, cash=None):
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"Mode must be one of: {', '.join(MODES)}")
+    holdings = db.query(Holding).filter(Holding.portfolio_id.in_(portfolio_ids)).all()
+    targets = db.query(TargetAllocation).filter(TargetAllocation.portfolio_id.in_(portfolio_ids)).all()
+    return rebalance(db, portfolio_ids, holdings, targets, get_fx_matrix(), band_percent=band_percent, mode=mode, cash=cash)
+
+@router.get("/rebalance/all", response_model=List[RebalanceResponse])
+def get_all_rebalance_trades(
+    band_percent: float = Query(2.0, ge=0, le=100, description="Drift band in percentage points"),
+    mode: str = Query("target", description="'target' trades back to target, 'edge' only to the band edge"),
+    db: Session = Depends(get_db),
+):
+    """Rebalancing trades for every portfolio that has targets (computed in one pass)."""
+    portfolio_ids = [pid for (pid,) in db.query(TargetAllocation.portfolio_id).distinct().order_by(TargetAllocation.portfolio_id).all()]
+    return _rebalance_or_400(db, portfolio_ids, band_percent, mode)
+
+@router.get("/{portfolio_id}/rebalance", response_model=RebalanceResponse)
+def get_rebalance_trades(
+    portfolio_id: int,
+    band_percent: float = Query(2.0, ge=0, le=100, description="Drift band in percentage points"),
+    mode: str = Query("target", description="'target' trades back to target, 'edge' only to the band edge"),
+    cash_cad: float = Query(0.0, ge=0, description="CAD cash available to invest"),
+    cash_usd: float = Query(0.0, ge=0, description="USD cash available to invest"),
+    db: Session = Depends(get_db),
+):
+    """Whole-share trades that bring holdings outside the drift band back to their target weights."""
+    _get_portfolio_or_404(db, portfolio_id)
+    return _rebalance_or_400(db, [portfolio_id], band_percent, mode, {portfolio_id: {"CAD": cash_cad, "USD": cash_usd}})[0]
+
+def holding_value_cad(fx: FxMatrix):
+    """SQL expression for a holding's market value in CAD (mirrors the Python fallback, stored currency and minor units)."""
+    native_mv = func.coalesce(
+        func.nullif(Holding.market_value, 0),
+        func.coalesce(Holding.current_price, 0) * Holding.quantity,
+    )
+    symbol = func.upper(Holding.symbol)
+    rate = case(*[(Holding.currency == currency, fx.rate(currency.value)) for currency in Currency], else_=fx.rate("USD"))
+    unit = case(*[(symbol.like(f"%{suffix}"), unit) for suffix, unit in SUFFIX_PRICE_UNITS.items()], else_=1.0)
+    return native_mv * rate * unit
+
+def sector_exposure_query(fx: FxMatrix):
+    """
+    Look-through sector allocation as a single SQL statement:
+    holding market value (CAD) → manual ETF underlyings (if any) → symbol_sector_weights,
+    summed per sector. Symbols without sector rows fall into "Other".
+    """
+    holding_mv = select(
+        Holding.id,
+        Holding.symbol,
+        Holding.type,
+        holding_value_cad(fx).label("mv_cad"),
+    ).subquery("holding_mv")
+
+    # Same allocation rules as before: missing/zero allocations share equally, zero total → 100
+    per_holding = {"partition_by": UnderlyingHolding.holding_id}
+    underlying_frac = select(
+        UnderlyingHolding.holding_id,
+        UnderlyingHolding.symbol,
+        (
+            func.coalesce(
+                func.nullif(UnderlyingHolding.allocation_percent, 0),
+                100.0 / func.count().over(**per_holding),
+            )
+            / func.coalesce(
+                func.nullif(func.sum(func.coalesce(UnderlyingHolding.allocation_percent, 0)).over(**per_holding), 0),
+                100.0,
+            )
+        ).label("frac"),
+    ).subquery("underlying_frac")
+
+    has_underlyings = exists().where(UnderlyingHolding.holding_id == holding_mv.c.id)
+    direct = select(
+        holding_mv.c.symbol.label("symbol"),
+        holding_mv.c.mv_cad.label("value"),
+    ).where(
+        holding_mv.c.mv_cad > 0,
+        not_(and_(holding_mv.c.type == HoldingType.etf, has_underlyings)),
+    )
+    look_through = select(
+        underlying_frac.c.symbol.label("symbol"),
+        (holding_mv.c.mv_cad * underlying_frac.c.frac).label("value"),
+    ).join_from(
+        holding_mv, underlying_frac, underlying_frac.c.holding_id == holding_mv.c.id
+    ).where(
+        holding_mv.c.mv_cad > 0,
+        holding_mv.c.type == HoldingType.etf,
+    )
+    exposure = union_all(direct, look_through).subquery("exposure")
+
+    sector = func.coalesce(SymbolSectorWeight.sector, "Other").label("sector")
     return (
-        db.query(GlobalHistory)
-        .order_by(GlobalHistory.timestamp.desc())
-        .all()  # Removed limit – returns all records (intraday + EOD), sorted newest first
+        select(sector, func.sum(exposure.c.value * func.coalesce(SymbolSectorWeight.weight, 1.0)).label("value"))
+        .select_from(exposure)
+        .outerjoin(SymbolSectorWeight, SymbolSectorWeight.symbol == exposure.c.symbol)
+        .group_by(sector)
     )
 
 @router.get("/global-sector-allocation", response_model=GlobalSectorResponse)
 def get_global_sector_allocation(db: Session = Depends(get_db)):
-    holdings = db.query(Holding).options(joinedload(Holding.underlyings)).all()
+    fx = get_fx_matrix()
 
-    rate_str = r.get("fx:USDCAD")
-    rate = float(rate_str.decode("utf-8")) if rate_str else 1.37
+    total_value = db.query(func.coalesce(func.sum(holding_value_cad(fx)), 0.0)).scalar()
 
     sector_contrib = defaultdict(float)
-    total_value = 0.0
-
-    for h in holdings:
-        native_mv = h.market_value or (h.current_price or 0) * h.quantity
-        is_cad = h.symbol.upper().endswith('.TO')
-        mv_cad = native_mv if is_cad else native_mv * rate
-        total_value += mv_cad
-        if mv_cad <= 0:
-            continue
-
-        # Prefer manual underlyings for ETFs (more accurate than auto-fetched)
-        if h.type == HoldingType.etf and h.underlyings:
-            sum_alloc = sum(u.allocation_percent or 0 for u in h.underlyings)
-            if sum_alloc == 0:
-                sum_alloc = 100.0
-            for u in h.underlyings:
-                alloc = (u.allocation_percent or (100.0 / len(h.underlyings))) / sum_alloc
-                u_mv = mv_cad * alloc
-                cache = db.query(SymbolSectorCache).get(u.symbol)
-                if cache and cache.weightings:
-                    for item in cache.weightings:
-                        sector_contrib[item["sector"]] += u_mv * item["weight"]
-                else:
-                    sector_contrib["Other"] += u_mv
-        else:
-            # Use cached sector data for stocks / ETFs without manual underlyings
-            cache = db.query(SymbolSectorCache).get(h.symbol)
-            if cache and cache.weightings:
-                for item in cache.weightings:
-                    sector_contrib[item["sector"]] += mv_cad * item["weight"]
-            else:
-                sector_contrib["Other"] += mv_cad
+    for sector, value in db.execute(sector_exposure_query(fx)).all():
+        sector_contrib[sector] += value or 0.0
 
     # Consolidate small slices (<3%) into "Other"
     sector_data = []
@@ -375,11 +750,3 @@ def get_global_sector_allocation(db: Session = Depends(get_db)):
         sectorData=sector_data,
     )
 
-@router.get("/global-history", response_model=List[GlobalHistoryResponse])
-def get_global_history(db: Session = Depends(get_db)):
-    return (
-        db.query(GlobalHistory)
-        .order_by(GlobalHistory.timestamp.desc())
-        .all()
-    )
-
@@ -0,0 +1,65 @@
+# backend/app/routers/risk.py (NEW – VaR / CVaR, risk contributions and correlations per portfolio and globally)
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import Portfolio, Holding
+from app.schemas import RiskResponse, StressTestRequest, StressTestResponse
+from app.utils.risk import symbol_exposures, compute_risk
+from app.utils.stress import stress_test
+from app.utils.fx import get_fx_matrix
+
+router = APIRouter(prefix="/risk", tags=["risk"])
+
+STRESS_MAX_SCENARIOS = 200
+
+def _risk_or_404(holdings, confidence: float, horizon_days: int):
+    result = compute_risk(symbol_exposures(holdings, get_fx_matrix()), confidence, horizon_days)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No priced holdings")
+    return result
+
+@router.get("/portfolios/{portfolio_id}", response_model=RiskResponse)
+def get_portfolio_risk(
+    portfolio_id: int,
+    confidence: float = Query(0.95, gt=0.5, lt=1.0),
+    horizon_days: int = Query(1, ge=1, le=20),
+    db: Session = Depends(get_db),
+):
+    """Historical and parametric VaR/CVaR, per-symbol risk contribution and correlation for one portfolio."""
+    if not db.query(Portfolio.id).filter(Portfolio.id == portfolio_id).first():
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    holdings = db.query(Holding).filter(Holding.portfolio_id == portfolio_id).all()
+    return {"portfolio_id": portfolio_id, **_risk_or_404(holdings, confidence, horizon_days)}
+
+@router.get("/global", response_model=RiskResponse)
+def get_global_risk(
+    confidence: float = Query(0.95, gt=0.5, lt=1.0),
+    horizon_days: int = Query(1, ge=1, le=20),
+    db: Session = Depends(get_db),
+):
+    """Same measures over all portfolios combined (positions in the same symbol are summed)."""
+    return _risk_or_404(db.query(Holding).all(), confidence, horizon_days)
+
+@router.post("/stress", response_model=StressTestResponse)
+def run_stress_test(request: StressTestRequest, db: Session = Depends(get_db)):
+    """P&L of sector / symbol / FX shock scenarios on every portfolio, through ETF look-through (all scenarios in one pass)."""
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="At least one scenario is required")
+    if len(request.scenarios) > STRESS_MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {STRESS_MAX_SCENARIOS} scenarios per request")
+    for scenario in request.scenarios:
+        shocks = [*scenario.sector_shocks.values(), *scenario.symbol_shocks.values(), *scenario.fx_shocks.values()]
+        if any(s <= -100 for s in shocks):
+            raise HTTPException(status_code=400, detail=f"Scenario '{scenario.name}': shocks must be above -100%")
+
+    query = db.query(Portfolio.id, Portfolio.name)
+    if request.portfolio_ids is not None:
+        query = query.filter(Portfolio.id.in_(request.portfolio_ids))
+    portfolios = {pid: name for pid, name in query.order_by(Portfolio.display_order, Portfolio.id).all()}
+    if request.portfolio_ids is not None and len(portfolios) != len(set(request.portfolio_ids)):
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    holdings = db.query(Holding).filter(Holding.portfolio_id.in_(list(portfolios))).all() if portfolios else []
+    scenarios = [scenario.model_dump() for scenario in request.scenarios]
+    return stress_test(db, holdings, portfolios, scenarios, get_fx_matrix())
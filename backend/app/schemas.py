@@ -1,7 +1,7 @@
 from pydantic import BaseModel, computed_field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, date
 
 class HoldingType(str, Enum):
     stock = "stock"
@@ -10,6 +10,9 @@ class HoldingType(str, Enum):
 class Currency(str, Enum):
     CAD = "CAD"
     USD = "USD"
+    GBP = "GBP"
+    EUR = "EUR"
+    AUD = "AUD"
 
 class UnderlyingBase(BaseModel):
     symbol: str
@@ -119,6 +122,187 @@ class GlobalHistoryResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ReturnDay(BaseModel):
+    date: str
+    value: float
+
+class PortfolioAnalyticsResponse(BaseModel):
+    portfolio_id: int
+    start_date: Optional[str] = None
+    as_of: Optional[datetime] = None
+    days: int
+    total_return: Optional[float] = None
+    annualized_return: Optional[float] = None
+    volatility: Optional[float] = None
+    sharpe: Optional[float] = None
+    sortino: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    max_drawdown_peak: Optional[str] = None
+    max_drawdown_trough: Optional[str] = None
+    best_day: Optional[ReturnDay] = None
+    worst_day: Optional[ReturnDay] = None
+    rolling_returns: Dict[str, Optional[float]]
+    risk_free_rate: float
+
+class CashFlowCreate(BaseModel):
+    date: date
+    amount: float  # > 0 contribution into the portfolio, < 0 withdrawal
+    currency: Currency = Currency.CAD
+    note: Optional[str] = None
+
+class CashFlowResponse(CashFlowCreate):
+    id: int
+    portfolio_id: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class PortfolioXirrResponse(BaseModel):
+    portfolio_id: int
+    xirr: Optional[float] = None
+    as_of: datetime
+    start_date: str
+    final_value: float
+    net_contributions: float
+    flow_count: int
+
+class RiskMeasure(BaseModel):
+    var: float  # loss as a fraction of value
+    cvar: float
+    var_value: float  # CAD
+    cvar_value: float
+
+class RiskContribution(BaseModel):
+    symbol: str
+    weight: float
+    value: float
+    volatility_contribution: float
+    percent_of_risk: float
+
+class CorrelationMatrix(BaseModel):
+    symbols: List[str]
+    matrix: List[List[float]]
+
+class RiskResponse(BaseModel):
+    portfolio_id: Optional[int] = None
+    total_value: float
+    covered_value: float
+    confidence: float
+    horizon_days: int
+    observations: int
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    missing_symbols: List[str] = []
+    volatility: Optional[float] = None
+    historical: Optional[RiskMeasure] = None
+    parametric: Optional[RiskMeasure] = None
+    contributions: List[RiskContribution] = []
+    correlation: Optional[CorrelationMatrix] = None
+
+class StressScenario(BaseModel):
+    name: str
+    sector_shocks: Dict[str, float] = {}  # % price move, e.g. {"Technology": -20}
+    symbol_shocks: Dict[str, float] = {}  # overrides the sector shock for that symbol
+    fx_shocks: Dict[str, float] = {}  # quote currency vs CAD, e.g. {"USDCAD": 5, "GBPCAD": -3}
+
+class StressTestRequest(BaseModel):
+    scenarios: List[StressScenario]
+    portfolio_ids: Optional[List[int]] = None  # default: all portfolios
+
+class StressPortfolioImpact(BaseModel):
+    portfolio_id: int
+    name: str
+    value: float  # CAD
+    pnl: float
+    pnl_percent: float
+
+class StressScenarioResult(BaseModel):
+    name: str
+    total_value: float
+    pnl: float
+    pnl_percent: float
+    portfolios: List[StressPortfolioImpact]
+    unmatched: List[str] = []  # shock keys that match no held sector / symbol / FX pair
+
+class StressTestResponse(BaseModel):
+    sectors: List[str]  # sectors present in the look-through exposure
+    scenarios: List[StressScenarioResult]
+
+class BenchmarkStats(BaseModel):
+    symbol: str
+    beta: Optional[float] = None
+    alpha: Optional[float] = None  # annualized, over the risk-free rate
+    correlation: Optional[float] = None
+    tracking_error: Optional[float] = None  # annualized
+    information_ratio: Optional[float] = None
+    portfolio_return: Optional[float] = None
+    benchmark_return: Optional[float] = None
+    excess_return: Optional[float] = None
+    observations: int
+
+class BenchmarkComparisonResponse(BaseModel):
+    portfolio_id: Optional[int] = None
+    dates: List[str]
+    portfolio: List[float]  # growth of 100
+    benchmarks: Dict[str, List[Optional[float]]]
+    stats: List[BenchmarkStats]
+
+class IntradayPoint(BaseModel):
+    time: int  # epoch ms, 5-min grid
+    value: float  # CAD
+
+class IntradayCurveResponse(BaseModel):
+    portfolio_id: Optional[int] = None  # None = all portfolios
+    previous_close: float  # CAD value at the previous close
+    points: List[IntradayPoint]
+    updated_at: Optional[datetime] = None
+
+class TargetKind(str, Enum):
+    symbol = "symbol"
+    sector = "sector"
+
+class TargetAllocationItem(BaseModel):
+    key: str  # symbol or sector name
+    weight_percent: float
+
+class TargetAllocationSet(BaseModel):
+    kind: TargetKind
+    targets: List[TargetAllocationItem]
+
+class TargetAllocationResponse(BaseModel):
+    portfolio_id: int
+    kind: Optional[TargetKind] = None
+    targets: List[TargetAllocationItem] = []
+
+class RebalanceTrade(BaseModel):
+    holding_id: int
+    symbol: str
+    action: str  # 'buy' or 'sell'
+    shares: float
+    price: float  # as quoted (pence for .L)
+    currency: Currency
+    value_cad: float
+    current_weight: float  # % of total value incl. cash
+    target_weight: float
+    new_weight: float
+
+class UnplacedTarget(BaseModel):
+    key: str
+    target_weight: float  # %
+    target_value: float  # CAD
+
+class RebalanceResponse(BaseModel):
+    portfolio_id: int
+    kind: Optional[TargetKind] = None
+    total_value: float
+    cash: Dict[str, float] = {}  # native amount per currency
+    trades: List[RebalanceTrade]
+    cash_after: Dict[str, float]
+    fx_conversions: Dict[str, float] = {}  # CAD amount converted into (> 0) or out of (< 0) each currency
+    unplaced_targets: List[UnplacedTarget] = []
+    unpriced_holdings: List[str] = []
+
 class PieItem(BaseModel):
     name: str
     value: float
@@ -223,6 +407,55 @@ class BudgetSummaryResponse(BaseModel):
     income_items: List[BudgetItemResponse]
     expense_items: List[BudgetItemResponse]
 
+class DividendCalendarHolding(BaseModel):
+    holding_id: int
+    portfolio_id: int
+    symbol: str
+    quantity: float
+    frequency: Optional[int] = None  # payments per year inferred from the ex-date history
+    basis: str  # "schedule" (payment history) | "estimate" (annual rate / 12)
+    is_manual: bool = False
+    next_ex_date: Optional[date] = None
+    next_pay_date: Optional[date] = None
+    next_amount_per_share: Optional[float] = None  # native currency
+    monthly_cad: List[float]
+    annual_cad: float
+
+class DividendCalendarPortfolio(BaseModel):
+    portfolio_id: int
+    name: str
+    monthly_cad: List[float]
+    annual_cad: float
+
+class DividendCalendarResponse(BaseModel):
+    months: List[str]  # YYYY-MM, current month first
+    total_monthly_cad: List[float]
+    total_annual_cad: float
+    portfolios: List[DividendCalendarPortfolio]
+    holdings: List[DividendCalendarHolding]
+
+class ProjectionBands(BaseModel):
+    p5: List[float]
+    p25: List[float]
+    p50: List[float]
+    p75: List[float]
+    p95: List[float]
+
+class ProjectionResponse(BaseModel):
+    months: List[int]
+    value: ProjectionBands
+    dividend_income_annual: ProjectionBands
+    start_value: float
+    monthly_contribution: float
+    contribution_basis: str  # "surplus_excluding_dividends" (default) | "override"
+    returns_basis: str  # "total_return" – adjusted closes, dividends already reinvested in the value bands
+    dividend_yield: float
+    method: str
+    paths: int
+    years: int
+    history_months: int
+    probability_below_invested: float
+
 class AccountCreate(BaseModel):
     name: str
     type: Optional[str] = None  # e.g., "checking", "credit_card"
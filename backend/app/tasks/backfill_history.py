@@ -0,0 +1,263 @@
+# backend/app/tasks/backfill_history.py (NEW – reconstructs daily EOD portfolio / global history from the price warehouse)
+# - Positions are today's holdings (quantity + purchase price) held constant over the whole range –
+#   there is no per-holding trade ledger to replay
+# - Per portfolio: one aligned (dates × symbols) close matrix from the warehouse, values computed with NumPy
+#   in a process pool (one job per portfolio); global = sum of the portfolio series
+# - Each day is converted to CAD at that day's rate from the FX history table (utils.fx_history): the rates
+#   are loaded once for the whole range and shipped with the jobs, so workers never query FX
+# - Rows are written with is_eod=True at 4:30 PM ET via bulk INSERTs; dates that already have an EOD row
+#   are skipped, so re-runs only fill gaps
+# - Holdings with no warehouse price in the range are left out of their portfolio's values (and cost basis)
+#   and reported under "unpriced" – otherwise one missing symbol would drop every day of the portfolio
+# - Daily rollups for the range are rebuilt afterwards so charts pick the backfilled days up
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models import Holding, Portfolio, PortfolioHistory, GlobalHistory
+from app.celery_config import celery_app
+from app.utils.price_warehouse import load_price_matrix, update_warehouse
+from app.utils.fx import REPORTING_CURRENCY, price_unit
+from app.utils.fx_history import rate_series, update_fx_history
+from app.utils.history import DAY, MARKET_TZ, eod_timestamp, is_trading_day, current_bucket_start, upsert_latest_snapshots
+from app.utils.chart_cache import bump_history_version
+from app.utils.analytics import invalidate_analytics
+from app.utils.xirr import invalidate_all_xirr
+from app.tasks.history_rollup_task import rollup_portfolio_history, rollup_global_history
+from app.tasks.history_partition_task import PARTITIONED_TABLES, ensure_partition_range
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import multiprocessing
+import numpy as np
+import logging
+import pytz
+import os
+
+logger = logging.getLogger(__name__)
+
+celery = celery_app
+
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", str(os.cpu_count() or 2)))
+# Extra days loaded before `start` so the first backfilled day still has a previous close
+LOOKBACK_DAYS = 10
+
+def portfolio_job(
+    portfolio_id: int,
+    holdings: List[Holding],
+    start: date,
+    end: date,
+    fx_dates: np.ndarray,
+    fx_rates: np.ndarray,
+    fx_currencies: List[str],
+) -> dict:
+    """Plain-data job for one portfolio (picklable for the process pool)"""
+    columns = [fx_currencies.index(h.currency.value) for h in holdings]
+    return {
+        "portfolio_id": portfolio_id,
+        "symbols": [h.symbol.upper() for h in holdings],
+        "quantities": [h.quantity or 0.0 for h in holdings],
+        "purchase_prices": [h.purchase_price or 0.0 for h in holdings],
+        "units": [price_unit(h.symbol) for h in holdings],
+        "fx_dates": fx_dates,
+        "fx_rates": fx_rates[:, columns],  # (calendar days × holdings) CAD per unit of each quote currency
+        "start": start,
+        "end": end,
+    }
+
+def compute_portfolio_series(job: dict) -> dict:
+    """
+    Daily CAD values for one portfolio →
+    {"portfolio_id", "dates" (datetime64[D]), "total_value", "cost_basis", "unpriced" (symbols left out)}.
+    Holdings without any stored price in the range are left out; only trading days on which every other
+    holding (and FX, when needed) has a price are returned.
+    """
+    start, end = job["start"], job["end"]
+    dates, prices = load_price_matrix(job["symbols"], start - timedelta(days=LOOKBACK_DAYS), end, field="close")
+    priced = ~np.isnan(prices).all(axis=0) if len(dates) else np.zeros(len(job["symbols"]), dtype=bool)
+    unpriced = sorted({s for s, ok in zip(job["symbols"], priced) if not ok})
+    if not priced.any():
+        return {
+            "portfolio_id": job["portfolio_id"], "dates": np.array([], dtype="datetime64[D]"),
+            "total_value": np.array([]), "cost_basis": np.array([]), "unpriced": unpriced,
+        }
+
+    prices = prices[:, priced]
+    quantities = np.asarray(job["quantities"], dtype=np.float64)[priced]
+    purchase = np.asarray(job["purchase_prices"], dtype=np.float64)[priced]
+    units = np.asarray(job["units"], dtype=np.float64)[priced]
+
+    # (dates × holdings) CAD conversion factor on each price date (NaN before the FX history starts)
+    pos = np.searchsorted(job["fx_dates"], dates, side="right") - 1
+    rate = np.where((pos >= 0)[:, None], job["fx_rates"][np.clip(pos, 0, None)][:, priced], np.nan) * units
+    values = prices * quantities * rate
+    cost = (purchase * quantities * rate).sum(axis=1)
+    total = values.sum(axis=1)
+
+    trading = np.array([is_trading_day(d) for d in dates.astype(object)], dtype=bool)
+    keep = trading & ~np.isnan(total) & ~np.isnan(cost)
+    return {
+        "portfolio_id": job["portfolio_id"],
+        "dates": dates[keep],
+        "total_value": total[keep],
+        "cost_basis": cost[keep],
+        "unpriced": unpriced,
+    }
+
+def history_rows(dates: np.ndarray, total: np.ndarray, cost: np.ndarray, start: date, skip: set) -> List[dict]:
+    """Vectorized daily change / gain columns → insert dicts for dates in [start, ...) not in `skip`"""
+    previous = np.concatenate(([np.nan], total[:-1]))
+    change = np.where(np.isnan(previous), 0.0, total - previous)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(previous > 0, change / previous * 100, 0.0)
+        gain = total - cost
+        gain_pct = np.where(cost > 0, gain / cost * 100, 0.0)
+
+    rows = []
+    for i, day in enumerate(dates.astype(object)):
+        if day < start or day in skip:
+            continue
+        rows.append({
+            "timestamp": eod_timestamp(day),
+            "total_value": float(total[i]),
+            "daily_change": float(change[i]),
+            "daily_percent": float(change_pct[i]),
+            "all_time_gain": float(gain[i]),
+            "all_time_percent": float(gain_pct[i]),
+            "is_eod": True,
+        })
+    return rows
+
+def _existing_eod_dates(db: Session, model, start: date, end: date, portfolio_id: Optional[int] = None) -> set:
+    tz = pytz.timezone(MARKET_TZ)
+    query = db.query(model.timestamp).filter(
+        model.is_eod == True,
+        model.timestamp >= current_bucket_start(DAY, eod_timestamp(start)),
+        model.timestamp < current_bucket_start(DAY, eod_timestamp(end + timedelta(days=1))),
+    )
+    if portfolio_id is not None:
+        query = query.filter(model.portfolio_id == portfolio_id)
+    return {pytz.utc.localize(ts).astimezone(tz).date() for (ts,) in query.all()}
+
+def _run_jobs(jobs: List[dict], workers: int) -> List[dict]:
+    # Celery prefork children are daemonic and may not spawn processes – compute in-process there
+    if workers <= 1 or len(jobs) <= 1 or multiprocessing.current_process().daemon:
+        return [compute_portfolio_series(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(compute_portfolio_series, jobs))
+
+def _global_series(results: List[dict]):
+    """Sum portfolio series on their union date axis (each portfolio forward-filled across its own gaps)"""
+    series = [res for res in results if len(res["dates"])]
+    if not series:
+        return np.array([], dtype="datetime64[D]"), np.array([]), np.array([])
+
+    dates = np.unique(np.concatenate([res["dates"] for res in series]))
+    total = np.zeros(len(dates))
+    cost = np.zeros(len(dates))
+    complete = np.ones(len(dates), dtype=bool)
+    for res in series:
+        # Index of the latest portfolio observation on or before each global date (-1 = none yet)
+        pos = np.searchsorted(res["dates"], dates, side="right") - 1
+        complete &= pos >= 0
+        pos = np.clip(pos, 0, None)
+        total += res["total_value"][pos]
+        cost += res["cost_basis"][pos]
+    return dates[complete], total[complete], cost[complete]
+
+def backfill_history(
+    db: Session,
+    start: date,
+    end: date,
+    portfolio_ids: Optional[List[int]] = None,
+    workers: int = BACKFILL_WORKERS,
+    include_global: bool = True,
+) -> Dict[str, int]:
+    """
+    Fill missing EOD rows in [start, end]; caller commits.
+    Returns inserted row counts plus {portfolio_id: symbols left out for lack of prices} under "unpriced".
+    """
+    portfolios = db.query(Portfolio).all()
+    if portfolio_ids:
+        portfolios = [p for p in portfolios if p.id in set(portfolio_ids)]
+    holdings = db.query(Holding).all()
+
+    by_portfolio: Dict[int, List[Holding]] = {}
+    for h in holdings:
+        by_portfolio.setdefault(h.portfolio_id, []).append(h)
+
+    # Make sure the warehouse and FX history cover the range (no-ops when the daily tasks already ran)
+    update_warehouse({h.symbol for h in holdings}, end)
+    currencies = sorted({h.currency.value for h in holdings} | {REPORTING_CURRENCY})
+    fx_start = start - timedelta(days=LOOKBACK_DAYS)
+    update_fx_history(db, end, currencies, start=fx_start)
+    fx_dates, fx_rates = rate_series(db, fx_start, end, currencies)
+
+    jobs = [
+        portfolio_job(p.id, by_portfolio[p.id], start, end, fx_dates, fx_rates, currencies)
+        for p in portfolios if by_portfolio.get(p.id)
+    ]
+    results = _run_jobs(jobs, workers)
+    unpriced = {res["portfolio_id"]: res["unpriced"] for res in results if res["unpriced"]}
+    for portfolio_id, symbols in unpriced.items():
+        logger.warning(f"Backfill: no warehouse prices for {', '.join(symbols)} – left out of portfolio {portfolio_id}'s history")
+
+    # Past months may predate the partitions the migration / maintenance task created – without their
+    # monthly partition the rows would pile up in DEFAULT
+    for table in PARTITIONED_TABLES:
+        ensure_partition_range(db, table, eod_timestamp(start).date(), eod_timestamp(end).date())
+
+    inserted = {"portfolio": 0, "global": 0, "unpriced": unpriced}
+    latest = []
+    for res in results:
+        skip = _existing_eod_dates(db, PortfolioHistory, start, end, portfolio_id=res["portfolio_id"])
+        rows = history_rows(res["dates"], res["total_value"], res["cost_basis"], start, skip)
+        if rows:
+            for row in rows:
+                row["portfolio_id"] = res["portfolio_id"]
+            db.execute(insert(PortfolioHistory), rows)
+            latest.append({key: rows[-1][key] for key in rows[-1] if key != "is_eod"})
+            inserted["portfolio"] += len(rows)
+
+    # Global series is only meaningful over all portfolios
+    if include_global and not portfolio_ids:
+        dates, total, cost = _global_series(results)
+        rows = history_rows(dates, total, cost, start, _existing_eod_dates(db, GlobalHistory, start, end))
+        if rows:
+            db.execute(insert(GlobalHistory), rows)
+            inserted["global"] = len(rows)
+
+    upsert_latest_snapshots(db, latest)
+
+    # Daily rollups are incremental from their newest bucket – rebuild the backfilled range explicitly
+    if inserted["portfolio"] or inserted["global"]:
+        since = current_bucket_start(DAY, eod_timestamp(start))
+        until = current_bucket_start(DAY, datetime.utcnow())
+        rollup_portfolio_history(db, DAY, until, since=since)
+        rollup_global_history(db, DAY, until, since=since)
+
+    return inserted
+
+@celery.task(name="app.tasks.backfill_history.backfill_history_task")
+def backfill_history_task(start: str, end: Optional[str] = None, portfolio_ids: Optional[List[int]] = None):
+    """start / end as YYYY-MM-DD (end defaults to yesterday)"""
+    db: Session = SessionLocal()
+    try:
+        start_day = date.fromisoformat(start)
+        end_day = date.fromisoformat(end) if end else date.today() - timedelta(days=1)
+        inserted = backfill_history(db, start_day, end_day, portfolio_ids=portfolio_ids)
+        db.commit()
+        bump_history_version()
+        if inserted["portfolio"]:
+            invalidate_analytics()
+            invalidate_all_xirr()
+
+        logger.info(f"HISTORY BACKFILL {start_day} → {end_day}: {inserted}")
+        return inserted
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error in history backfill: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
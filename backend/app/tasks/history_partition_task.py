@@ -0,0 +1,132 @@
+# backend/app/tasks/history_partition_task.py (NEW – monthly range-partition maintenance for portfolio_history / global_history)
+# - Partitions are named <table>_pYYYYMM and cover [1st of month, 1st of next month) in UTC
+# - Creates HISTORY_PARTITION_MONTHS_AHEAD future months so inserts never land in the DEFAULT partition;
+#   writers of past rows (history backfill) call ensure_partition_range for their months first
+# - Expiry is opt-in (HISTORY_PARTITION_RETENTION_MONTHS=0 keeps everything): expired partitions are
+#   detached and either moved to the history_archive schema or dropped (HISTORY_PARTITION_EXPIRY=archive|drop)
+# - Dropping a whole month is instant and leaves no dead tuples to vacuum, unlike row-level DELETEs
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.database import SessionLocal
+from app.celery_config import celery_app
+from datetime import date, datetime
+from typing import List
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+celery = celery_app
+
+PARTITIONED_TABLES = ("portfolio_history", "global_history")
+
+HISTORY_PARTITION_MONTHS_AHEAD = int(os.getenv("HISTORY_PARTITION_MONTHS_AHEAD", "3"))
+HISTORY_PARTITION_RETENTION_MONTHS = int(os.getenv("HISTORY_PARTITION_RETENTION_MONTHS", "0"))
+HISTORY_PARTITION_EXPIRY = os.getenv("HISTORY_PARTITION_EXPIRY", "archive")
+ARCHIVE_SCHEMA = "history_archive"
+
+PARTITION_RE = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+def list_partitions(db: Session, table: str) -> List[str]:
+    rows = db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+        WHERE parent.relname = :table AND ns.nspname = current_schema()
+    """), {"table": table}).scalars().all()
+    return list(rows)
+
+def _create_partition(db: Session, table: str, month: date, existing: List[str]) -> None:
+    name = partition_name(table, month)
+    bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    default = f"{table}_default"
+    if default not in existing:
+        db.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" {bounds}'))
+        return
+    # Postgres refuses a new partition while the DEFAULT partition holds rows in its range – build it
+    # standalone, move those rows over, then attach
+    db.execute(text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)'))
+    in_range = f"\"timestamp\" >= '{month.isoformat()}' AND \"timestamp\" < '{add_months(month, 1).isoformat()}'"
+    db.execute(text(f'INSERT INTO "{name}" SELECT * FROM "{default}" WHERE {in_range}'))
+    db.execute(text(f'DELETE FROM "{default}" WHERE {in_range}'))
+    db.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" {bounds}'))
+
+def ensure_partition_range(db: Session, table: str, first: date, last: date) -> List[str]:
+    """Create missing partitions for every month from `first` to `last` (inclusive)"""
+    existing = list_partitions(db, table)
+    month, created = first.replace(day=1), []
+    while month <= last:
+        if partition_name(table, month) not in existing:
+            _create_partition(db, table, month, existing)
+            created.append(partition_name(table, month))
+        month = add_months(month, 1)
+    return created
+
+def ensure_partitions(db: Session, table: str, today: date, months_ahead: int = HISTORY_PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Create missing partitions for the current month and `months_ahead` after it"""
+    current = today.replace(day=1)
+    return ensure_partition_range(db, table, current, add_months(current, months_ahead))
+
+def expire_partitions(
+    db: Session,
+    table: str,
+    today: date,
+    retention_months: int = HISTORY_PARTITION_RETENTION_MONTHS,
+    mode: str = HISTORY_PARTITION_EXPIRY,
+) -> List[str]:
+    """Detach partitions that ended more than `retention_months` ago, then archive or drop them"""
+    if retention_months <= 0:
+        return []
+
+    cutoff = add_months(today.replace(day=1), -retention_months)
+    expired = []
+    for name in sorted(list_partitions(db, table)):
+        match = PARTITION_RE.match(name)
+        if not match or match.group("table") != table:
+            continue  # DEFAULT partition or something created by hand
+        month = date(int(match.group("year")), int(match.group("month")), 1)
+        if add_months(month, 1) > cutoff:
+            continue
+
+        db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+        if mode == "drop":
+            db.execute(text(f'DROP TABLE "{name}"'))
+        else:
+            db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{ARCHIVE_SCHEMA}"'))
+            db.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{ARCHIVE_SCHEMA}"'))
+        expired.append(name)
+    return expired
+
+@celery.task(name="app.tasks.history_partition_task.maintain_history_partitions")
+def maintain_history_partitions():
+    db: Session = SessionLocal()
+    try:
+        today = datetime.utcnow().date()
+        report = {}
+        for table in PARTITIONED_TABLES:
+            report[table] = {
+                "created": ensure_partitions(db, table, today),
+                "expired": expire_partitions(db, table, today),
+            }
+        db.commit()
+
+        logger.info(f"HISTORY PARTITIONS: {report}")
+        return report
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error maintaining history partitions: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
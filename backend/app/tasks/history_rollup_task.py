@@ -0,0 +1,174 @@
+# backend/app/tasks/history_rollup_task.py (NEW – compacts intraday snapshots into hourly/daily rollups + retention on raw rows)
+# - Only closed buckets older than HISTORY_ROLLUP_DELAY_MINUTES are rolled up
+# - One INSERT ... SELECT DISTINCT ON ... ON CONFLICT per table/resolution (last snapshot in bucket wins; daily buckets prefer EOD)
+# - Incremental: each run restarts from the newest existing bucket, so re-runs are idempotent
+# - Raw rows past HISTORY_RAW_RETENTION_DAYS are deleted only once covered by daily buckets; EOD rows are kept
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, literal, delete, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.database import SessionLocal
+from app.models import PortfolioHistory, GlobalHistory, PortfolioHistoryRollup, GlobalHistoryRollup
+from app.celery_config import celery_app
+from app.utils.chart_cache import bump_history_version
+from app.utils.history import (
+    HOUR, DAY,
+    HISTORY_RAW_RETENTION_DAYS, HISTORY_HOURLY_RETENTION_DAYS,
+    bucket_start_expr, current_bucket_start,
+)
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+celery = celery_app
+
+# Give late snapshots of a just-closed bucket time to land before compacting it
+HISTORY_ROLLUP_DELAY_MINUTES = int(os.getenv("HISTORY_ROLLUP_DELAY_MINUTES", "10"))
+
+VALUE_COLUMNS = ["timestamp", "total_value", "daily_change", "daily_percent", "all_time_gain", "all_time_percent", "samples"]
+
+def rollup_portfolio_history(db: Session, resolution: str, until: datetime, since: Optional[datetime] = None) -> int:
+    """`since` overrides the incremental start (used after backfilling rows older than existing buckets)"""
+    if since is None:
+        since = db.query(func.max(PortfolioHistoryRollup.bucket_start))\
+                  .filter(PortfolioHistoryRollup.resolution == resolution).scalar()
+
+    bucket = bucket_start_expr(resolution, PortfolioHistory.timestamp)
+    # Daily buckets keep the EOD snapshot when there is one
+    order = [PortfolioHistory.portfolio_id, bucket, PortfolioHistory.timestamp.desc()]
+    if resolution == DAY:
+        order = [PortfolioHistory.portfolio_id, bucket, PortfolioHistory.is_eod.desc().nulls_last(), PortfolioHistory.timestamp.desc()]
+    sel = (
+        select(
+            PortfolioHistory.portfolio_id,
+            literal(resolution),
+            bucket,
+            PortfolioHistory.timestamp,
+            PortfolioHistory.total_value,
+            PortfolioHistory.daily_change,
+            PortfolioHistory.daily_percent,
+            PortfolioHistory.all_time_gain,
+            PortfolioHistory.all_time_percent,
+            func.count().over(partition_by=[PortfolioHistory.portfolio_id, bucket]),
+        )
+        .where(PortfolioHistory.timestamp < until, PortfolioHistory.portfolio_id.isnot(None))
+        .distinct(PortfolioHistory.portfolio_id, bucket)
+        .order_by(*order)
+    )
+    if since is not None:
+        sel = sel.where(PortfolioHistory.timestamp >= since)
+
+    stmt = pg_insert(PortfolioHistoryRollup).from_select(
+        ["portfolio_id", "resolution", "bucket_start"] + VALUE_COLUMNS, sel
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PortfolioHistoryRollup.portfolio_id, PortfolioHistoryRollup.resolution, PortfolioHistoryRollup.bucket_start],
+        set_={col: stmt.excluded[col] for col in VALUE_COLUMNS},
+    )
+    return db.execute(stmt).rowcount
+
+def rollup_global_history(db: Session, resolution: str, until: datetime, since: Optional[datetime] = None) -> int:
+    if since is None:
+        since = db.query(func.max(GlobalHistoryRollup.bucket_start))\
+                  .filter(GlobalHistoryRollup.resolution == resolution).scalar()
+
+    bucket = bucket_start_expr(resolution, GlobalHistory.timestamp)
+    # Daily buckets keep the EOD snapshot when there is one (same value the daily chart shows)
+    order = [bucket, GlobalHistory.timestamp.desc()]
+    if resolution == DAY:
+        order = [bucket, GlobalHistory.is_eod.desc().nulls_last(), GlobalHistory.timestamp.desc()]
+
+    sel = (
+        select(
+            literal(resolution),
+            bucket,
+            GlobalHistory.timestamp,
+            GlobalHistory.total_value,
+            GlobalHistory.daily_change,
+            GlobalHistory.daily_percent,
+            GlobalHistory.all_time_gain,
+            GlobalHistory.all_time_percent,
+            func.count().over(partition_by=bucket),
+            func.coalesce(GlobalHistory.is_eod, False),
+        )
+        .where(GlobalHistory.timestamp < until)
+        .distinct(bucket)
+        .order_by(*order)
+    )
+    if since is not None:
+        sel = sel.where(GlobalHistory.timestamp >= since)
+
+    columns = VALUE_COLUMNS + ["is_eod"]
+    stmt = pg_insert(GlobalHistoryRollup).from_select(["resolution", "bucket_start"] + columns, sel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GlobalHistoryRollup.resolution, GlobalHistoryRollup.bucket_start],
+        set_={col: stmt.excluded[col] for col in columns},
+    )
+    return db.execute(stmt).rowcount
+
+def apply_retention(db: Session, now: datetime, rolled_until: datetime) -> dict:
+    # Never drop raw rows that aren't inside a finished daily bucket yet
+    raw_cutoff = min(now - timedelta(days=HISTORY_RAW_RETENTION_DAYS), rolled_until)
+    hourly_cutoff = now - timedelta(days=HISTORY_HOURLY_RETENTION_DAYS)
+
+    portfolio_raw = db.execute(
+        delete(PortfolioHistory)
+        .where(
+            PortfolioHistory.timestamp < raw_cutoff,
+            or_(PortfolioHistory.is_eod.is_(None), PortfolioHistory.is_eod == False),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    global_raw = db.execute(
+        delete(GlobalHistory)
+        .where(
+            GlobalHistory.timestamp < raw_cutoff,
+            or_(GlobalHistory.is_eod.is_(None), GlobalHistory.is_eod == False),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    portfolio_hourly = db.execute(
+        delete(PortfolioHistoryRollup)
+        .where(PortfolioHistoryRollup.resolution == HOUR, PortfolioHistoryRollup.bucket_start < hourly_cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    global_hourly = db.execute(
+        delete(GlobalHistoryRollup)
+        .where(GlobalHistoryRollup.resolution == HOUR, GlobalHistoryRollup.bucket_start < hourly_cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    return {
+        "raw_deleted": portfolio_raw + global_raw,
+        "hourly_deleted": portfolio_hourly + global_hourly,
+    }
+
+@celery.task(name="app.tasks.history_rollup_task.rollup_history")
+def rollup_history():
+    db: Session = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        settled = now - timedelta(minutes=HISTORY_ROLLUP_DELAY_MINUTES)
+
+        stats = {}
+        for resolution in (HOUR, DAY):
+            until = current_bucket_start(resolution, settled)
+            stats[f"portfolio_{resolution}"] = rollup_portfolio_history(db, resolution, until)
+            stats[f"global_{resolution}"] = rollup_global_history(db, resolution, until)
+
+        stats.update(apply_retention(db, now, current_bucket_start(DAY, settled)))
+        db.commit()
+        bump_history_version()
+
+        logger.info(f"HISTORY ROLLUP: {stats}")
+        return stats
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error in history rollup: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
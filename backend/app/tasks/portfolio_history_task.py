@@ -1,15 +1,16 @@
-# backend/app/tasks/portfolio_history_task.py (updated: intraday snapshots restricted to 8AM-9PM on trading days, price updating removed – relies on update_prices task, consistent CAD conversion in both intraday & EOD, EOD at 4:30 PM)
+# backend/app/tasks/portfolio_history_task.py (updated: intraday snapshots restricted to 8AM-9PM on trading days, price updating removed – relies on update_prices task, consistent CAD conversion in both intraday & EOD, EOD at 4:30 PM with per-portfolio EOD rows)
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.database import SessionLocal
 from app.models import Holding, Portfolio, PortfolioHistory, GlobalHistory
-from app.utils.yahoo import batch_fetch_prices
 from app.celery_config import celery_app
-from app.main import r
+from app.utils.chart_cache import bump_history_version
+from app.utils.fx import FxMatrix, get_fx_matrix, refresh_rates, conversion_factors
+from app.utils.fx_history import record_rates
+from app.utils.history import DAY, current_bucket_start, is_trading_day, upsert_latest_snapshots
+import numpy as np
 import logging
 import pytz
-import holidays
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +18,7 @@ celery = celery_app
 
 def _was_trading_day() -> bool:
     tz = pytz.timezone("America/Toronto")
-    today = datetime.now(tz).date()
-    if today.weekday() >= 5:  # Sat/Sun
-        return False
-    ca_hols = holidays.CA(prov="ON", years=today.year)
-    us_hols = holidays.US(years=today.year)
-    if today in ca_hols or today in us_hols:
-        return False
-    return True
+    return is_trading_day(datetime.now(tz).date())
 
 def _in_update_window() -> bool:
     """8:00 AM – 9:00 PM Toronto time"""
@@ -32,6 +26,45 @@ def _in_update_window() -> bool:
     now = datetime.now(tz)
     return 8 <= now.hour < 21
 
+def _fx_matrix(holdings) -> FxMatrix:
+    """Cached FX matrix (one batched fetch of every pair when nothing has been cached yet)"""
+    fx = get_fx_matrix()
+    if fx.updated_at is None:
+        fx = refresh_rates(h.symbol for h in holdings)
+    return fx
+
+def _snapshot_values(holdings, fx: FxMatrix) -> dict:
+    """CAD totals for a set of holdings (each converted from its quote currency)"""
+    factors = conversion_factors([h.symbol for h in holdings], currencies=[h.currency.value for h in holdings], fx=fx)
+    total_value = float(np.dot([h.market_value or 0 for h in holdings], factors))
+    daily_change = float(np.dot([(h.daily_change or 0) * h.quantity for h in holdings], factors))
+    all_time_gain = float(np.dot([h.all_time_gain_loss or 0 for h in holdings], factors))
+
+    yesterday_value = total_value - daily_change
+    daily_percent = (daily_change / yesterday_value * 100) if yesterday_value > 0 else 0
+    cost_basis = total_value - all_time_gain
+    all_time_percent = (all_time_gain / cost_basis * 100) if cost_basis > 0 else 0
+
+    return {
+        "total_value": total_value,
+        "daily_change": daily_change,
+        "daily_percent": daily_percent,
+        "all_time_gain": all_time_gain,
+        "all_time_percent": all_time_percent,
+    }
+
+def _portfolio_snapshots(db: Session, holdings, fx: FxMatrix, now: datetime, is_eod: bool) -> int:
+    """One PortfolioHistory row per portfolio + the latest-snapshot upsert (same transaction, caller commits)"""
+    portfolios = db.query(Portfolio).all()
+    latest = []
+    for port in portfolios:
+        values = _snapshot_values([h for h in holdings if h.portfolio_id == port.id], fx)
+        db.add(PortfolioHistory(portfolio_id=port.id, timestamp=now, is_eod=is_eod, **values))
+        latest.append({"portfolio_id": port.id, "timestamp": now, **values})
+
+    upsert_latest_snapshots(db, latest)
+    return len(portfolios)
+
 @celery.task(name="app.tasks.portfolio_history_task.save_portfolio_history_snapshot")
 def save_portfolio_history_snapshot():
     if not _was_trading_day():
@@ -48,80 +81,18 @@ def save_portfolio_history_snapshot():
         if not holdings:
             return "no holdings"
 
-        portfolios = db.query(Portfolio).all()
-
-        # Get latest FX rate (cached primary, fallback fetch only FX)
-        rate_str = r.get("fx:USDCAD")
-        if rate_str:
-            rate = float(rate_str.decode("utf-8"))
-        else:
-            fx_map = batch_fetch_prices(["USDCAD=X"])
-            rate = fx_map.get("USDCAD=X", {}).get("price") or 1.37
-            r.set("fx:USDCAD", rate, ex=3600)
-
+        fx = _fx_matrix(holdings)
         now = datetime.utcnow()
 
         # Per-portfolio snapshots
-        for port in portfolios:
-            port_holdings = [h for h in holdings if h.portfolio_id == port.id]
-            total_value = daily_change = gain_loss = 0.0
-
-            for h in port_holdings:
-                is_cad = h.symbol.upper().endswith('.TO')
-                mv = h.market_value or 0
-                dc = (h.daily_change or 0) * h.quantity
-                ag = h.all_time_gain_loss or 0
-
-                total_value += mv if is_cad else mv * rate
-                daily_change += dc if is_cad else dc * rate
-                gain_loss += ag if is_cad else ag * rate
-
-            yesterday_value = total_value - daily_change
-            daily_percent = (daily_change / yesterday_value * 100) if yesterday_value > 0 else 0
-            cost_basis = total_value - gain_loss
-            all_time_percent = (gain_loss / cost_basis * 100) if cost_basis > 0 else 0
-
-            history_record = PortfolioHistory(
-                portfolio_id=port.id,
-                timestamp=now,
-                total_value=total_value,
-                daily_change=daily_change,
-                daily_percent=daily_percent,
-                all_time_gain=gain_loss,
-                all_time_percent=all_time_percent,
-            )
-            db.add(history_record)
+        saved = _portfolio_snapshots(db, holdings, fx, now, is_eod=False)
 
         # Global snapshot (intraday, not marked as EOD)
-        total_value = daily_change = all_time_gain = 0.0
-        for h in holdings:
-            is_cad = h.symbol.upper().endswith('.TO')
-            mv = h.market_value or 0
-            dc = (h.daily_change or 0) * h.quantity
-            ag = h.all_time_gain_loss or 0
-
-            total_value += mv if is_cad else mv * rate
-            daily_change += dc if is_cad else dc * rate
-            all_time_gain += ag if is_cad else ag * rate
-
-        yesterday_value = total_value - daily_change
-        daily_percent = (daily_change / yesterday_value * 100) if yesterday_value > 0 else 0
-        cost_basis = total_value - all_time_gain
-        all_time_percent = (all_time_gain / cost_basis * 100) if cost_basis > 0 else 0
-
-        global_history = GlobalHistory(
-            timestamp=now,
-            total_value=total_value,
-            daily_change=daily_change,
-            daily_percent=daily_percent,
-            all_time_gain=all_time_gain,
-            all_time_percent=all_time_percent,
-            is_eod=False,
-        )
-        db.add(global_history)
+        db.add(GlobalHistory(timestamp=now, is_eod=False, **_snapshot_values(holdings, fx)))
 
         db.commit()
-        logger.info(f"INTRADAY SNAPSHOT: Saved {len(portfolios)} portfolio + 1 global history records")
+        bump_history_version()  # invalidate cached (downsampled) history charts
+        logger.info(f"INTRADAY SNAPSHOT: Saved {saved} portfolio + 1 global history records")
 
         return "success"
 
@@ -148,59 +119,36 @@ def save_daily_global_snapshot():
         now = datetime.utcnow()
         today = now.date()
 
-        # Prevent duplicates
+        # Prevent duplicates – plain range on timestamp (Toronto trading day in UTC) so the EOD
+        # partial index and partition pruning apply, unlike date(timestamp) = today
+        day_start = current_bucket_start(DAY, now)
+        day_end = current_bucket_start(DAY, day_start + timedelta(hours=36))
         existing_eod = db.query(GlobalHistory).filter(
-            func.date(GlobalHistory.timestamp) == today,
-            GlobalHistory.is_eod == True
+            GlobalHistory.is_eod == True,
+            GlobalHistory.timestamp >= day_start,
+            GlobalHistory.timestamp < day_end,
         ).first()
         if existing_eod:
             logger.info("EOD snapshot already exists for today")
             return "already exists"
 
-        # Get latest FX rate (cached primary, fallback fetch)
-        rate_str = r.get("fx:USDCAD")
-        if rate_str:
-            rate = float(rate_str.decode("utf-8"))
-        else:
-            fx_map = batch_fetch_prices(["USDCAD=X"])
-            rate = fx_map.get("USDCAD=X", {}).get("price") or 1.37
-            r.set("fx:USDCAD", rate, ex=3600)
-
-        # Compute global aggregates in CAD
-        total_value = daily_change = all_time_gain = 0.0
-        for h in holdings:
-            is_cad = h.symbol.upper().endswith('.TO')
-            mv = h.market_value or 0
-            dc = (h.daily_change or 0) * h.quantity
-            ag = h.all_time_gain_loss or 0
-
-            total_value += mv if is_cad else mv * rate
-            daily_change += dc if is_cad else dc * rate
-            all_time_gain += ag if is_cad else ag * rate
-
-        yesterday_value = total_value - daily_change
-        daily_percent = (daily_change / yesterday_value * 100) if yesterday_value > 0 else 0
-
-        cost_basis = total_value - all_time_gain
-        all_time_percent = (all_time_gain / cost_basis * 100) if cost_basis > 0 else 0
-
-        eod_record = GlobalHistory(
-            timestamp=now,
-            total_value=total_value,
-            daily_change=daily_change,
-            daily_percent=daily_percent,
-            all_time_gain=all_time_gain,
-            all_time_percent=all_time_percent,
-            is_eod=True,
-        )
-        db.add(eod_record)
+        fx = _fx_matrix(holdings)
+
+        # Per-portfolio EOD rows (daily series per portfolio, same shape the history backfill writes)
+        saved = _portfolio_snapshots(db, holdings, fx, now, is_eod=True)
+
+        # Global aggregates in CAD
+        db.add(GlobalHistory(timestamp=now, is_eod=True, **_snapshot_values(holdings, fx)))
+        # Keep the rates this snapshot was valued at as the day's FX history
+        record_rates(db, today, fx)
         db.commit()
+        bump_history_version()
 
-        logger.info(f"EOD global snapshot saved for {today} at 4:30 PM ET")
+        logger.info(f"EOD global + {saved} portfolio snapshots saved for {today} at 4:30 PM ET")
         return "success"
     except Exception as e:
         db.rollback()
         logger.error(f"Error saving daily EOD snapshot: {e}", exc_info=True)
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
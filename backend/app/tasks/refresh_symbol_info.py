@@ -0,0 +1,304 @@
+# backend/app/tasks/refresh_symbol_info.py (NEW – one metadata pipeline for every per-symbol fact: profile, sector weights, dividends)
+# - Each field group has its own TTL and *_updated_at column on SymbolInfo
+# - Only stale groups are fetched; FMP batch endpoints first, Yahoo .info through a bounded pool for misses
+# - Results are written with bulk upserts (symbol_info, symbol_sector_weights, legacy symbol_sector_cache)
+# - Tasks and routers read SymbolInfo instead of calling providers themselves
+# - Dividend payment history (utils.dividends) is only re-fetched when Yahoo reports a newly declared ex-date
+
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.database import SessionLocal
+from app.models import Holding, UnderlyingHolding, HoldingType, SymbolInfo, SymbolSectorCache, SymbolSectorWeight
+from app.celery_config import celery_app
+from app.utils.fmp import fmp_configured, get_fmp_client, fetch_sector_weightings_with_source, fetch_stock_sector_weightings_batch
+from app.utils.yahoo import fetch_yahoo_info
+from app.utils.symbol_info import currency_from_suffix
+from app.utils.dividends import fetch_dividend_history, latest_ex_dates, store_dividend_events
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import requests
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+celery = celery_app
+
+# Per-field TTLs
+PROFILE_TTL_HOURS = float(os.getenv("SYMBOL_PROFILE_TTL_HOURS", "168"))
+SECTOR_CACHE_TTL_HOURS = float(os.getenv("SECTOR_CACHE_TTL_HOURS", "24"))
+DIVIDEND_TTL_HOURS = float(os.getenv("SYMBOL_DIVIDEND_TTL_HOURS", "12"))
+
+# Bounded pool – provider calls are I/O bound, but FMP/Yahoo rate-limit bursts
+SYMBOL_FETCH_WORKERS = int(os.getenv("SYMBOL_FETCH_WORKERS", os.getenv("SECTOR_FETCH_WORKERS", "8")))
+
+FIELDS = ("profile", "sectors", "dividends")
+FIELD_TTL_HOURS = {
+    "profile": PROFILE_TTL_HOURS,
+    "sectors": SECTOR_CACHE_TTL_HOURS,
+    "dividends": DIVIDEND_TTL_HOURS,
+}
+
+def get_symbol_universe(db: Session) -> Dict[str, dict]:
+    """
+    Every symbol the app cares about → {"is_etf": bool, "held": bool}.
+    held = appears as a main holding (needs dividends); underlyings are treated as stocks.
+    """
+    universe: Dict[str, dict] = {}
+    for symbol, holding_type in db.query(Holding.symbol, Holding.type).distinct().all():
+        entry = universe.setdefault(symbol, {"is_etf": False, "held": True})
+        # Same symbol held as ETF in one portfolio wins over a stock entry elsewhere
+        entry["is_etf"] = entry["is_etf"] or holding_type == HoldingType.etf
+    for (symbol,) in db.query(UnderlyingHolding.symbol).distinct().all():
+        universe.setdefault(symbol, {"is_etf": False, "held": False})
+    return universe
+
+def get_stale_fields(db: Session, symbols: Iterable[str], now: datetime) -> Dict[str, List[str]]:
+    """One query over symbol_info → {field: [symbols whose field is missing or past its TTL]}"""
+    symbols = list(symbols)
+    rows = {
+        row.symbol: row
+        for row in db.query(
+            SymbolInfo.symbol,
+            SymbolInfo.profile_updated_at,
+            SymbolInfo.sectors_updated_at,
+            SymbolInfo.dividends_updated_at,
+        ).filter(SymbolInfo.symbol.in_(symbols)).all()
+    }
+
+    stale: Dict[str, List[str]] = {field: [] for field in FIELDS}
+    for field in FIELDS:
+        cutoff = now - timedelta(hours=FIELD_TTL_HOURS[field])
+        for symbol in symbols:
+            row = rows.get(symbol)
+            updated = getattr(row, f"{field}_updated_at") if row is not None else None
+            if updated is None or updated < cutoff:
+                stale[field].append(symbol)
+    return stale
+
+def _pool_map(fn: Callable, items: List, label: str) -> Dict:
+    """Run fn(item) for every item through the bounded pool → {item: result} (failures are logged and skipped)"""
+    results = {}
+    if not items:
+        return results
+    with ThreadPoolExecutor(max_workers=min(SYMBOL_FETCH_WORKERS, len(items))) as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                logger.warning(f"{label} fetch failed for {item}: {e}")
+    return results
+
+def upsert_symbol_info(db: Session, rows: List[dict], columns: List[str]) -> int:
+    """Bulk upsert of one field group – other groups' columns are left untouched"""
+    if not rows:
+        return 0
+    stmt = pg_insert(SymbolInfo).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SymbolInfo.symbol],
+        set_={col: getattr(stmt.excluded, col) for col in columns + ["last_refreshed"]},
+    ))
+    return len(rows)
+
+def upsert_sector_weightings(db: Session, results: Dict[str, List[dict]], now: datetime) -> int:
+    """
+    Bulk-write sector weightings for many symbols at once.
+    - symbol_sector_weights: one upsert for all (symbol, sector) rows + one delete for sectors that disappeared
+    - symbol_sector_cache: JSONB copy kept for backward compatibility
+    Returns number of (symbol, sector) rows written.
+    """
+    if not results:
+        return 0
+
+    # Merge duplicate sectors per symbol (ON CONFLICT can't touch the same row twice in one statement)
+    weight_rows = {}
+    for symbol, weightings in results.items():
+        for item in weightings:
+            key = (symbol, item["sector"])
+            weight_rows[key] = weight_rows.get(key, 0.0) + float(item["weight"])
+
+    rows = [{"symbol": s, "sector": sec, "weight": w} for (s, sec), w in weight_rows.items()]
+
+    stmt = pg_insert(SymbolSectorWeight).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SymbolSectorWeight.symbol, SymbolSectorWeight.sector],
+        set_={"weight": stmt.excluded.weight},
+    ))
+
+    # Drop sectors no longer reported for the refreshed symbols
+    db.execute(
+        delete(SymbolSectorWeight)
+        .where(
+            SymbolSectorWeight.symbol.in_(list(results.keys())),
+            tuple_(SymbolSectorWeight.symbol, SymbolSectorWeight.sector).notin_(list(weight_rows.keys())),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    cache_stmt = pg_insert(SymbolSectorCache).values([
+        {"symbol": s, "weightings": w, "last_updated": now} for s, w in results.items()
+    ])
+    db.execute(cache_stmt.on_conflict_do_update(
+        index_elements=[SymbolSectorCache.symbol],
+        set_={
+            "weightings": cache_stmt.excluded.weightings,
+            "last_updated": cache_stmt.excluded.last_updated,
+        },
+    ))
+
+    return len(rows)
+
+def fetch_profiles(symbols: List[str]) -> Tuple[Dict[str, dict], Counter]:
+    """name / exchange / currency: FMP batch /profile → Yahoo .info for misses → suffix currency"""
+    stats: Counter = Counter()
+    profiles: Dict[str, dict] = {}
+
+    try:
+        fmp = get_fmp_client().batch_profiles(symbols) if symbols and fmp_configured() else {}
+    except requests.RequestException as e:
+        logger.warning(f"FMP batch profile request failed for {len(symbols)} symbols: {str(e)}")
+        fmp = {}
+
+    for symbol in symbols:
+        item = fmp.get(symbol.upper())
+        if item:
+            profiles[symbol] = {
+                "name": item.get("companyName"),
+                "exchange": item.get("exchange"),
+                "currency": item.get("currency"),
+            }
+            stats["fmp"] += 1
+
+    misses = [s for s in symbols if s not in profiles]
+    for symbol, info in _pool_map(fetch_yahoo_info, misses, "Yahoo profile").items():
+        if info:
+            profiles[symbol] = {
+                "name": info.get("longName") or info.get("shortName"),
+                "exchange": info.get("exchange"),
+                "currency": info.get("currency"),
+            }
+            stats["yahoo"] += 1
+
+    for symbol in symbols:
+        profile = profiles.setdefault(symbol, {"name": None, "exchange": None, "currency": None})
+        if not profile["currency"]:
+            profile["currency"] = currency_from_suffix(symbol)
+            stats["fallback"] += 1
+    return profiles, stats
+
+def fetch_sectors(symbols: Dict[str, bool]) -> Tuple[Dict[str, List[dict]], Counter]:
+    """Sector weightings for {symbol: is_etf}: batched FMP profiles for stocks, pooled ETF/Yahoo lookups for the rest"""
+    results: Dict[str, List[dict]] = {}
+    stats: Counter = Counter()
+
+    # Stocks: one FMP /profile request per chunk of symbols
+    stocks = [sym for sym, is_etf in symbols.items() if not is_etf]
+    for symbol, weightings in fetch_stock_sector_weightings_batch(stocks).items():
+        results[symbol] = weightings
+        stats["fmp"] += 1
+
+    # ETFs (no FMP batch endpoint) + stocks FMP missed (Yahoo only) go through the pool
+    jobs = [(sym, True, False) for sym, is_etf in symbols.items() if is_etf]
+    jobs += [(sym, False, True) for sym in stocks if sym not in results]
+    fetched = _pool_map(lambda job: fetch_sector_weightings_with_source(*job), jobs, "Sector")
+    for (symbol, _, _), (weightings, source) in fetched.items():
+        results[symbol] = weightings
+        stats[source] += 1
+    stats["error"] = len(jobs) - len(fetched)
+    return results, stats
+
+def _dividends_from_info(info: dict) -> dict:
+    # Trailing preferred
+    trailing = info.get("trailingAnnualDividendRate")
+    forward = info.get("dividendRate")
+    yield_val = info.get("trailingAnnualDividendYield") or info.get("dividendYield")
+    # Epoch seconds of the declared (upcoming or latest) ex-date
+    ex_dates = [info.get(key) for key in ("exDividendDate", "lastDividendDate") if info.get(key)]
+    return {
+        "dividend_rate": trailing or forward or 0.0,
+        "dividend_yield_percent": yield_val * 100 if yield_val is not None else None,
+        "ex_dividend_date": datetime.utcfromtimestamp(max(ex_dates)).date() if ex_dates else None,
+    }
+
+def needs_dividend_history(dividends: dict, previous_ex_date: Optional[date], has_history: bool) -> bool:
+    """New declaration (ex-date changed since the last refresh), or a payer with no stored events yet"""
+    if not has_history:
+        return bool(dividends["ex_dividend_date"] or dividends["dividend_rate"])
+    return dividends["ex_dividend_date"] is not None and dividends["ex_dividend_date"] != previous_ex_date
+
+def fetch_dividends(symbols: List[str]) -> Dict[str, dict]:
+    return {
+        symbol: _dividends_from_info(info)
+        for symbol, info in _pool_map(fetch_yahoo_info, symbols, "Dividend").items()
+    }
+
+@celery.task(name="app.tasks.refresh_symbol_info.refresh_symbol_info")
+def refresh_symbol_info(fields: Optional[List[str]] = None):
+    fields = [f for f in (fields or FIELDS) if f in FIELDS]
+    db: Session = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        universe = get_symbol_universe(db)
+        stale = get_stale_fields(db, universe.keys(), now)
+        report = {}
+
+        if "profile" in fields and stale["profile"]:
+            profiles, stats = fetch_profiles(stale["profile"])
+            upsert_symbol_info(db, [
+                {"symbol": s, **p, "profile_updated_at": now, "last_refreshed": now}
+                for s, p in profiles.items()
+            ], ["name", "exchange", "currency", "profile_updated_at"])
+            report["profile"] = {"refreshed": len(profiles), **stats}
+
+        if "sectors" in fields and stale["sectors"]:
+            results, stats = fetch_sectors({s: universe[s]["is_etf"] for s in stale["sectors"]})
+            written = upsert_sector_weightings(db, results, now)
+            upsert_symbol_info(db, [
+                {"symbol": s, "sectors_updated_at": now, "last_refreshed": now} for s in results
+            ], ["sectors_updated_at"])
+            # FMP is asked for every symbol; Yahoo only for FMP misses
+            report["sectors"] = {
+                "refreshed": len(results),
+                "errors": stats["error"],
+                "fmp_hits": stats["fmp"],
+                "fmp_misses": stats["yahoo"] + stats["fallback"],
+                "yahoo_hits": stats["yahoo"],
+                "yahoo_misses": stats["fallback"],
+                "weight_rows": written,
+            }
+
+        if "dividends" in fields:
+            held = [s for s in stale["dividends"] if universe[s]["held"]]
+            if held:
+                previous = dict(db.query(SymbolInfo.symbol, SymbolInfo.ex_dividend_date).filter(SymbolInfo.symbol.in_(held)).all())
+                dividends = fetch_dividends(held)
+                stored = latest_ex_dates(db, dividends)
+                declared = [s for s, d in dividends.items() if needs_dividend_history(d, previous.get(s), s in stored)]
+                history = {s: events for s, events in _pool_map(fetch_dividend_history, declared, "Dividend history").items() if events}
+                report["dividend_events"] = {"symbols": len(history), "rows": store_dividend_events(db, history)}
+
+                # A new ex-date is only recorded once its history is stored – otherwise the failed fetch
+                # would never be retried (the ex-date would already match)
+                pending = set(declared) - set(history)
+                upsert_symbol_info(db, [
+                    {"symbol": s, **d, "ex_dividend_date": previous.get(s) if s in pending else d["ex_dividend_date"],
+                     "dividends_updated_at": now, "last_refreshed": now}
+                    for s, d in dividends.items()
+                ], ["dividend_rate", "dividend_yield_percent", "ex_dividend_date", "dividends_updated_at"])
+                report["dividends"] = {"refreshed": len(dividends), "errors": len(held) - len(dividends), "history_pending": len(pending)}
+
+        db.commit()
+        logger.info(f"Symbol metadata refresh completed for {len(universe)} symbols: {report or 'all fresh'}")
+        return report
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Symbol metadata refresh failed: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+# backend/app/tasks/update_price_warehouse.py (NEW – daily bulk append to the local Parquet price warehouse)
+# - Universe = every held / underlying symbol + the USD{CCY}=X pairs of every quote currency + benchmark indices
+# - One multi-symbol yf.download for the missing days (plus one backfill call when new symbols appear)
+# - Only completed sessions are stored: before the close, the warehouse stops at yesterday
+# - The cached returns matrix used by the risk endpoints is extended right after (held symbols + FX)
+# - The FX history table (utils.fx_history) is brought up to the same session for every known currency
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.celery_config import celery_app
+from app.tasks.refresh_symbol_info import get_symbol_universe
+from app.utils.price_warehouse import update_warehouse
+from app.utils.returns_matrix import update_returns_matrix
+from app.utils.benchmarks import BENCHMARK_SYMBOLS
+from app.utils.fx import required_currencies, required_pairs, CURRENCIES
+from app.utils.fx_history import update_fx_history
+from datetime import datetime, timedelta
+import logging
+import pytz
+import os
+
+logger = logging.getLogger(__name__)
+
+celery = celery_app
+
+# Extra FX pairs on top of the ones derived from the held symbols' currencies
+WAREHOUSE_FX_SYMBOLS = [s.strip() for s in os.getenv("WAREHOUSE_FX_SYMBOLS", "").split(",") if s.strip()]
+# Local (Toronto) time after which today's daily bar is considered final
+WAREHOUSE_CLOSE_HOUR = int(os.getenv("WAREHOUSE_CLOSE_HOUR", "17"))
+
+def last_completed_session(now_local: datetime):
+    today = now_local.date()
+    return today if now_local.hour >= WAREHOUSE_CLOSE_HOUR else today - timedelta(days=1)
+
+@celery.task(name="app.tasks.update_price_warehouse.update_price_warehouse")
+def update_price_warehouse():
+    db: Session = SessionLocal()
+    try:
+        universe = get_symbol_universe(db)
+        fx_pairs = sorted(set(required_pairs(list(universe) + BENCHMARK_SYMBOLS)) | set(WAREHOUSE_FX_SYMBOLS))
+        symbols = list(universe) + fx_pairs + BENCHMARK_SYMBOLS
+
+        through = last_completed_session(datetime.now(pytz.timezone("America/Toronto")))
+        appended = update_warehouse(symbols, through)
+        total = sum(appended.values())
+        logger.info(f"PRICE WAREHOUSE: {total} rows appended for {len(appended)} symbols through {through}")
+
+        held = [symbol for symbol, entry in universe.items() if entry["held"]]
+        update_returns_matrix(held + fx_pairs, through)
+
+        currencies = set(required_currencies(list(universe) + BENCHMARK_SYMBOLS)) | set(CURRENCIES)
+        fx_rows = update_fx_history(db, through, currencies)
+        db.commit()
+        return {"through": through.isoformat(), "rows": total, "symbols": appended, "fx_rows": fx_rows}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error updating price warehouse: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
@@ -5,13 +5,17 @@
 # - No overwrite of manual values
 # - Yield update also skipped for manual
 # - Commit only after all (unchanged)
+# - Dividends now come from the SymbolInfo store – no per-task yfinance .info calls
+# - Combined intraday curves (utils.intraday) are extended right after new bars are committed
 
 from sqlalchemy.orm import Session, joinedload
 from app.database import SessionLocal
 from app.models import Holding
 from app.utils.yahoo import batch_fetch_prices
+from app.utils.symbol_info import get_symbol_info_map
+from app.utils.fx import required_pairs, store_rates, get_fx_matrix
+from app.utils.intraday import refresh_intraday_curves
 from app.celery_config import celery_app
-from app.main import r
 import logging
 from datetime import datetime
 import yfinance as yf
@@ -50,8 +54,8 @@ def update_all_prices(self):
         underlying_symbols = {u.symbol for h in holdings for u in (h.underlyings or [])}
         all_symbols = list(main_symbols.union(underlying_symbols))
 
-        if "USDCAD=X" not in all_symbols:
-            all_symbols.append("USDCAD=X")
+        # FX pairs for every quote currency ride along in the same batched download
+        all_symbols += [p for p in required_pairs(all_symbols) if p not in all_symbols]
 
         logger.info(f"CELERY TASK: Fetching prices for {len(all_symbols)} symbols")
         price_map = batch_fetch_prices(all_symbols)
@@ -96,56 +100,44 @@ def update_all_prices(self):
                     holding.day_chart = []
             # After hours: keep previous chart
 
-        # Dividend batch fetch – NOW PROPERLY SKIPS MANUAL OVERRIDES
+        # Dividends – read from the shared SymbolInfo store (filled by refresh_symbol_info), skip manual overrides
         dividend_updated_count = 0
-        if holdings:
-            symbols_str = " ".join([h.symbol for h in holdings])
-            try:
-                multi_tickers = yf.Tickers(symbols_str)
-                for holding in holdings:
-                    if holding.is_dividend_manual:
-                        logger.info(f"Skipping dividend update for manual override holding {holding.symbol}")
-                        continue
-
-                    try:
-                        sym = holding.symbol.upper()
-                        info = multi_tickers.tickers[sym].info
-
-                        # Trailing preferred
-                        trailing = info.get("trailingAnnualDividendRate")
-                        forward = info.get("dividendRate")
-                        new_div = trailing or forward or 0.0
-                        if holding.dividend_annual_per_share != new_div:
-                            holding.dividend_annual_per_share = new_div
-                            dividend_updated_count += 1
-
-                        trailing_yield = info.get("trailingAnnualDividendYield")
-                        forward_yield = info.get("dividendYield")
-                        yield_val = trailing_yield or forward_yield
-                        new_yield = yield_val * 100 if yield_val is not None else None
-                        if holding.dividend_yield_percent != new_yield:
-                            holding.dividend_yield_percent = new_yield
-
-                    except Exception as e:
-                        logger.warning(f"Dividend fetch failed for {holding.symbol}: {e}")
-
-                if dividend_updated_count > 0:
-                    logger.info(f"Dividend data updated for {dividend_updated_count} holdings")
-                else:
-                    logger.info("No dividend changes (all manual or no new data)")
-
-            except Exception as e:
-                logger.warning(f"Batch dividend fetch failed: {e}")
+        info_map = get_symbol_info_map(db, main_symbols)
+        for holding in holdings:
+            if holding.is_dividend_manual:
+                logger.info(f"Skipping dividend update for manual override holding {holding.symbol}")
+                continue
+
+            info = info_map.get(holding.symbol.upper())
+            if info is None or info.dividends_updated_at is None:
+                continue  # Not fetched yet – keep current values
+
+            new_div = info.dividend_rate or 0.0
+            if holding.dividend_annual_per_share != new_div:
+                holding.dividend_annual_per_share = new_div
+                dividend_updated_count += 1
+
+            if holding.dividend_yield_percent != info.dividend_yield_percent:
+                holding.dividend_yield_percent = info.dividend_yield_percent
+
+        if dividend_updated_count > 0:
+            logger.info(f"Dividend data updated for {dividend_updated_count} holdings")
+        else:
+            logger.info("No dividend changes (all manual or no new data)")
 
         db.commit()
         logger.info(f"CELERY TASK SUCCESS: Updated prices for {updated_count}/{len(holdings)} holdings, dividends for {dividend_updated_count}")
 
-        # Cache FX
-        usdcad_data = price_map.get("USDCAD=X", {})
-        usdcad_price = usdcad_data.get("price")
-        if usdcad_price is not None:
-            r.set("fx:USDCAD", usdcad_price, ex=3600)
-            logger.info(f"Updated cached FX rate USDCAD=X to {usdcad_price}")
+        # Post-commit cache work – prices are stored, so a failure here must not retry the whole task
+        try:
+            # Cache FX matrix
+            store_rates(price_map)
+
+            # Extend every portfolio's intraday value curve with the new bars (one reload – the commit expired the rows)
+            holdings = db.query(Holding).all()
+            refresh_intraday_curves(holdings, sorted({h.portfolio_id for h in holdings}), get_fx_matrix())
+        except Exception as e:
+            logger.warning(f"Post-update cache refresh failed (prices already saved): {e}", exc_info=True)
 
         return f"Updated {updated_count} prices + {dividend_updated_count} dividends"
 
@@ -0,0 +1,251 @@
+# backend/app/utils/analytics.py (NEW – performance analytics from EOD history: TWR, volatility, drawdown, Sharpe/Sortino, rolling returns)
+# - All statistics are kept as running sums in a small state (count, Σr, Σr², Σdownside², log growth, peak, …)
+#   so a new EOD row is folded in with one vectorized pass over just the new values
+# - State lives in Redis per portfolio; when it already covers the latest EOD row the result is O(1)
+# - Ledger cash flows are removed from the day they land on, so contributions don't count as return (TWR)
+# - Backfills / edits to past rows bump ANALYTICS_EPOCH_KEY, which forces a full recompute on next read
+from sqlalchemy.orm import Session
+from app.models import PortfolioHistory
+from app.utils.cash_flows import load_cash_flows, amounts_cad
+from app.utils.history import MARKET_TZ
+from app.redis_client import r
+from datetime import date, datetime
+from typing import List, Optional
+import numpy as np
+import redis
+import json
+import logging
+import pytz
+import os
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.03"))  # annual, used by Sharpe / Sortino
+
+# Trading-day windows for rolling returns (the state keeps the last max(window) wealth values)
+ROLLING_WINDOWS = {"1M": 21, "3M": 63, "6M": 126, "1Y": 252}
+
+ANALYTICS_EPOCH_KEY = "analytics:epoch"
+
+def empty_state() -> dict:
+    return {
+        "epoch": 0,
+        "first_date": None,
+        "last_timestamp": None,
+        "last_value": None,
+        "n": 0,
+        "sum_r": 0.0,
+        "sum_r2": 0.0,
+        "sum_down2": 0.0,
+        "log_growth": 0.0,
+        "peak": 1.0,
+        "peak_date": None,
+        "max_drawdown": 0.0,
+        "drawdown_peak": None,
+        "drawdown_trough": None,
+        "best_day": None,
+        "worst_day": None,
+        "window": [1.0],
+    }
+
+def fold(state: dict, timestamps: List[datetime], values: np.ndarray, flows: Optional[np.ndarray] = None) -> dict:
+    """
+    Fold new EOD values (ascending, all after state["last_timestamp"]) into the running state.
+    flows[i] = net external cash flow on day i (contributions > 0); it is removed from that day's
+    return so deposits/withdrawals don't count as performance (time-weighted return).
+    """
+    if len(values) == 0:
+        return state
+    values = np.asarray(values, dtype=np.float64)
+    flows = np.zeros(len(values)) if flows is None else np.asarray(flows, dtype=np.float64)
+
+    state = dict(state)
+    if state["first_date"] is None:
+        state["first_date"] = timestamps[0].date().isoformat()
+
+    previous = np.concatenate(([state["last_value"] if state["last_value"] is not None else np.nan], values[:-1]))
+    valid = previous > 0  # NaN (first ever row) compares False
+    returns = np.where(valid, (values - flows) / np.where(valid, previous, 1.0) - 1.0, 0.0)[valid]
+    days = [ts for ts, ok in zip(timestamps, valid) if ok]
+
+    if len(returns):
+        excess_down = np.minimum(returns - RISK_FREE_RATE / TRADING_DAYS, 0.0)
+        state["n"] += int(len(returns))
+        state["sum_r"] += float(returns.sum())
+        state["sum_r2"] += float(np.square(returns).sum())
+        state["sum_down2"] += float(np.square(excess_down).sum())
+
+        # Wealth index continues from exp(log_growth); drawdown against the running peak
+        wealth = np.exp(state["log_growth"] + np.cumsum(np.log1p(returns)))
+        state["log_growth"] = float(np.log(wealth[-1]))
+        peaks = np.maximum.accumulate(np.concatenate(([state["peak"]], wealth)))[1:]
+        drawdowns = wealth / peaks - 1.0
+        worst = int(np.argmin(drawdowns))
+        if drawdowns[worst] < state["max_drawdown"]:
+            state["max_drawdown"] = float(drawdowns[worst])
+            # The peak for that trough is the last day ≤ trough whose wealth equals the running peak
+            at_peak = np.nonzero(wealth[: worst + 1] >= peaks[worst])[0]
+            state["drawdown_peak"] = days[at_peak[-1]].date().isoformat() if len(at_peak) else state["peak_date"]
+            state["drawdown_trough"] = days[worst].date().isoformat()
+        new_peak = np.nonzero(wealth >= peaks)[0]
+        if len(new_peak):
+            state["peak_date"] = days[new_peak[-1]].date().isoformat()
+        state["peak"] = float(peaks[-1])
+
+        best, worst_day = int(np.argmax(returns)), int(np.argmin(returns))
+        if state["best_day"] is None or returns[best] > state["best_day"]["value"]:
+            state["best_day"] = {"date": days[best].date().isoformat(), "value": float(returns[best])}
+        if state["worst_day"] is None or returns[worst_day] < state["worst_day"]["value"]:
+            state["worst_day"] = {"date": days[worst_day].date().isoformat(), "value": float(returns[worst_day])}
+
+        keep = max(ROLLING_WINDOWS.values()) + 1
+        state["window"] = (state["window"] + wealth.tolist())[-keep:]
+
+    state["last_timestamp"] = timestamps[-1].isoformat()
+    state["last_value"] = float(values[-1])
+    return state
+
+def metrics(state: dict) -> dict:
+    """Annualized statistics from the running sums (None where there is not enough data)"""
+    n = state["n"]
+    total_return = float(np.expm1(state["log_growth"])) if n else None
+    mean = state["sum_r"] / n if n else None
+    volatility = sharpe = sortino = annualized = None
+    rf_daily = RISK_FREE_RATE / TRADING_DAYS
+
+    if n:
+        annualized = float(np.expm1(state["log_growth"] * TRADING_DAYS / n))
+    if n > 1:
+        variance = max((state["sum_r2"] - n * mean * mean) / (n - 1), 0.0)
+        daily_vol = variance ** 0.5
+        volatility = daily_vol * TRADING_DAYS ** 0.5
+        if daily_vol > 0:
+            sharpe = (mean - rf_daily) / daily_vol * TRADING_DAYS ** 0.5
+        downside = (state["sum_down2"] / n) ** 0.5
+        if downside > 0:
+            sortino = (mean - rf_daily) / downside * TRADING_DAYS ** 0.5
+
+    window = state["window"]
+    rolling = {
+        label: (window[-1] / window[-1 - days] - 1.0) if len(window) > days else None
+        for label, days in ROLLING_WINDOWS.items()
+    }
+
+    return {
+        "start_date": state["first_date"],
+        "as_of": state["last_timestamp"],
+        "days": n,
+        "total_return": total_return,
+        "annualized_return": annualized,
+        "volatility": volatility,
+        "sharpe": sharpe,
+        "sortino": sortino,
+        "max_drawdown": state["max_drawdown"] if n else None,
+        "max_drawdown_peak": state["drawdown_peak"],
+        "max_drawdown_trough": state["drawdown_trough"],
+        "best_day": state["best_day"],
+        "worst_day": state["worst_day"],
+        "rolling_returns": rolling,
+        "risk_free_rate": RISK_FREE_RATE,
+    }
+
+def _redis_json(key: str) -> Optional[dict]:
+    try:
+        value = r.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Analytics cache read failed for {key}: {e}")
+        return None
+    return json.loads(value) if value else None
+
+def _redis_set(key: str, payload: dict):
+    try:
+        r.set(key, json.dumps(payload))
+    except redis.RedisError as e:
+        logger.warning(f"Analytics cache write failed for {key}: {e}")
+
+def analytics_epoch() -> int:
+    try:
+        value = r.get(ANALYTICS_EPOCH_KEY)
+        return int(value) if value else 0
+    except redis.RedisError:
+        return 0
+
+def invalidate_analytics() -> None:
+    """Call after rewriting past EOD rows (backfill) – every portfolio recomputes from scratch next time"""
+    try:
+        r.incr(ANALYTICS_EPOCH_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Analytics epoch bump failed: {e}")
+
+def latest_eod_timestamp(db: Session, portfolio_id: int) -> Optional[datetime]:
+    row = db.query(PortfolioHistory.timestamp)\
+            .filter(PortfolioHistory.portfolio_id == portfolio_id, PortfolioHistory.is_eod == True)\
+            .order_by(PortfolioHistory.timestamp.desc())\
+            .first()
+    return row[0] if row else None
+
+def _eod_rows_after(db: Session, portfolio_id: int, after: Optional[datetime]):
+    query = db.query(PortfolioHistory.timestamp, PortfolioHistory.total_value)\
+              .filter(PortfolioHistory.portfolio_id == portfolio_id, PortfolioHistory.is_eod == True)
+    if after is not None:
+        query = query.filter(PortfolioHistory.timestamp > after)
+    return query.order_by(PortfolioHistory.timestamp.asc()).all()
+
+def _toronto_date(ts: datetime) -> date:
+    return pytz.utc.localize(ts).astimezone(pytz.timezone(MARKET_TZ)).date()
+
+def _daily_flows(db: Session, portfolio_id: int, after: Optional[datetime], timestamps: List[datetime]) -> np.ndarray:
+    """Ledger flows summed onto the first EOD row on or after their date (flows after the last row wait)"""
+    flows = np.zeros(len(timestamps))
+    if not timestamps:
+        return flows
+    days = np.array([_toronto_date(ts) for ts in timestamps], dtype="datetime64[D]")
+    ledger = load_cash_flows(
+        db, [portfolio_id],
+        after=_toronto_date(after) if after is not None else None,
+        through=days[-1].astype(object),
+    )
+    if ledger:
+        rows = np.searchsorted(days, np.array([f.date for f in ledger], dtype="datetime64[D]"), side="left")
+        np.add.at(flows, rows, amounts_cad(db, ledger))
+    return flows
+
+def _state_key(portfolio_id: int) -> str:
+    return f"analytics:state:{portfolio_id}"
+
+def invalidate_portfolio_analytics(portfolio_id: int) -> None:
+    """Call after the portfolio's cash-flow ledger changes – its state is rebuilt on next read"""
+    try:
+        r.delete(_state_key(portfolio_id))
+    except redis.RedisError as e:
+        logger.warning(f"Analytics state invalidation failed for portfolio {portfolio_id}: {e}")
+
+def get_portfolio_analytics(db: Session, portfolio_id: int) -> Optional[dict]:
+    """
+    Metrics since inception for one portfolio (None without EOD history). The cached state already holds
+    every running sum, so when it is current the result is O(1); otherwise only newer EOD rows are folded.
+    """
+    latest = latest_eod_timestamp(db, portfolio_id)
+    if latest is None:
+        return None
+
+    epoch = analytics_epoch()
+    state = _redis_json(_state_key(portfolio_id))
+    if state is None or state.get("epoch") != epoch:
+        state = empty_state()
+        state["epoch"] = epoch
+
+    if state["last_timestamp"] != latest.isoformat():
+        after = datetime.fromisoformat(state["last_timestamp"]) if state["last_timestamp"] else None
+        rows = _eod_rows_after(db, portfolio_id, after)
+        timestamps = [row.timestamp for row in rows]
+        state = fold(
+            state,
+            timestamps,
+            np.array([row.total_value or 0.0 for row in rows], dtype=np.float64),
+            _daily_flows(db, portfolio_id, after, timestamps),
+        )
+        _redis_set(_state_key(portfolio_id), state)
+
+    return {"portfolio_id": portfolio_id, **metrics(state)}
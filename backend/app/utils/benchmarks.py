@@ -0,0 +1,150 @@
+# backend/app/utils/benchmarks.py (NEW – portfolio / global EOD series vs benchmark indices)
+# - Benchmarks (BENCHMARK_SYMBOLS) live in the local price warehouse and are refreshed by the nightly
+#   warehouse task like any held symbol – requests never call a price provider (a benchmark missing from
+#   the warehouse is backfilled once)
+# - Benchmark closes are aligned to the EOD dates (last close on or before each date) and measured in CAD,
+#   like the portfolios: foreign benchmarks are converted at each date's rate from the FX history table
+# - Portfolio returns remove ledger cash flows (same rule as the TWR analytics); beta, alpha, correlation,
+#   tracking error and information ratio are computed for all benchmarks at once (masked per benchmark)
+from sqlalchemy.orm import Session
+from app.models import PortfolioHistory, GlobalHistory
+from app.utils.price_warehouse import load_price_matrix, read_manifest, update_warehouse
+from app.utils.cash_flows import load_cash_flows, amounts_cad
+from app.utils.analytics import RISK_FREE_RATE, TRADING_DAYS
+from app.utils.history import MARKET_TZ
+from app.utils.fx import currency_from_suffix, price_unit
+from app.utils.fx_history import conversion_series
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+import pytz
+import os
+
+BENCHMARK_SYMBOLS = [s.strip().upper() for s in os.getenv("BENCHMARK_SYMBOLS", "XIC.TO,SPY").split(",") if s.strip()]
+# Calendar days loaded before the first EOD date so it has a benchmark close to align to
+PRICE_LOOKBACK_MARGIN = timedelta(days=10)
+
+def _toronto_dates(timestamps: List[datetime]) -> np.ndarray:
+    tz = pytz.timezone(MARKET_TZ)
+    return np.array([pytz.utc.localize(ts).astimezone(tz).date() for ts in timestamps], dtype="datetime64[D]")
+
+def eod_series(db: Session, portfolio_id: Optional[int], start: Optional[datetime]):
+    """(dates, CAD values, ledger flows per date) of one portfolio's – or the global – EOD snapshots"""
+    model = GlobalHistory if portfolio_id is None else PortfolioHistory
+    query = db.query(model.timestamp, model.total_value).filter(model.is_eod == True)
+    if portfolio_id is not None:
+        query = query.filter(model.portfolio_id == portfolio_id)
+    if start is not None:
+        query = query.filter(model.timestamp >= start)
+    rows = query.order_by(model.timestamp.asc()).all()
+
+    dates = _toronto_dates([row.timestamp for row in rows])
+    values = np.array([row.total_value or 0.0 for row in rows], dtype=np.float64)
+    flows = np.zeros(len(rows))
+    if len(rows) > 1:
+        ledger = load_cash_flows(
+            db, [portfolio_id] if portfolio_id is not None else None,
+            after=dates[0].astype(object), through=dates[-1].astype(object),
+        )
+        if ledger:
+            # Flows count on the first EOD date on or after the day they happened
+            np.add.at(flows, np.searchsorted(dates, np.array([f.date for f in ledger], dtype="datetime64[D]")), amounts_cad(db, ledger))
+    return dates, values, flows
+
+def ensure_benchmarks(symbols: List[str]) -> None:
+    """One-time warehouse backfill for configured benchmarks the nightly task hasn't stored yet"""
+    manifest = read_manifest()
+    missing = [s for s in symbols if s not in manifest]
+    if missing:
+        update_warehouse(missing, date.today() - timedelta(days=1))
+
+def benchmark_prices(db: Session, symbols: List[str], dates: np.ndarray) -> np.ndarray:
+    """(len(dates), len(symbols)) CAD closes – last warehouse close on or before each date, NaN before the first"""
+    first, last = dates[0].astype(object) - PRICE_LOOKBACK_MARGIN, dates[-1].astype(object)
+    price_dates, prices = load_price_matrix(symbols, first, last, field="adj_close")
+    if len(price_dates) == 0:
+        return np.full((len(dates), len(symbols)), np.nan)
+
+    pos = np.searchsorted(price_dates, dates, side="right") - 1
+    aligned = np.where((pos >= 0)[:, None], prices[np.clip(pos, 0, None)], np.nan)
+    # CAD per unit of each benchmark's quote currency on every date
+    to_cad = conversion_series(db, dates, [currency_from_suffix(s) for s in symbols])
+    units = np.array([price_unit(s) for s in symbols])
+    return aligned * units * to_cad
+
+def _finite(value) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+def _index(returns: np.ndarray) -> np.ndarray:
+    """Growth of 100 along axis 0 (NaN returns hold the level flat)"""
+    return 100.0 * np.concatenate([np.ones((1,) + returns.shape[1:]), np.cumprod(1.0 + np.nan_to_num(returns), axis=0)])
+
+def compare(dates: np.ndarray, values: np.ndarray, flows: np.ndarray, symbols: List[str], prices: np.ndarray) -> dict:
+    """Date-aligned growth-of-100 series and per-benchmark statistics"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        portfolio = np.where(values[:-1] > 0, (values[1:] - flows[1:]) / values[:-1] - 1.0, np.nan)
+        bench = prices[1:] / prices[:-1] - 1.0
+    bench[~np.isfinite(bench)] = np.nan
+
+    # Per-benchmark statistics on the sessions where both the portfolio and that benchmark have a return
+    valid = np.isfinite(portfolio)[:, None] & np.isfinite(bench)
+    n = valid.sum(axis=0)
+    rp = np.where(valid, portfolio[:, None], 0.0)
+    rb = np.where(valid, bench, 0.0)
+    rf = RISK_FREE_RATE / TRADING_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_p, mean_b = rp.sum(axis=0) / n, rb.sum(axis=0) / n
+        dev_p = np.where(valid, rp - mean_p, 0.0)
+        dev_b = np.where(valid, rb - mean_b, 0.0)
+        var_p = (dev_p ** 2).sum(axis=0) / (n - 1)
+        var_b = (dev_b ** 2).sum(axis=0) / (n - 1)
+        cov = (dev_p * dev_b).sum(axis=0) / (n - 1)
+        beta = cov / var_b
+        correlation = cov / np.sqrt(var_p * var_b)
+        alpha = ((mean_p - rf) - beta * (mean_b - rf)) * TRADING_DAYS
+        active = dev_p - dev_b
+        tracking = np.sqrt((active ** 2).sum(axis=0) / (n - 1)) * np.sqrt(TRADING_DAYS)
+        information = (mean_p - mean_b) * TRADING_DAYS / tracking
+    total_p = np.expm1(np.log1p(rp).sum(axis=0))
+    total_b = np.expm1(np.log1p(rb).sum(axis=0))
+
+    stats = []
+    for i, symbol in enumerate(symbols):
+        entry = {"symbol": symbol, "observations": int(n[i])}
+        if n[i] >= 2:
+            entry.update({
+                "beta": _finite(beta[i]),
+                "alpha": _finite(alpha[i]),
+                "correlation": _finite(correlation[i]),
+                "tracking_error": _finite(tracking[i]),
+                "information_ratio": _finite(information[i]),
+                "portfolio_return": float(total_p[i]),
+                "benchmark_return": float(total_b[i]),
+                "excess_return": float(total_p[i] - total_b[i]),
+            })
+        stats.append(entry)
+
+    bench_index = _index(bench)
+    return {
+        "dates": [str(d) for d in dates],
+        "portfolio": np.round(_index(portfolio), 4).tolist(),
+        "benchmarks": {
+            symbol: [round(float(v), 4) if np.isfinite(p) else None for v, p in zip(bench_index[:, i], prices[:, i])]
+            for i, symbol in enumerate(symbols)
+        },
+        "stats": stats,
+    }
+
+def benchmark_comparison(db: Session, portfolio_id: Optional[int], symbols: List[str], start: Optional[datetime]) -> Optional[dict]:
+    """None when there are fewer than two EOD snapshots in the range"""
+    dates, values, flows = eod_series(db, portfolio_id, start)
+    if len(dates) < 2:
+        return None
+    ensure_benchmarks(symbols)
+    return {"portfolio_id": portfolio_id, **compare(dates, values, flows, symbols, benchmark_prices(db, symbols, dates))}
+
+def warehouse_marker(symbols: List[str]) -> str:
+    """Newest stored date across the benchmarks – part of the response cache key"""
+    manifest = read_manifest()
+    stored = [manifest[s] for s in symbols if s in manifest]
+    return max(stored).isoformat() if stored else "none"
@@ -0,0 +1,47 @@
+# backend/app/utils/cash_flows.py (NEW – portfolio cash-flow ledger helpers shared by XIRR and TWR analytics)
+# - Amounts are stored in their own currency; foreign flows are converted at the flow date's rate from the
+#   FX history table (utils.fx_history – cached FX matrix rate when no close is stored for that day)
+from sqlalchemy.orm import Session
+from app.models import PortfolioCashFlow
+from app.utils.fx import REPORTING_CURRENCY
+from app.utils.fx_history import conversion_series
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
+
+def load_cash_flows(
+    db: Session,
+    portfolio_ids: Optional[List[int]] = None,
+    after: Optional[date] = None,
+    through: Optional[date] = None,
+) -> List[PortfolioCashFlow]:
+    """Flows ordered by (portfolio, date) – `after` exclusive, `through` inclusive"""
+    query = db.query(PortfolioCashFlow)
+    if portfolio_ids is not None:
+        query = query.filter(PortfolioCashFlow.portfolio_id.in_(portfolio_ids))
+    if after is not None:
+        query = query.filter(PortfolioCashFlow.date > after)
+    if through is not None:
+        query = query.filter(PortfolioCashFlow.date <= through)
+    return query.order_by(PortfolioCashFlow.portfolio_id, PortfolioCashFlow.date, PortfolioCashFlow.id).all()
+
+def amounts_cad(db: Session, flows: List[PortfolioCashFlow]) -> np.ndarray:
+    """CAD amount of every flow (same order as `flows`)"""
+    amounts = np.array([f.amount for f in flows], dtype=np.float64)
+    currencies = [f.currency.value for f in flows]
+    foreign = np.array([c != REPORTING_CURRENCY for c in currencies], dtype=bool)
+    if not foreign.any():
+        return amounts
+
+    # Rate into CAD for every (flow date, currency) in one lookup, then each flow picks its own currency
+    needed = sorted(set(currencies))
+    rates = conversion_series(db, np.array([f.date for f in flows], dtype="datetime64[D]"), needed)
+    source = np.array([needed.index(c) for c in currencies], dtype=np.int64)
+    return amounts * rates[np.arange(len(flows)), source]
+
+def flows_by_portfolio(db: Session, flows: List[PortfolioCashFlow]) -> Dict[int, List[tuple]]:
+    """{portfolio_id: [(date, cad_amount), ...]} in date order"""
+    grouped: Dict[int, List[tuple]] = {}
+    for flow, amount in zip(flows, amounts_cad(db, flows)):
+        grouped.setdefault(flow.portfolio_id, []).append((flow.date, float(amount)))
+    return grouped
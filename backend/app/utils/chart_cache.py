@@ -0,0 +1,66 @@
+# backend/app/utils/chart_cache.py (NEW – Redis cache for downsampled chart series)
+# - History series keys embed a version counter that the snapshot/rollup tasks bump after each commit,
+#   so new snapshots invalidate every cached history chart at once (old keys just expire)
+# - Day charts key on the holding's last_price_update instead (changes whenever day_chart is rewritten)
+# - Series that net out cash flows (benchmarks) also embed the ledger version, bumped on every ledger edit
+# - Redis errors degrade to cache misses
+from app.redis_client import r
+from typing import Optional
+import redis
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_TTL_SECONDS = int(os.getenv("CHART_CACHE_TTL_SECONDS", "3600"))
+
+HISTORY_VERSION_KEY = "chart:history:version"
+LEDGER_VERSION_KEY = "chart:ledger:version"
+
+def _version(key: str) -> int:
+    try:
+        value = r.get(key)
+        return int(value) if value else 0
+    except redis.RedisError as e:
+        logger.warning(f"Chart cache version read failed for {key}: {e}")
+        return 0
+
+def _bump(key: str) -> None:
+    try:
+        r.incr(key)
+    except redis.RedisError as e:
+        logger.warning(f"Chart cache version bump failed for {key}: {e}")
+
+def history_version() -> int:
+    return _version(HISTORY_VERSION_KEY)
+
+def bump_history_version() -> None:
+    """Call after committing new history rows"""
+    _bump(HISTORY_VERSION_KEY)
+
+def ledger_version() -> int:
+    return _version(LEDGER_VERSION_KEY)
+
+def bump_ledger_version() -> None:
+    """Call after committing a cash-flow ledger change"""
+    _bump(LEDGER_VERSION_KEY)
+
+def chart_cache_key(series: str, version, **params) -> str:
+    """chart:<series>:v<version>:<sorted non-empty params>"""
+    parts = [f"{k}={params[k]}" for k in sorted(params) if params[k] is not None]
+    return f"chart:{series}:v{version}:" + "&".join(parts)
+
+def get_cached_chart(key: str) -> Optional[dict]:
+    try:
+        value = r.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Chart cache read failed for {key}: {e}")
+        return None
+    return json.loads(value) if value else None
+
+def set_cached_chart(key: str, payload: dict) -> None:
+    try:
+        r.set(key, json.dumps(payload), ex=CHART_CACHE_TTL_SECONDS)
+    except redis.RedisError as e:
+        logger.warning(f"Chart cache write failed for {key}: {e}")
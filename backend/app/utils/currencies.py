@@ -0,0 +1,22 @@
+# backend/app/utils/currencies.py (NEW – quote currency / price unit of a symbol from its exchange suffix)
+# - Leaf module (no app imports) so models-level helpers, routers and utils.fx can all use it without cycles
+# - .TO/.V/.NE/.CN = CAD, .L = GBP (quoted in pence), .AX = AUD, European exchanges = EUR, no suffix = USD
+SUFFIX_CURRENCIES = {
+    ".TO": "CAD", ".V": "CAD", ".NE": "CAD", ".CN": "CAD",
+    ".L": "GBP",
+    ".AX": "AUD",
+    ".PA": "EUR", ".DE": "EUR", ".AS": "EUR", ".MI": "EUR", ".MC": "EUR",
+}
+# Exchanges quoting in a minor unit (LSE: pence)
+SUFFIX_PRICE_UNITS = {".L": 0.01}
+
+def symbol_suffix(symbol: str) -> str:
+    symbol = symbol.upper()
+    return symbol[symbol.rfind("."):] if "." in symbol else ""
+
+def currency_from_suffix(symbol: str) -> str:
+    return SUFFIX_CURRENCIES.get(symbol_suffix(symbol), "USD")
+
+def price_unit(symbol: str) -> float:
+    """Currency units per quoted price unit (0.01 for pence-quoted listings)"""
+    return SUFFIX_PRICE_UNITS.get(symbol_suffix(symbol), 1.0)
@@ -0,0 +1,267 @@
+# backend/app/utils/dividends.py (NEW – dividend calendar: cached payment history, frequency inference, 12-month income forecast)
+# - dividend_events is filled per symbol from FMP /dividends (ex-date, pay date, amount) with Yahoo's ex-date
+#   series as fallback; refresh_symbol_info only re-fetches a symbol when Yahoo reports an ex-date newer than
+#   the last stored one, so the history is downloaded once per declaration – never on the request path
+# - Frequency = median gap of the latest ex-dates snapped to monthly / quarterly / semi-annual / annual; future
+#   payments repeat that cadence from the last event with its latest regular amount (specials are skipped)
+#   and the symbol's median ex → pay lag
+# - dividend_calendar() loads every held symbol's events in one query and builds the (holdings × months) CAD
+#   matrix with NumPy; symbols without a usable schedule fall back to annual rate / 12 (the budget estimate)
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models import DividendEvent, Holding
+from app.utils.fmp import get_fmp_client
+from app.utils.yahoo import fetch_yahoo_dividends
+from app.utils.fx import FxMatrix, conversion_factors
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import requests
+import warnings
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Events kept per symbol (older ones say nothing about the current schedule)
+DIVIDEND_HISTORY_YEARS = int(os.getenv("DIVIDEND_HISTORY_YEARS", "5"))
+FORECAST_MONTHS = 12
+# Latest events / gaps used for the schedule (13 events = one year of a monthly payer)
+SCHEDULE_EVENTS = 13
+SCHEDULE_GAPS = 6
+# Payments per year the inferred gap is snapped to
+FREQUENCIES = np.array([12, 4, 2, 1])
+# Ex → pay lag when the provider never reported a payment date
+DEFAULT_PAY_LAG_DAYS = 14
+# A payment this many times the trailing median is a special – not repeated in the forecast
+SPECIAL_DIVIDEND_RATIO = 2.0
+# Schedules whose last ex-date is more than this many periods old are treated as suspended
+STALE_PERIODS = 2.0
+# Cap on the annualized dividend growth used for projections (a cut or a special distorts short histories)
+DIVIDEND_GROWTH_CAP = 0.25
+
+def fetch_dividend_history(symbol: str) -> List[dict]:
+    """[{"ex_date", "pay_date", "amount"}] oldest first – FMP (has pay dates), Yahoo when FMP has nothing"""
+    try:
+        events = [
+            {
+                "ex_date": date.fromisoformat(item["date"]),
+                "pay_date": date.fromisoformat(item["paymentDate"]) if item.get("paymentDate") else None,
+                "amount": float(item["dividend"]),
+            }
+            for item in get_fmp_client().dividends(symbol)
+            if item.get("date") and item.get("dividend")
+        ]
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"FMP dividend history failed for {symbol}: {e}")
+        events = []
+    if not events:
+        events = fetch_yahoo_dividends(symbol)
+    cutoff = date.today() - timedelta(days=365 * DIVIDEND_HISTORY_YEARS)
+    return sorted((e for e in events if e["ex_date"] >= cutoff), key=lambda e: e["ex_date"])
+
+def latest_ex_dates(db: Session, symbols: Iterable[str]) -> Dict[str, date]:
+    """{symbol: newest stored ex-date}"""
+    rows = db.query(DividendEvent.symbol, func.max(DividendEvent.ex_date))\
+             .filter(DividendEvent.symbol.in_(list(symbols)))\
+             .group_by(DividendEvent.symbol)\
+             .all()
+    return {symbol: ex_date for symbol, ex_date in rows}
+
+def store_dividend_events(db: Session, history: Dict[str, List[dict]]) -> int:
+    """Bulk upsert of {symbol: events} (pay dates / amounts of known ex-dates are overwritten); caller commits"""
+    rows = {(symbol, e["ex_date"]): {"symbol": symbol, **e} for symbol, events in history.items() for e in events}
+    if not rows:
+        return 0
+    rows = list(rows.values())
+    for i in range(0, len(rows), 5000):
+        stmt = pg_insert(DividendEvent).values(rows[i:i + 5000])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DividendEvent.symbol, DividendEvent.ex_date],
+            set_={"pay_date": stmt.excluded.pay_date, "amount": stmt.excluded.amount},
+        ))
+    return len(rows)
+
+def event_matrices(db: Session, symbols: List[str], width: Optional[int] = SCHEDULE_EVENTS):
+    """
+    Right-aligned (symbols × width) ex-day / amount / pay-lag arrays of the latest events, NaN padded
+    (days since epoch). width=None keeps every stored event.
+    """
+    rows = db.query(DividendEvent.symbol, DividendEvent.ex_date, DividendEvent.pay_date, DividendEvent.amount)\
+             .filter(DividendEvent.symbol.in_(symbols))\
+             .order_by(DividendEvent.symbol, DividendEvent.ex_date)\
+             .all()
+
+    grouped: Dict[str, list] = {}
+    for row in rows:
+        grouped.setdefault(row.symbol, []).append(row)
+    if width is None:
+        width = max((len(events) for events in grouped.values()), default=1)
+    shape = (len(symbols), width)
+    ex, amounts, lags = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    epoch = date(1970, 1, 1)
+    for i, symbol in enumerate(symbols):
+        events = grouped.get(symbol, [])[-width:]
+        if not events:
+            continue
+        cols = slice(width - len(events), width)
+        ex[i, cols] = [(e.ex_date - epoch).days for e in events]
+        amounts[i, cols] = [e.amount for e in events]
+        lags[i, cols] = [(e.pay_date - e.ex_date).days if e.pay_date else np.nan for e in events]
+    return ex, amounts, lags
+
+def infer_schedules(db: Session, symbols: List[str], today: date) -> Dict[str, np.ndarray]:
+    """
+    Per symbol (aligned to `symbols`): frequency (payments / year, 0 = no usable schedule), last ex / pay day,
+    last amount (declared, may be special), regular amount and pay lag – all as arrays.
+    """
+    ex, amounts, lags = event_matrices(db, symbols)
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # nanmedian of symbols without history
+        gaps = np.diff(ex, axis=1)[:, -SCHEDULE_GAPS:]
+        median_gap = np.nanmedian(gaps, axis=1)
+        periods = 365.25 / FREQUENCIES
+        nearest = np.argmin(np.abs(np.nan_to_num(median_gap, nan=0.0)[:, None] - periods[None, :]), axis=1)
+        frequency = np.where(np.isnan(median_gap), 0, FREQUENCIES[nearest])
+        period = np.where(frequency > 0, 365.25 / np.maximum(frequency, 1), np.nan)
+
+        # Regular amount: latest payment unless it is a special vs the trailing year's median
+        last_amount = amounts[:, -1]
+        year = np.arange(SCHEDULE_EVENTS)[None, :] >= SCHEDULE_EVENTS - np.maximum(frequency, 1)[:, None]
+        trailing = np.nanmedian(np.where(year, amounts, np.nan), axis=1)
+        regular = np.where(last_amount > SPECIAL_DIVIDEND_RATIO * trailing, trailing, last_amount)
+
+        lag = np.nanmedian(lags, axis=1)
+        lag = np.where(np.isnan(lag), DEFAULT_PAY_LAG_DAYS, np.round(lag))
+
+    last_ex = ex[:, -1]
+    last_pay = np.where(np.isnan(lags[:, -1]), last_ex + lag, last_ex + lags[:, -1])
+    # Missed STALE_PERIODS payments → dividend suspended (or our history is stale): no schedule
+    today_day = (today - date(1970, 1, 1)).days
+    stale = today_day - last_ex > STALE_PERIODS * period
+    frequency = np.where(stale, 0, frequency)
+    return {
+        "frequency": frequency.astype(np.int64),
+        "period": period,
+        "last_ex": last_ex,
+        "last_pay": last_pay,
+        "last_amount": last_amount,
+        "regular": regular,
+        "lag": lag,
+    }
+
+def dividend_growth_rates(db: Session, symbols: List[str]) -> np.ndarray:
+    """
+    Annualized growth of trailing-12-month dividends per symbol (aligned to `symbols`), comparing the latest
+    year with the oldest earlier year holding the same number of payments. NaN without such a year.
+    """
+    ex, amounts, _ = event_matrices(db, symbols, width=None)
+    years = np.arange(DIVIDEND_HISTORY_YEARS)
+    # Yearly windows ending a month after the last ex-date, so a slightly late payment stays in its year
+    hi = ex[:, -1][:, None] + 30 - 365.25 * years[None, :]
+    in_window = (ex[:, :, None] > (hi - 365.25)[:, None, :]) & (ex[:, :, None] <= hi[:, None, :])
+    ttm = np.where(in_window, np.nan_to_num(amounts)[:, :, None], 0.0).sum(axis=1)
+    counts = in_window.sum(axis=1)
+
+    usable = (counts == counts[:, :1]) & (ttm > 0) & (years[None, :] > 0)
+    oldest = np.where(usable.any(axis=1), usable.shape[1] - 1 - np.argmax(usable[:, ::-1], axis=1), 0)
+    rows = np.arange(len(symbols))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (ttm[:, 0] / ttm[rows, oldest]) ** (1.0 / np.maximum(oldest, 1)) - 1.0
+    growth = np.where(oldest > 0, growth, np.nan)
+    return np.clip(growth, -DIVIDEND_GROWTH_CAP, DIVIDEND_GROWTH_CAP)
+
+def _to_date(day: float) -> Optional[date]:
+    return date(1970, 1, 1) + timedelta(days=int(day)) if np.isfinite(day) else None
+
+def dividend_calendar(
+    db: Session,
+    holdings: List[Holding],
+    portfolios: Dict[int, str],
+    fx: FxMatrix,
+    today: Optional[date] = None,
+) -> dict:
+    """Month-by-month CAD income for the next FORECAST_MONTHS months per holding, portfolio and in total"""
+    today = today or date.today()
+    first_month = np.datetime64(today, "M")
+    months = [str(first_month + m) for m in range(FORECAST_MONTHS)]
+    holdings = [h for h in holdings if (h.quantity or 0) > 0]
+
+    symbols = sorted({h.symbol.upper() for h in holdings})
+    schedules = infer_schedules(db, symbols, today)
+    row = np.array([symbols.index(h.symbol.upper()) for h in holdings], dtype=np.int64)
+    s = {key: values[row] for key, values in schedules.items()}  # per holding
+
+    quantity = np.array([h.quantity for h in holdings], dtype=np.float64)
+    factors = conversion_factors([h.symbol for h in holdings], currencies=[h.currency.value for h in holdings], fx=fx)
+    annual_rate = np.array([h.dividend_annual_per_share or 0.0 for h in holdings], dtype=np.float64)
+    manual = np.array([bool(getattr(h, "is_dividend_manual", False)) for h in holdings], dtype=bool)
+    scheduled = s["frequency"] > 0
+
+    # Payment k = 0 is the last declared event (counted if still unpaid), k ≥ 1 repeat the cadence
+    k = np.arange(FORECAST_MONTHS + 2)[None, :]
+    with np.errstate(invalid="ignore"):
+        ex_days = s["last_ex"][:, None] + np.round(k * s["period"][:, None])
+        pay_days = np.where(k == 0, s["last_pay"][:, None], ex_days + s["lag"][:, None])
+    per_share = np.where(k == 0, s["last_amount"][:, None], s["regular"][:, None])
+    # Manual overrides keep the inferred dates but spread the entered annual rate over the payments
+    per_share = np.where(manual[:, None], (annual_rate / np.maximum(s["frequency"], 1))[:, None], per_share)
+
+    pay_dates = np.where(np.isfinite(pay_days), pay_days, 0).astype(np.int64).astype("datetime64[D]")
+    month = (pay_dates.astype("datetime64[M]") - first_month).astype(np.int64)
+    today_day = np.datetime64(today, "D")
+    counted = scheduled[:, None] & np.isfinite(pay_days) & (pay_dates >= today_day) & (month < FORECAST_MONTHS)
+
+    monthly = np.zeros((len(holdings), FORECAST_MONTHS))
+    h_idx, p_idx = np.nonzero(counted)
+    np.add.at(monthly, (h_idx, month[h_idx, p_idx]), (per_share * quantity[:, None] * factors[:, None])[h_idx, p_idx])
+    # No schedule: the budget's even annual / 12 estimate
+    monthly[~scheduled] = (annual_rate * quantity * factors)[~scheduled, None] / 12
+
+    # Next upcoming payment per holding (first counted k)
+    first_k = np.where(counted.any(axis=1), counted.argmax(axis=1), -1)
+
+    portfolio_ids = list(portfolios)
+    portfolio_index = {pid: i for i, pid in enumerate(portfolio_ids)}
+    membership = np.zeros((len(portfolio_ids), len(holdings)))
+    for j, h in enumerate(holdings):
+        if h.portfolio_id in portfolio_index:
+            membership[portfolio_index[h.portfolio_id], j] = 1.0
+    by_portfolio = membership @ monthly
+
+    holding_rows = []
+    for j, h in enumerate(holdings):
+        next_k = first_k[j]
+        holding_rows.append({
+            "holding_id": h.id,
+            "portfolio_id": h.portfolio_id,
+            "symbol": h.symbol,
+            "quantity": h.quantity,
+            "frequency": int(s["frequency"][j]) or None,
+            "basis": "schedule" if scheduled[j] else "estimate",
+            "is_manual": bool(manual[j]),
+            "next_ex_date": _to_date(ex_days[j, next_k]) if next_k >= 0 else None,
+            "next_pay_date": _to_date(pay_days[j, next_k]) if next_k >= 0 else None,
+            "next_amount_per_share": round(float(per_share[j, next_k]), 6) if next_k >= 0 else None,
+            "monthly_cad": np.round(monthly[j], 2).tolist(),
+            "annual_cad": round(float(monthly[j].sum()), 2),
+        })
+    holding_rows.sort(key=lambda item: item["annual_cad"], reverse=True)
+
+    total = monthly.sum(axis=0)
+    return {
+        "months": months,
+        "total_monthly_cad": np.round(total, 2).tolist(),
+        "total_annual_cad": round(float(total.sum()), 2),
+        "portfolios": [
+            {
+                "portfolio_id": pid,
+                "name": portfolios[pid],
+                "monthly_cad": np.round(by_portfolio[i], 2).tolist(),
+                "annual_cad": round(float(by_portfolio[i].sum()), 2),
+            }
+            for i, pid in enumerate(portfolio_ids)
+        ],
+        "holdings": holding_rows,
+    }
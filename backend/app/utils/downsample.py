@@ -0,0 +1,56 @@
+# backend/app/utils/downsample.py (NEW – Largest-Triangle-Three-Buckets downsampling for chart series)
+# - First and last points are always kept; the middle is split into max_points - 2 equal buckets
+# - Per bucket, the point forming the largest triangle with the previously kept point and the
+#   next bucket's average wins (keeps peaks/troughs, unlike plain striding or averaging)
+# - Bucket averages are computed up front with cumulative sums; each bucket's triangle areas are one vector op
+import numpy as np
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices (ascending) of the points LTTB keeps – all of them when the series already fits"""
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket b covers [edges[b], edges[b + 1]) of the interior points 1 .. n-2
+    n_buckets = max_points - 2
+    edges = (np.floor(np.arange(n_buckets + 1) * (n - 2) / n_buckets) + 1).astype(np.int64)
+    edges[-1] = n - 1
+
+    # Average of every bucket via prefix sums, plus the last point as the "next bucket" of the final one
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = edges[1:] - edges[:-1]
+    avg_x = np.append((cx[edges[1:]] - cx[edges[:-1]]) / sizes, x[-1])
+    avg_y = np.append((cy[edges[1:]] - cy[edges[:-1]]) / sizes, y[-1])
+
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for b in range(n_buckets):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        # Twice the triangle area (a, candidate, next-bucket average) – the factor doesn't change argmax
+        area = np.abs((x[a] - avg_x[b + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[b + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+def downsample(
+    items: Sequence[T],
+    max_points: int,
+    x: Callable[[T], float],
+    y: Callable[[T], float],
+) -> List[T]:
+    """LTTB over arbitrary rows/points – x/y pull the time axis and value out of each item"""
+    if max_points is None or len(items) <= max_points:
+        return list(items)
+    xs = np.fromiter((x(item) for item in items), dtype=np.float64, count=len(items))
+    ys = np.fromiter((y(item) or 0.0 for item in items), dtype=np.float64, count=len(items))
+    return [items[i] for i in lttb_indices(xs, ys, max_points)]
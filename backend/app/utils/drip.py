@@ -0,0 +1,156 @@
+# backend/app/utils/drip.py (NEW – dividend reinvestment (DRIP) backtest and dividend-growth projection per holding)
+# - Backtest: from `start`, every cached dividend (dividend_events) buys more shares at the warehouse close of
+#   its pay date (ex-date + usual lag when unknown) – share counts compound as cumprod(1 + amount / price)
+#   along the event axis; compared with taking the same dividends as cash. Events without a stored close to
+#   buy at (symbol not in the warehouse yet, or before its first stored day) are left out of both sides and
+#   counted as skipped
+# - Projection: the annual dividend per share grows at each symbol's historical rate (dividends.growth_rates),
+#   the price at `price_growth` (default: same rate → constant yield); dividends are reinvested `frequency`
+#   times a year. Yield on cost = projected income / today's cost basis
+# - prepare_drip() does every query / warehouse read once for all holdings; simulate_batch() runs one
+#   vectorized (holdings × events / years) batch – the router streams one batch per portfolio as NDJSON
+from sqlalchemy.orm import Session
+from app.models import Holding
+from app.utils.dividends import DEFAULT_PAY_LAG_DAYS, dividend_growth_rates, event_matrices, infer_schedules
+from app.utils.price_warehouse import load_price_matrix
+from app.utils.fx import FxMatrix, conversion_factors
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+import warnings
+
+DRIP_MAX_YEARS = 50
+# Calendar days loaded before `start` so the first reinvestment has a close to buy at
+PRICE_LOOKBACK = timedelta(days=10)
+
+def prepare_drip(
+    db: Session,
+    holdings: List[Holding],
+    fx: FxMatrix,
+    start: date,
+    today: Optional[date] = None,
+    dividend_growth: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """Per-holding input arrays (rows follow `holdings`); `dividend_growth` (fraction) overrides the history"""
+    today = today or date.today()
+    symbols = sorted({h.symbol.upper() for h in holdings})
+    col = np.array([symbols.index(h.symbol.upper()) for h in holdings], dtype=np.int64)
+
+    # Dividends since `start`, each with the close of the day it is reinvested
+    ex, amounts, lags = event_matrices(db, symbols, width=None)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # symbols without any pay date
+        lag = np.nanmedian(lags, axis=1)
+    lag = np.where(np.isnan(lag), DEFAULT_PAY_LAG_DAYS, lag)
+    reinvest_day = np.where(np.isnan(lags), ex + lag[:, None], ex + lags)
+    epoch = date(1970, 1, 1)
+    valid = (ex >= (start - epoch).days) & (reinvest_day <= (today - epoch).days)
+
+    event_price = np.full(ex.shape, np.nan)
+    price_dates, prices = load_price_matrix(symbols, start - PRICE_LOOKBACK, today, field="close")
+    if len(price_dates):
+        days = np.where(valid, reinvest_day, 0).astype(np.int64).astype("datetime64[D]")
+        pos = np.searchsorted(price_dates, days, side="right") - 1
+        event_price = np.where(valid & (pos >= 0), prices[np.clip(pos, 0, None), np.arange(len(symbols))[:, None]], np.nan)
+    skipped = valid & np.isnan(event_price)
+    valid &= ~skipped
+
+    schedules = infer_schedules(db, symbols, today)
+    growth = dividend_growth_rates(db, symbols) if dividend_growth is None else np.full(len(symbols), dividend_growth)
+    frequency = schedules["frequency"]
+    annual = np.where(frequency > 0, schedules["regular"] * frequency, np.nan)
+
+    manual = np.array([bool(getattr(h, "is_dividend_manual", False)) for h in holdings], dtype=bool)
+    rate = np.array([h.dividend_annual_per_share or 0.0 for h in holdings], dtype=np.float64)
+    # Manual overrides and symbols without a schedule use the holding's annual rate
+    annual_dps = np.where(manual | np.isnan(annual[col]), rate, annual[col])
+
+    return {
+        "holding_id": np.array([h.id for h in holdings], dtype=np.int64),
+        "symbol": np.array([h.symbol for h in holdings], dtype=object),
+        "event_amounts": np.where(valid, amounts, np.nan)[col],
+        "event_prices": event_price[col],
+        "events_skipped": skipped.sum(axis=1)[col],
+        "quantity": np.array([h.quantity or 0.0 for h in holdings], dtype=np.float64),
+        "price": np.array([h.current_price or 0.0 for h in holdings], dtype=np.float64),
+        "purchase_price": np.array([h.purchase_price or 0.0 for h in holdings], dtype=np.float64),
+        "factor": conversion_factors([h.symbol for h in holdings], currencies=[h.currency.value for h in holdings], fx=fx),
+        "annual_dps": annual_dps,
+        "frequency": np.maximum(frequency[col], 1),
+        "growth": np.nan_to_num(growth[col]),
+        "growth_known": ~np.isnan(growth[col]),
+    }
+
+def simulate_batch(inputs: Dict[str, np.ndarray], rows: np.ndarray, years: int, price_growth: Optional[float] = None) -> dict:
+    """
+    Backtest + `years`-year projection for holdings `rows` of `inputs` in one vectorized pass.
+    Returns {"holdings": [per-row dicts], "totals": {...}} with CAD values and per-year lists.
+    """
+    x = {key: values[rows] for key, values in inputs.items()}
+    quantity, factor = x["quantity"], x["factor"]
+
+    # Backtest: shares held before each event compound with every reinvested dividend
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bought = np.nan_to_num(x["event_amounts"] / x["event_prices"])  # new shares per share held
+    growth_factor = np.cumprod(1.0 + bought, axis=1)
+    held_before = quantity[:, None] * np.concatenate([np.ones((len(rows), 1)), growth_factor[:, :-1]], axis=1)
+    amounts = np.nan_to_num(x["event_amounts"])
+    drip_shares = quantity * growth_factor[:, -1] if growth_factor.shape[1] else quantity.copy()
+    reinvested = (held_before * amounts).sum(axis=1) * factor
+    cash = quantity * amounts.sum(axis=1) * factor
+    current = x["price"] * factor
+    events = (~np.isnan(x["event_amounts"])).sum(axis=1)
+
+    # Projection: year t pays annual_dps·(1+g)^t, reinvested `frequency` times at price·(1+pg)^t
+    t = np.arange(1, years + 1)[None, :]
+    price_rate = x["growth"] if price_growth is None else np.full(len(rows), price_growth)
+    dps = x["annual_dps"][:, None] * (1.0 + x["growth"][:, None]) ** t
+    price = x["price"][:, None] * (1.0 + price_rate[:, None]) ** t
+    freq = x["frequency"][:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yearly = np.where(price > 0, (1.0 + dps / (freq * price)) ** freq, 1.0)
+    shares = quantity[:, None] * np.cumprod(yearly, axis=1)
+    shares_before = np.concatenate([quantity[:, None], shares[:, :-1]], axis=1)
+    income = np.where(price > 0, shares_before * (yearly - 1.0) * price, shares_before * dps) * factor[:, None]
+    value = shares * price * factor[:, None]
+    cost = quantity * x["purchase_price"] * factor
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yoc = np.where(cost[:, None] > 0, income / cost[:, None] * 100, np.nan)
+
+    holdings = []
+    for i in range(len(rows)):
+        holdings.append({
+            "holding_id": int(x["holding_id"][i]),
+            "symbol": x["symbol"][i],
+            "dividend_growth_percent": round(float(x["growth"][i]) * 100, 4) if x["growth_known"][i] else None,
+            "annual_dividend_per_share": round(float(x["annual_dps"][i]), 6),
+            "frequency": int(x["frequency"][i]),
+            "backtest": {
+                "events": int(events[i]),
+                "events_skipped": int(x["events_skipped"][i]),
+                "start_shares": round(float(quantity[i]), 6),
+                "drip_shares": round(float(drip_shares[i]), 6),
+                "dividends_reinvested_cad": round(float(reinvested[i]), 2),
+                "dividends_cash_cad": round(float(cash[i]), 2),
+                "drip_value_cad": round(float(drip_shares[i] * current[i]), 2),
+                "cash_value_cad": round(float(quantity[i] * current[i] + cash[i]), 2),
+            },
+            "shares": np.round(shares[i], 6).tolist(),
+            "income_cad": np.round(income[i], 2).tolist(),
+            "value_cad": np.round(value[i], 2).tolist(),
+            "yield_on_cost_percent": [round(float(v), 4) if np.isfinite(v) else None for v in yoc[i]],
+        })
+
+    total_cost = float(cost.sum())
+    total_income = income.sum(axis=0)
+    return {
+        "holdings": holdings,
+        "totals": {
+            "cost_basis_cad": round(total_cost, 2),
+            "drip_value_cad": round(float((drip_shares * current).sum()), 2),
+            "cash_value_cad": round(float((quantity * current + cash).sum()), 2),
+            "income_cad": np.round(total_income, 2).tolist(),
+            "value_cad": np.round(value.sum(axis=0), 2).tolist(),
+            "yield_on_cost_percent": np.round(total_income / total_cost * 100, 4).tolist() if total_cost > 0 else None,
+        },
+    }
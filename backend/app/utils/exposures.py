@@ -0,0 +1,60 @@
+# backend/app/utils/exposures.py (NEW – look-through exposure matrices for a set of holdings)
+# Same rules as the SQL sector allocation (portfolios.sector_exposure_query), as dense NumPy matrices:
+# - holdings × symbols: a holding is 100 % its own symbol, unless it is an ETF with manual underlyings, in which
+#   case it is split over them (missing/zero allocations share equally, zero total → 100)
+# - symbols × sectors from symbol_sector_weights; symbols without sector rows count as "Other"
+from sqlalchemy.orm import Session
+from app.models import Holding, HoldingType, UnderlyingHolding, SymbolSectorWeight
+from typing import Dict, List, Tuple
+import numpy as np
+
+OTHER_SECTOR = "Other"
+
+def look_through_matrix(db: Session, holdings: List[Holding]) -> Tuple[List[str], np.ndarray]:
+    """(symbols, L) with L[h, u] = fraction of holding h's value that is exposed to symbols[u]"""
+    etf_ids = [h.id for h in holdings if h.type == HoldingType.etf]
+    underlyings: Dict[int, List[UnderlyingHolding]] = {}
+    if etf_ids:
+        for u in db.query(UnderlyingHolding).filter(UnderlyingHolding.holding_id.in_(etf_ids)).all():
+            underlyings.setdefault(u.holding_id, []).append(u)
+
+    compositions = []
+    for h in holdings:
+        parts = underlyings.get(h.id)
+        if not parts:
+            compositions.append({h.symbol: 1.0})
+            continue
+        equal = 100.0 / len(parts)
+        total = sum(u.allocation_percent or 0 for u in parts) or 100.0
+        mix: Dict[str, float] = {}
+        for u in parts:
+            mix[u.symbol] = mix.get(u.symbol, 0.0) + (u.allocation_percent or equal) / total
+        compositions.append(mix)
+
+    symbols = sorted({s for mix in compositions for s in mix})
+    index = {s: i for i, s in enumerate(symbols)}
+    matrix = np.zeros((len(holdings), len(symbols)))
+    for row, mix in enumerate(compositions):
+        for symbol, frac in mix.items():
+            matrix[row, index[symbol]] = frac
+    return symbols, matrix
+
+def sector_matrix(db: Session, symbols: List[str]) -> Tuple[List[str], np.ndarray]:
+    """(sectors, W) with W[u, s] = weight of symbols[u] in sectors[s] (rows sum to 1)"""
+    rows = db.query(SymbolSectorWeight).filter(SymbolSectorWeight.symbol.in_(symbols)).all() if symbols else []
+    sectors = sorted({row.sector for row in rows} | {OTHER_SECTOR})
+    s_index = {s: i for i, s in enumerate(sectors)}
+    u_index = {s: i for i, s in enumerate(symbols)}
+
+    matrix = np.zeros((len(symbols), len(sectors)))
+    for row in rows:
+        matrix[u_index[row.symbol], s_index[row.sector]] += row.weight
+    uncovered = matrix.sum(axis=1) == 0
+    matrix[uncovered, s_index[OTHER_SECTOR]] = 1.0
+    return sectors, matrix
+
+def holding_sector_matrix(db: Session, holdings: List[Holding]) -> Tuple[List[str], np.ndarray]:
+    """(sectors, E) with E[h, s] = fraction of holding h in sector s (look-through)"""
+    symbols, look_through = look_through_matrix(db, holdings)
+    sectors, weights = sector_matrix(db, symbols)
+    return sectors, look_through @ weights
@@ -0,0 +1,17 @@
+# backend/app/utils/file_lock.py (NEW – exclusive lock shared by the API and Celery worker processes)
+# - flock() on a sidecar lock file: held per open file, so it serializes threads of one process as well
+# - Released by the kernel if the holder dies, so a crashed writer never leaves the lock behind
+from contextlib import contextmanager
+import fcntl
+import os
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on `path` (created if missing) for the duration of the block"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
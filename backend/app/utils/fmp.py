@@ -1,12 +1,23 @@
-# backend/app/utils/fmp.py (FULL updated file – primary FMP with Yahoo fallback via new function; production-ready hybrid)
+# backend/app/utils/fmp.py (FULL updated file – pooled keep-alive FMP client with retries, batch quote/profile endpoints; primary FMP with Yahoo fallback)
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from fastapi import HTTPException
 import logging
+import threading
+from typing import Dict, List, Optional, Tuple
 from app.utils.yahoo import fetch_yahoo_sector_weightings  # ← NEW: import fallback
 
 logger = logging.getLogger(__name__)
 
+FMP_TIMEOUT = float(os.getenv("FMP_TIMEOUT", "10"))
+FMP_MAX_RETRIES = int(os.getenv("FMP_MAX_RETRIES", "3"))
+FMP_BACKOFF_FACTOR = float(os.getenv("FMP_BACKOFF_FACTOR", "0.5"))
+FMP_POOL_SIZE = int(os.getenv("FMP_POOL_SIZE", "10"))
+# Symbols per comma-separated batch request
+FMP_BATCH_SIZE = int(os.getenv("FMP_BATCH_SIZE", "50"))
+
 def get_fmp_base_url() -> str:
     base = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com")
     api_key = os.getenv("FMP_API_KEY")
@@ -14,43 +25,166 @@ def get_fmp_base_url() -> str:
         raise ValueError("FMP_API_KEY missing in .env")
     return base, api_key
 
-def get_fmp_quote_url(symbol: str) -> str:
-    base, api_key = get_fmp_base_url()
-    return f"{base}/stable/quote?symbol={symbol.upper()}&apikey={api_key}"
+def fmp_configured() -> bool:
+    """False without FMP_API_KEY – batch lookups then go straight to their Yahoo fallback"""
+    return bool(os.getenv("FMP_API_KEY"))
+
+def chunked(items: List[str], size: int = FMP_BATCH_SIZE) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class FMPClient:
+    """
+    Thin FMP wrapper around one pooled requests.Session:
+    - keep-alive connections shared by all threads of the worker
+    - automatic retries with exponential backoff on 429/5xx
+    - batch endpoints take comma-separated symbol lists
+    """
 
-def get_etf_sector_weightings_url(symbol: str) -> str:
-    base, api_key = get_fmp_base_url()
-    return f"{base}/stable/etf/sector-weightings?symbol={symbol.upper()}&apikey={api_key}"
+    def __init__(
+        self,
+        max_retries: int = FMP_MAX_RETRIES,
+        backoff_factor: float = FMP_BACKOFF_FACTOR,
+        pool_size: int = FMP_POOL_SIZE,
+        timeout: float = FMP_TIMEOUT,
+    ):
+        self.base, self.api_key = get_fmp_base_url()
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, path: str, **params) -> list:
+        params["apikey"] = self.api_key
+        resp = self.session.get(f"{self.base}/stable/{path}", params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json() or []
 
-def get_stock_profile_url(symbol: str) -> str:
-    base, api_key = get_fmp_base_url()
-    return f"{base}/stable/profile?symbol={symbol.upper()}&apikey={api_key}"
+    def quote(self, symbol: str) -> list:
+        return self.get("quote", symbol=symbol.upper())
+
+    def batch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        """One request per FMP_BATCH_SIZE symbols → {SYMBOL: raw quote}"""
+        quotes = {}
+        for chunk in chunked(sorted({s.upper() for s in symbols})):
+            for item in self.get("batch-quote", symbols=",".join(chunk)):
+                if item.get("symbol"):
+                    quotes[item["symbol"].upper()] = item
+        return quotes
+
+    def batch_profiles(self, symbols: List[str]) -> Dict[str, dict]:
+        """One request per FMP_BATCH_SIZE symbols → {SYMBOL: raw profile}"""
+        profiles = {}
+        for chunk in chunked(sorted({s.upper() for s in symbols})):
+            for item in self.get("profile", symbol=",".join(chunk)):
+                if item.get("symbol"):
+                    profiles[item["symbol"].upper()] = item
+        return profiles
+
+    def etf_sector_weightings(self, symbol: str) -> list:
+        return self.get("etf/sector-weightings", symbol=symbol.upper())
+
+    def dividends(self, symbol: str) -> list:
+        """Dividend history, newest first (date = ex-date, paymentDate, dividend = unadjusted cash amount)"""
+        return self.get("dividends", symbol=symbol.upper())
+
+_client: Optional[FMPClient] = None
+_client_lock = threading.Lock()
+
+def get_fmp_client() -> FMPClient:
+    """Process-wide client (created lazily so missing FMP_API_KEY only fails on first use)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FMPClient()
+    return _client
+
+def _format_quote(quote: dict) -> dict:
+    return {
+        "price": quote.get("price"),
+        "change": quote.get("change"),
+        "change_percent": quote.get("changePercentage"),
+        "open": quote.get("open"),
+        "previous_close": quote.get("previousClose"),
+        "day_high": quote.get("dayHigh"),
+        "day_low": quote.get("dayLow"),
+        "volume": quote.get("volume"),
+        "name": quote.get("name"),
+        "exchange": quote.get("exchange"),
+        "timestamp": quote.get("timestamp"),
+    }
 
 def fetch_price_data(symbol: str):
-    url = get_fmp_quote_url(symbol)
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = get_fmp_client().quote(symbol)
         if not data or len(data) == 0 or 'price' not in data[0]:
             raise HTTPException(status_code=400, detail=f"No price data returned for {symbol} — check symbol, API key, or subscription")
-        quote = data[0]
-        return {
-            "price": quote.get("price"),
-            "change": quote.get("change"),
-            "change_percent": quote.get("changePercentage"),
-            "open": quote.get("open"),
-            "previous_close": quote.get("previousClose"),
-            "day_high": quote.get("dayHigh"),
-            "day_low": quote.get("dayLow"),
-            "volume": quote.get("volume"),
-            "name": quote.get("name"),
-            "exchange": quote.get("exchange"),
-            "timestamp": quote.get("timestamp"),
-        }
+        return _format_quote(data[0])
     except requests.RequestException as e:
         raise HTTPException(status_code=400, detail=f"FMP API request failed for {symbol}: {str(e)}")
 
+def fetch_batch_price_data(symbols: List[str]) -> Dict[str, dict]:
+    """Batch version of fetch_price_data – symbols missing from the response are omitted"""
+    if not fmp_configured():
+        return {}
+    try:
+        quotes = get_fmp_client().batch_quotes(symbols)
+    except requests.RequestException as e:
+        logger.warning(f"FMP batch quote request failed for {len(symbols)} symbols: {str(e)}")
+        return {}
+    return {sym: _format_quote(q) for sym, q in quotes.items() if q.get("price") is not None}
+
+def _etf_weightings(data: list) -> List[dict]:
+    total_pct = sum(item.get("weightPercentage", 0) for item in data or [])
+    if total_pct == 0:
+        return []
+    weightings = []
+    for item in data:
+        sector = item.get("sector")
+        if sector:
+            weight = item.get("weightPercentage", 0) / total_pct
+            weightings.append({"sector": sector, "weight": round(weight, 6)})
+    return weightings
+
+def _profile_weightings(profile: Optional[dict]) -> List[dict]:
+    if not profile or not profile.get("sector"):
+        return []
+    return [{"sector": profile["sector"], "weight": 1.0}]
+
+def fetch_stock_sector_weightings_batch(symbols: List[str]) -> Dict[str, List[dict]]:
+    """
+    FMP-only sector lookup for stocks via batched /profile calls.
+    Returns weightings only for symbols FMP knows a sector for (callers fall back for the rest).
+    """
+    if not symbols:
+        return {}
+    if not fmp_configured():
+        logger.warning(f"FMP_API_KEY not set – skipping FMP sector lookup for {len(symbols)} stocks")
+        return {}
+    try:
+        profiles = get_fmp_client().batch_profiles(symbols)
+    except requests.RequestException as e:
+        logger.warning(f"FMP batch profile request failed for {len(symbols)} symbols: {str(e)}")
+        return {}
+
+    results = {}
+    for symbol in symbols:
+        weightings = _profile_weightings(profiles.get(symbol.upper()))
+        if weightings:
+            results[symbol] = weightings
+    logger.info(f"FMP batch profiles: sectors for {len(results)}/{len(symbols)} stocks")
+    return results
+
 # HYBRID: Primary FMP → Yahoo fallback if no sectors
 def fetch_sector_weightings(symbol: str, is_etf: bool = False):
     """
@@ -59,54 +193,43 @@ def fetch_sector_weightings(symbol: str, is_etf: bool = False):
     2. If no sectors → Yahoo fallback (reuses existing yfinance)
     3. Final fallback → "Other"
     """
+    weightings, _ = fetch_sector_weightings_with_source(symbol, is_etf=is_etf)
+    return weightings
+
+def fetch_sector_weightings_with_source(symbol: str, is_etf: bool = False, skip_fmp: bool = False) -> Tuple[List[dict], str]:
+    """
+    Same hybrid chain as fetch_sector_weightings, but also reports which provider answered:
+    "fmp", "yahoo" or "fallback" (both missed → "Other").
+    skip_fmp=True jumps straight to Yahoo (used when a batch FMP call already missed).
+    """
     def try_fmp() -> list:
-        if is_etf:
-            url = get_etf_sector_weightings_url(symbol)
-        else:
-            url = get_stock_profile_url(symbol)
-        logger.info(f"Primary: FMP sector fetch for {symbol} ({'ETF' if is_etf else 'stock'}): {url}")
+        logger.info(f"Primary: FMP sector fetch for {symbol} ({'ETF' if is_etf else 'stock'})")
 
         try:
-            resp = requests.get(url, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            logger.info(f"FMP raw response for {symbol}: {data}")
-
-            weightings = []
+            client = get_fmp_client()
             if is_etf:
-                if not data:
-                    return []
-                total_pct = sum(item.get("weightPercentage", 0) for item in data)
-                if total_pct == 0:
-                    return []
-                for item in data:
-                    sector = item.get("sector")
-                    if sector:
-                        weight = item.get("weightPercentage", 0) / total_pct
-                        weightings.append({"sector": sector, "weight": round(weight, 6)})
+                weightings = _etf_weightings(client.etf_sector_weightings(symbol))
             else:
-                if not data or not data[0].get("sector"):
-                    return []
-                weightings.append({"sector": data[0]["sector"], "weight": 1.0})
+                weightings = _profile_weightings(client.batch_profiles([symbol]).get(symbol.upper()))
 
             if weightings:
                 logger.info(f"FMP success → weightings for {symbol}: {weightings}")
-                return weightings
-            return []
+            return weightings
 
         except requests.RequestException as e:
             logger.warning(f"FMP sector request failed for {symbol}: {str(e)}")
             return []
 
-    fmp_weightings = try_fmp()
-    if fmp_weightings:
-        return fmp_weightings
+    if not skip_fmp and fmp_configured():
+        fmp_weightings = try_fmp()
+        if fmp_weightings:
+            return fmp_weightings, "fmp"
 
     # Yahoo fallback (uses existing yahoo.py yfinance logic)
     yahoo_weightings = fetch_yahoo_sector_weightings(symbol)
     if yahoo_weightings and yahoo_weightings[0]["sector"] != "Other":
-        return yahoo_weightings
+        return yahoo_weightings, "yahoo"
 
     # Final fallback
     logger.warning(f"Both FMP & Yahoo failed → forcing 'Other' for {symbol}")
-    return [{"sector": "Other", "weight": 1.0}]
\ No newline at end of file
+    return [{"sector": "Other", "weight": 1.0}], "fallback"
@@ -0,0 +1,124 @@
+# backend/app/utils/fx.py (NEW – multi-currency FX service: quote currencies, cached rate matrix, vectorized conversion)
+# - A symbol's quote currency comes from its exchange suffix (.TO/.V/.NE/.CN = CAD, .L = GBP, .AX = AUD, …,
+#   no suffix = USD); London quotes are in pence, so .L prices carry a 0.01 unit factor
+# - Rates are fetched as USD{CCY}=X pairs for every required currency in ONE batched Yahoo call and stored in
+#   Redis as a single matrix (fx:matrix) – crosses are derived, nothing is fetched on the request path
+# - The matrix has no expiry: a stale rate beats a hard-coded one. FALLBACK_USD_RATES is only used for a
+#   currency that has never been fetched. fx:USDCAD is still written for older readers
+# - conversion_factors(symbols, to) gives one multiplier per symbol (native price → reporting currency)
+from app.redis_client import r
+from app.utils.yahoo import batch_fetch_prices
+from app.utils.currencies import SUFFIX_CURRENCIES, SUFFIX_PRICE_UNITS, symbol_suffix, currency_from_suffix, price_unit
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import logging
+import redis
+import json
+
+logger = logging.getLogger(__name__)
+
+REPORTING_CURRENCY = "CAD"  # every stored / aggregated value is in CAD; other targets via conversion_factors
+FX_MATRIX_KEY = "fx:matrix"
+LEGACY_USDCAD_KEY = "fx:USDCAD"
+
+# Units of each currency per 1 USD – only for currencies never fetched
+FALLBACK_USD_RATES = {"USD": 1.0, "CAD": 1.37, "GBP": 0.79, "EUR": 0.92, "AUD": 1.52}
+CURRENCIES = tuple(FALLBACK_USD_RATES)
+
+def pair_symbol(currency: str) -> Optional[str]:
+    """Yahoo pair quoting `currency` per USD (None for USD itself)"""
+    return None if currency == "USD" else f"USD{currency}=X"
+
+def required_currencies(symbols: Iterable[str]) -> List[str]:
+    return sorted({currency_from_suffix(s) for s in symbols} | {REPORTING_CURRENCY, "USD"})
+
+def required_pairs(symbols: Iterable[str] = ()) -> List[str]:
+    """Pair symbols for every known currency plus any `symbols` quote in"""
+    currencies = set(required_currencies(symbols)) | set(CURRENCIES)
+    return [p for p in (pair_symbol(c) for c in sorted(currencies)) if p]
+
+class FxMatrix:
+    """matrix[i, j] = units of currencies[j] per 1 unit of currencies[i]"""
+
+    def __init__(self, usd_rates: Dict[str, float], updated_at: Optional[str] = None):
+        self.currencies = sorted(usd_rates)
+        self.index = {c: i for i, c in enumerate(self.currencies)}
+        per_usd = np.array([usd_rates[c] for c in self.currencies], dtype=np.float64)
+        self.matrix = per_usd[None, :] / per_usd[:, None]
+        self.updated_at = updated_at
+
+    def rate(self, source: str, target: str = REPORTING_CURRENCY) -> float:
+        return float(self.matrix[self._col(source), self._col(target)])
+
+    def factors(self, currencies: Iterable[str], target: str = REPORTING_CURRENCY) -> np.ndarray:
+        """Vectorized rate from each of `currencies` into `target`"""
+        rows = np.array([self._col(c) for c in currencies], dtype=np.int64)
+        return self.matrix[rows, self._col(target)] if len(rows) else np.zeros(0)
+
+    def _col(self, currency: str) -> int:
+        currency = currency.upper()
+        if currency not in self.index:
+            raise ValueError(f"No FX rate for {currency}")
+        return self.index[currency]
+
+    def to_dict(self) -> dict:
+        return {
+            "currencies": self.currencies,
+            "matrix": np.round(self.matrix, 8).tolist(),
+            "updated_at": self.updated_at,
+        }
+
+def _read_usd_rates() -> dict:
+    try:
+        raw = r.get(FX_MATRIX_KEY)
+        if raw:
+            return json.loads(raw)
+        # Pre-matrix deployments only cached USDCAD
+        legacy = r.get(LEGACY_USDCAD_KEY)
+        return {"rates": {"CAD": float(legacy.decode("utf-8"))}} if legacy else {}
+    except redis.RedisError as e:
+        logger.warning(f"FX matrix read failed: {e}")
+        return {}
+
+def get_fx_matrix() -> FxMatrix:
+    stored = _read_usd_rates()
+    usd_rates = {**FALLBACK_USD_RATES, **stored.get("rates", {}), "USD": 1.0}
+    return FxMatrix(usd_rates, stored.get("updated_at"))
+
+def store_rates(price_map: Dict[str, dict]) -> Dict[str, float]:
+    """Merge USD{CCY}=X prices from a batch_fetch_prices result into the cached matrix"""
+    stored = _read_usd_rates().get("rates", {})
+    fetched = {}
+    for symbol, data in price_map.items():
+        if symbol.startswith("USD") and symbol.endswith("=X") and data.get("price"):
+            fetched[symbol[3:-2]] = float(data["price"])
+    if not fetched:
+        return stored
+
+    rates = {**stored, **fetched}
+    r.set(FX_MATRIX_KEY, json.dumps({"rates": rates, "updated_at": datetime.utcnow().isoformat()}))
+    if "CAD" in fetched:
+        r.set(LEGACY_USDCAD_KEY, fetched["CAD"], ex=3600)
+    logger.info(f"FX matrix updated for {', '.join(sorted(fetched))}")
+    return rates
+
+def refresh_rates(symbols: Iterable[str] = ()) -> FxMatrix:
+    """Fetch every pair needed for `symbols` (+ all known currencies) in one batched call"""
+    store_rates(batch_fetch_prices(required_pairs(symbols)))
+    return get_fx_matrix()
+
+def conversion_factors(
+    symbols: List[str],
+    target: str = REPORTING_CURRENCY,
+    currencies: Optional[List[str]] = None,
+    fx: Optional[FxMatrix] = None,
+) -> np.ndarray:
+    """
+    Multiplier per symbol turning a native price/amount into `target`.
+    `currencies` overrides the suffix rule (e.g. a holding's stored currency); minor units still apply.
+    """
+    fx = fx or get_fx_matrix()
+    currencies = currencies or [currency_from_suffix(s) for s in symbols]
+    units = np.array([price_unit(s) for s in symbols], dtype=np.float64)
+    return fx.factors(currencies, target) * units
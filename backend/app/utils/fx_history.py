@@ -0,0 +1,172 @@
+# backend/app/utils/fx_history.py (NEW – daily FX history in Postgres for point-in-time conversion)
+# - fx_rates holds one close per (currency, day) as units per USD, same base as the live FX matrix
+# - update_fx_history fills missing days for every currency with one bulk Yahoo download per date range
+#   (the daily task and the history backfill call it – request paths never hit the provider). Missing =
+#   weekdays without a downloaded close, checked per currency, so holes inside the stored range are found too
+# - record_rates keeps the live matrix as the EOD close (is_live); downloads overwrite those rows, never
+#   the other way round
+# - conversion_series is the vectorized lookup: one query for the whole range, then last close on or before
+#   each requested date via searchsorted → (dates × currencies) rates into the target currency
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models import FxRate
+from app.utils.fx import CURRENCIES, REPORTING_CURRENCY, FxMatrix, get_fx_matrix, pair_symbol
+from app.utils.yahoo import fetch_daily_history
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# First day downloaded for a currency with no stored history
+FX_HISTORY_START = date.fromisoformat(os.getenv("FX_HISTORY_START", "2015-01-01"))
+# Calendar days searched back for the last close before a date (weekends / holidays)
+FX_LOOKBACK_DAYS = 10
+# Missing runs closer than this (calendar days) are fetched as one range – re-downloading a few stored
+# days is cheaper than another request
+FX_GAP_MERGE_DAYS = 14
+# FX trades every weekday except these (month, day) closures
+FX_CLOSED_DAYS = {(1, 1), (12, 25)}
+
+def stored_ranges(db: Session) -> Dict[str, Tuple[date, date]]:
+    """{currency: (first stored day, last stored day)}"""
+    rows = db.query(FxRate.currency, func.min(FxRate.date), func.max(FxRate.date)).group_by(FxRate.currency).all()
+    return {currency: (first, last) for currency, first, last in rows}
+
+def expected_days(start: date, through: date) -> np.ndarray:
+    """FX trading days in [start, through] (weekdays minus FX_CLOSED_DAYS) as datetime64[D]"""
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(through, "D") + 1)
+    days = days[np.is_busday(days)]
+    closed = [(d.month, d.day) in FX_CLOSED_DAYS for d in days.astype(object)]
+    return days[~np.array(closed, dtype=bool)] if len(days) else days
+
+def missing_ranges(expected: np.ndarray, stored: np.ndarray, merge_days: int = FX_GAP_MERGE_DAYS) -> List[Tuple[date, date]]:
+    """Expected days absent from `stored`, collapsed into (first, last) runs merged across short gaps"""
+    missing = np.setdiff1d(expected, stored)
+    if not len(missing):
+        return []
+    breaks = np.nonzero(np.diff(missing).astype(np.int64) > merge_days)[0]
+    firsts = np.concatenate([missing[:1], missing[breaks + 1]])
+    lasts = np.concatenate([missing[breaks], missing[-1:]])
+    return [(first.astype(object), last.astype(object)) for first, last in zip(firsts, lasts)]
+
+def _upsert(db: Session, rows: List[dict], is_live: bool = False) -> None:
+    """Downloaded rows overwrite anything; live rows only overwrite earlier live rows"""
+    for i in range(0, len(rows), 5000):
+        stmt = pg_insert(FxRate).values([{**row, "is_live": is_live} for row in rows[i:i + 5000]])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[FxRate.currency, FxRate.date],
+            set_={"usd_rate": stmt.excluded.usd_rate, "is_live": stmt.excluded.is_live},
+            where=FxRate.is_live if is_live else None,
+        ))
+
+def update_fx_history(
+    db: Session,
+    through: date,
+    currencies: Iterable[str] = CURRENCIES,
+    start: Optional[date] = None,
+) -> Dict[str, int]:
+    """
+    Fill [start or FX_HISTORY_START, through] for `currencies` – only each currency's missing trading days
+    (no downloaded close yet, live snapshot rows included) are fetched, grouped so each distinct range is
+    one bulk call. Caller commits.
+    """
+    start = start or FX_HISTORY_START
+    wanted = sorted({c.upper() for c in currencies} - {"USD"})
+    rows = db.query(FxRate.currency, FxRate.date)\
+             .filter(FxRate.currency.in_(wanted), FxRate.date >= start, FxRate.date <= through, FxRate.is_live.is_(False))\
+             .all()
+    downloaded: Dict[str, List[date]] = {}
+    for currency, day in rows:
+        downloaded.setdefault(currency, []).append(day)
+
+    expected = expected_days(start, through)
+    ranges: Dict[Tuple[date, date], List[str]] = {}
+    for currency in wanted:
+        stored = np.array(downloaded.get(currency, []), dtype="datetime64[D]")
+        for run in missing_ranges(expected, stored):
+            ranges.setdefault(run, []).append(currency)
+
+    inserted: Dict[str, int] = {}
+    for (first, last), group in sorted(ranges.items()):
+        frames = fetch_daily_history([pair_symbol(c) for c in group], first, last + timedelta(days=1))
+        rows = []
+        for currency in group:
+            frame = frames.get(pair_symbol(currency))
+            if frame is None:
+                continue
+            frame = frame[(frame.index.date >= first) & (frame.index.date <= last)]
+            rows.extend({"currency": currency, "date": day.date(), "usd_rate": float(close)} for day, close in frame["close"].items())
+            inserted[currency] = inserted.get(currency, 0) + len(frame)
+        if rows:
+            _upsert(db, rows)
+    if inserted:
+        logger.info(f"FX history: {sum(inserted.values())} rows for {', '.join(sorted(inserted))} through {through}")
+    return inserted
+
+def record_rates(db: Session, day: date, fx: FxMatrix) -> None:
+    """Store the live matrix as `day`'s close (keeps the EOD rate even if no download ever covers it)"""
+    if fx.updated_at is None:
+        return  # fallback constants only – nothing real to keep
+    _upsert(db, [{"currency": c, "date": day, "usd_rate": fx.rate("USD", c)} for c in fx.currencies if c != "USD"], is_live=True)
+
+def usd_rates_on(db: Session, dates: np.ndarray, currencies: List[str]) -> np.ndarray:
+    """(len(dates) × len(currencies)) units per USD – last stored close on or before each date, NaN if none"""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    out = np.full((len(dates), len(currencies)), np.nan)
+    if not len(dates):
+        return out
+    for col, currency in enumerate(currencies):
+        if currency == "USD":
+            out[:, col] = 1.0
+
+    wanted = [c for c in currencies if c != "USD"]
+    if not wanted:
+        return out
+    first = dates.min().astype(object) - timedelta(days=FX_LOOKBACK_DAYS)
+    rows = db.query(FxRate.currency, FxRate.date, FxRate.usd_rate)\
+             .filter(FxRate.currency.in_(wanted), FxRate.date >= first, FxRate.date <= dates.max().astype(object))\
+             .order_by(FxRate.currency, FxRate.date)\
+             .all()
+    if not rows:
+        return out
+
+    row_currency = np.array([row.currency for row in rows])
+    row_dates = np.array([row.date for row in rows], dtype="datetime64[D]")
+    row_rates = np.array([row.usd_rate for row in rows], dtype=np.float64)
+    for col, currency in enumerate(currencies):
+        mask = row_currency == currency
+        if currency == "USD" or not mask.any():
+            continue
+        pos = np.searchsorted(row_dates[mask], dates, side="right") - 1
+        out[:, col] = np.where(pos >= 0, row_rates[mask][np.clip(pos, 0, None)], np.nan)
+    return out
+
+def conversion_series(
+    db: Session,
+    dates: np.ndarray,
+    currencies: List[str],
+    target: str = REPORTING_CURRENCY,
+    fill_current: bool = True,
+) -> np.ndarray:
+    """
+    (len(dates) × len(currencies)) rate from each currency into `target` on each date.
+    Days without stored history use the live FX matrix when `fill_current`, else stay NaN.
+    """
+    columns = sorted(set(currencies) | {target})
+    per_usd = usd_rates_on(db, dates, columns)
+    if fill_current:
+        current = get_fx_matrix()
+        live = np.array([current.rate("USD", c) for c in columns])
+        per_usd = np.where(np.isnan(per_usd), live, per_usd)
+    rates = per_usd[:, [columns.index(target)]] / per_usd
+    rates[:, columns.index(target)] = 1.0
+    return rates[:, [columns.index(c) for c in currencies]]
+
+def rate_series(db: Session, start: date, end: date, currencies: List[str], target: str = REPORTING_CURRENCY):
+    """(calendar dates, rates) for every day in [start, end] – see conversion_series"""
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    return dates, conversion_series(db, dates, currencies, target, fill_current=False)
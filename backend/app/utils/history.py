@@ -0,0 +1,241 @@
+# backend/app/utils/history.py (NEW – shared history helpers: bucketing, resolution choice, raw vs rollup reads)
+from sqlalchemy.orm import Session
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models import PortfolioHistory, GlobalHistory, PortfolioHistoryRollup, GlobalHistoryRollup, PortfolioLatestSnapshot
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+import holidays
+import pytz
+import os
+
+MARKET_TZ = "America/Toronto"
+
+RAW = "raw"
+HOUR = "hour"
+DAY = "day"
+RESOLUTIONS = (RAW, HOUR, DAY)
+
+# Retention (rollup task deletes older rows; reads never ask a table for data it no longer has)
+HISTORY_RAW_RETENTION_DAYS = int(os.getenv("HISTORY_RAW_RETENTION_DAYS", "30"))
+HISTORY_HOURLY_RETENTION_DAYS = int(os.getenv("HISTORY_HOURLY_RETENTION_DAYS", "365"))
+
+# Widest range each resolution is used for (keeps payloads in the low hundreds of points)
+MAX_RAW_SPAN = timedelta(days=2)
+MAX_HOURLY_SPAN = timedelta(days=92)
+
+# Upper bound for ?limit= on paginated history endpoints
+HISTORY_PAGE_LIMIT_MAX = int(os.getenv("HISTORY_PAGE_LIMIT_MAX", "10000"))
+
+# Matches the frontend PeriodSelector (+ 1D)
+PERIODS = {
+    "1D": timedelta(days=1),
+    "1W": timedelta(weeks=1),
+    "1M": timedelta(days=31),
+    "3M": timedelta(days=92),
+    "1Y": timedelta(days=366),
+    "2Y": timedelta(days=731),
+    "3Y": timedelta(days=1096),
+}
+
+def bucket_start_expr(resolution: str, column):
+    """SQL bucket start (naive UTC). Day buckets follow the Toronto trading day, not the UTC date."""
+    if resolution == HOUR:
+        return func.date_trunc("hour", column)
+    local = func.timezone(MARKET_TZ, func.timezone("UTC", column))
+    return func.timezone("UTC", func.timezone(MARKET_TZ, func.date_trunc("day", local)))
+
+def current_bucket_start(resolution: str, now: datetime) -> datetime:
+    """Python twin of bucket_start_expr for a naive UTC datetime"""
+    if resolution == HOUR:
+        return now.replace(minute=0, second=0, microsecond=0)
+    tz = pytz.timezone(MARKET_TZ)
+    local = pytz.utc.localize(now).astimezone(tz)
+    midnight = tz.localize(datetime(local.year, local.month, local.day))
+    return midnight.astimezone(pytz.utc).replace(tzinfo=None)
+
+def is_trading_day(day: date) -> bool:
+    """Weekday that is neither an Ontario nor a US holiday (both exchanges open)"""
+    if day.weekday() >= 5:
+        return False
+    return day not in holidays.CA(prov="ON", years=day.year) and day not in holidays.US(years=day.year)
+
+def eod_timestamp(day: date) -> datetime:
+    """Naive UTC timestamp of the 4:30 PM ET end-of-day snapshot for `day`"""
+    tz = pytz.timezone(MARKET_TZ)
+    return tz.localize(datetime.combine(day, time(16, 30))).astimezone(pytz.utc).replace(tzinfo=None)
+
+def period_start(period: Optional[str], now: datetime) -> Optional[datetime]:
+    """Start of a PeriodSelector range (None = everything)"""
+    if not period or period.upper() == "ALL":
+        return None
+    period = period.upper()
+    if period == "YTD":
+        return current_bucket_start(DAY, now.replace(month=1, day=1, hour=12))
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}' – expected one of {', '.join(list(PERIODS) + ['YTD', 'ALL'])}")
+    return now - PERIODS[period]
+
+# Rough points per trading day at each resolution (5-min snapshots over the 8AM-9PM window)
+POINTS_PER_DAY = {RAW: 156, HOUR: 13, DAY: 1}
+
+def resolve_range(
+    period: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    now: datetime,
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Explicit from/to win over a period; raises ValueError for unknown periods or inverted ranges"""
+    if start is None and period is not None:
+        start = period_start(period, now)
+    if start is not None and end is not None and start > end:
+        raise ValueError("'from' must be before 'to'")
+    return start, end
+
+def pick_resolution(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    now: datetime,
+    points: Optional[int] = None,
+) -> str:
+    """
+    Finest resolution that keeps the range small and is still retained for the whole range.
+    Without a point target: ≤ 2 days → raw, ≤ 92 days → hourly, else daily.
+    With one: finest resolution whose expected point count fits in `points`.
+    """
+    end = end or now
+    if start is None:
+        return DAY
+
+    span = end - start
+    if points is not None:
+        days = max(span.total_seconds() / 86400, 1 / 24)
+        fits = {res: days * POINTS_PER_DAY[res] <= points for res in RESOLUTIONS}
+    else:
+        fits = {RAW: span <= MAX_RAW_SPAN, HOUR: span <= MAX_HOURLY_SPAN, DAY: True}
+
+    if fits[RAW] and start >= now - timedelta(days=HISTORY_RAW_RETENTION_DAYS):
+        return RAW
+    if fits[HOUR] and start >= now - timedelta(days=HISTORY_HOURLY_RETENTION_DAYS):
+        return HOUR
+    return DAY
+
+# Keyset position: (timestamp, tiebreak) of the last row of the previous page. The tiebreak is the row id for raw
+# tables and the bucket start for rollups; None (a bare-timestamp cursor) pages on timestamp alone.
+Cursor = Tuple[datetime, Optional[Union[int, datetime]]]
+
+def _tiebreak(model):
+    """Unique column that orders rows sharing a timestamp"""
+    return model.bucket_start if model in (GlobalHistoryRollup, PortfolioHistoryRollup) else model.id
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(pytz.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def parse_cursor(value: str, resolution: str = RAW) -> Cursor:
+    """
+    Parse an X-Next-Cursor value "<timestamp>|<tiebreak>" for a page at `resolution`.
+    A bare timestamp is still accepted. Raises ValueError on anything else.
+    """
+    stamp, _, tie = value.partition("|")
+    timestamp = _naive_utc(datetime.fromisoformat(stamp))
+    if not tie:
+        return timestamp, None
+    return timestamp, int(tie) if resolution == RAW else _naive_utc(datetime.fromisoformat(tie))
+
+def _history_query(
+    query,
+    model,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    cursor: Optional[Cursor],
+    limit: Optional[int],
+    descending: bool,
+) -> List:
+    """Range filter + keyset pagination on (timestamp, tiebreak) – the cursor row itself is excluded"""
+    if start is not None:
+        query = query.filter(model.timestamp >= start)
+    if end is not None:
+        query = query.filter(model.timestamp <= end)
+    tiebreak = _tiebreak(model)
+    if cursor is not None:
+        timestamp, tie = cursor
+        if tie is None:
+            query = query.filter(model.timestamp < timestamp if descending else model.timestamp > timestamp)
+        else:
+            key = tuple_(model.timestamp, tiebreak)
+            query = query.filter(key < tuple_(timestamp, tie) if descending else key > tuple_(timestamp, tie))
+    if descending:
+        query = query.order_by(model.timestamp.desc(), tiebreak.desc())
+    else:
+        query = query.order_by(model.timestamp.asc(), tiebreak.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def query_global_history(
+    db: Session,
+    resolution: str = RAW,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    descending: bool = False,
+    cursor: Optional[Cursor] = None,
+    limit: Optional[int] = None,
+    eod_only: bool = False,
+) -> List:
+    """Global snapshots from the raw table or a rollup – rows expose the GlobalHistoryResponse fields"""
+    if resolution == RAW:
+        model = GlobalHistory
+        query = db.query(GlobalHistory)
+    else:
+        model = GlobalHistoryRollup
+        query = db.query(GlobalHistoryRollup).filter(GlobalHistoryRollup.resolution == resolution)
+    if eod_only:
+        query = query.filter(model.is_eod == True)
+    return _history_query(query, model, start, end, cursor, limit, descending)
+
+def query_portfolio_history(
+    db: Session,
+    portfolio_id: int,
+    resolution: str = RAW,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    descending: bool = False,
+    cursor: Optional[Cursor] = None,
+    limit: Optional[int] = None,
+) -> List:
+    """Per-portfolio snapshots from the raw table or a rollup – rows expose the PortfolioHistoryResponse fields"""
+    if resolution == RAW:
+        model = PortfolioHistory
+        query = db.query(PortfolioHistory)
+    else:
+        model = PortfolioHistoryRollup
+        query = db.query(PortfolioHistoryRollup).filter(PortfolioHistoryRollup.resolution == resolution)
+    query = query.filter(model.portfolio_id == portfolio_id)
+    return _history_query(query, model, start, end, cursor, limit, descending)
+
+def next_cursor(rows: List, limit: Optional[int]) -> Optional[str]:
+    """Cursor for the following page ("<timestamp>|<tiebreak>" of its last row) – only when this page came back full"""
+    if limit is not None and rows and len(rows) == limit:
+        last = rows[-1]
+        tie = last.bucket_start.isoformat() if isinstance(last, (GlobalHistoryRollup, PortfolioHistoryRollup)) else last.id
+        return f"{last.timestamp.isoformat()}|{tie}"
+    return None
+
+LATEST_SNAPSHOT_COLUMNS = ["timestamp", "total_value", "daily_change", "daily_percent", "all_time_gain", "all_time_percent"]
+
+def upsert_latest_snapshots(db: Session, snapshots: List[Dict]) -> None:
+    """
+    Mirror new PortfolioHistory rows into portfolio_latest_snapshots (caller commits – same transaction).
+    Older rows never overwrite newer ones, so late/backfilled snapshots are safe to pass.
+    """
+    if not snapshots:
+        return
+    stmt = pg_insert(PortfolioLatestSnapshot).values(
+        [{col: snap[col] for col in ["portfolio_id"] + LATEST_SNAPSHOT_COLUMNS} for snap in snapshots]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PortfolioLatestSnapshot.portfolio_id],
+        set_={col: stmt.excluded[col] for col in LATEST_SNAPSHOT_COLUMNS},
+        where=stmt.excluded.timestamp >= PortfolioLatestSnapshot.timestamp,
+    )
+    db.execute(stmt)
@@ -0,0 +1,149 @@
+# backend/app/utils/intraday.py (NEW – combined intraday value curve per portfolio and for the whole book)
+# - Every holding's day_chart bars are padded into one (holdings × bars) matrix; the value at each point of a
+#   common 5-min grid is the last bar on or before it (forward fill via searchsorted), the previous close
+#   before the first bar, and the latest price for holdings without bars
+# - Prices × quantity × FX factor (utils.fx) go through one (portfolios + global × holdings) matmul
+# - Curves are cached in Redis per portfolio (intraday:portfolio:<id>, intraday:global). A refresh only
+#   recomputes grid points from the last cached one onwards (that bar may have been revised); the cache is
+#   rebuilt when the trading day or the holdings behind it (id / quantity / currency) change
+# - The grid covers only the latest session (Toronto day of the newest bar); older bars – e.g. a holding
+#   whose market is closed today – are not plotted, their last price is that holding's previous close
+# - update_prices refreshes all curves after writing new bars; the endpoints refresh on read as well, which
+#   is a no-op tail when nothing arrived. FX is the matrix at the time each point was computed
+from app.redis_client import r
+from app.models import Holding
+from app.utils.fx import FxMatrix, conversion_factors
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+import hashlib
+import logging
+import redis
+import json
+import pytz
+import os
+
+logger = logging.getLogger(__name__)
+
+INTRADAY_BAR_MS = 5 * 60 * 1000  # day_chart is 5-min bars
+INTRADAY_CACHE_TTL_SECONDS = int(os.getenv("INTRADAY_CACHE_TTL_SECONDS", str(24 * 3600)))
+GLOBAL = None  # curve key for the whole book
+SESSION_TZ = pytz.timezone("America/Toronto")
+
+def _cache_key(portfolio_id: Optional[int]) -> str:
+    return "intraday:global" if portfolio_id is GLOBAL else f"intraday:portfolio:{portfolio_id}"
+
+def _signature(holdings: List[Holding]) -> str:
+    """Changes when a position is added / removed / resized – cached points are then stale"""
+    parts = sorted(f"{h.id}:{h.quantity}:{h.currency.value}" for h in holdings)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+def session_start(last_bar_ms: int) -> int:
+    """Midnight (Toronto) of the day holding `last_bar_ms`, in epoch ms"""
+    day = datetime.fromtimestamp(last_bar_ms / 1000, SESSION_TZ).date()
+    midnight = SESSION_TZ.localize(datetime(day.year, day.month, day.day))
+    return int(midnight.timestamp() * 1000)
+
+def _bar_matrix(holdings: List[Holding], start_ms: float = -np.inf):
+    """
+    (holdings × bars) times (ms) / prices of bars at or after `start_ms`, +inf / NaN padded. Column 0 is a
+    sentinel before every grid point holding the previous close, so the forward fill never starts empty:
+    current price − daily change when the holding traded this session, else its last earlier bar
+    (first bar / latest price when neither is known).
+    """
+    charts = [sorted(h.day_chart or [], key=lambda p: p["time"]) for h in holdings]
+    sessions = [[p for p in chart if p["time"] >= start_ms] for chart in charts]
+    width = 1 + max((len(c) for c in sessions), default=0)
+    times = np.full((len(holdings), width), np.inf)
+    prices = np.full((len(holdings), width), np.nan)
+    times[:, 0] = -np.inf
+    for i, (h, chart, session) in enumerate(zip(holdings, charts, sessions)):
+        if session:
+            times[i, 1:len(session) + 1] = [p["time"] for p in session]
+            prices[i, 1:len(session) + 1] = [p["price"] for p in session]
+        if not session and chart:
+            prices[i, 0] = chart[-1]["price"]  # only stale bars – flat at its last price today
+        elif h.current_price is not None and h.daily_change is not None:
+            prices[i, 0] = h.current_price - h.daily_change
+        else:
+            prices[i, 0] = session[0]["price"] if session else (h.current_price or 0.0)
+    return times, prices
+
+def _prices_on(grid: np.ndarray, times: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """(holdings × len(grid)) last bar price on or before each grid time"""
+    # Bars are sorted per row, so "bars at or before t" is a count along the row
+    pos = (times[:, :, None] <= grid[None, None, :]).sum(axis=1) - 1
+    return np.take_along_axis(prices, pos, axis=1)
+
+def _read(key: str) -> Optional[dict]:
+    try:
+        value = r.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Intraday cache read failed for {key}: {e}")
+        return None
+    return json.loads(value) if value else None
+
+def _write(key: str, curve: dict) -> None:
+    try:
+        r.set(key, json.dumps(curve), ex=INTRADAY_CACHE_TTL_SECONDS)
+    except redis.RedisError as e:
+        logger.warning(f"Intraday cache write failed for {key}: {e}")
+
+def refresh_intraday_curves(holdings: List[Holding], portfolio_ids: List[int], fx: FxMatrix) -> Dict[Optional[int], dict]:
+    """
+    Bring the cached curves of `portfolio_ids` and the global book up to the latest bar.
+    `holdings` must be every holding (the global curve covers all of them). Returns {portfolio_id | None: curve}.
+    """
+    keys = [GLOBAL] + list(portfolio_ids)
+    members = {pid: [j for j, h in enumerate(holdings) if h.portfolio_id == pid] for pid in portfolio_ids}
+    members[GLOBAL] = list(range(len(holdings)))
+
+    last_bar = max((p["time"] for h in holdings for p in (h.day_chart or [])), default=None)
+    if last_bar is None:
+        return {key: {"points": [], "previous_close": 0.0, "updated_at": None} for key in keys}
+    last_bar = int(last_bar)
+    times, prices = _bar_matrix(holdings, session_start(last_bar))
+    bar_times = times[np.isfinite(times)]
+    day_start = int(bar_times.min()) // INTRADAY_BAR_MS * INTRADAY_BAR_MS
+
+    weights = np.array([h.quantity or 0.0 for h in holdings]) * conversion_factors(
+        [h.symbol for h in holdings], currencies=[h.currency.value for h in holdings], fx=fx,
+    )
+    membership = np.zeros((len(keys), len(holdings)))
+    for row, key in enumerate(keys):
+        membership[row, members[key]] = 1.0
+
+    # Keep cached points before each curve's last point; everything from there on is recomputed
+    kept, since = {}, {}
+    for key in keys:
+        cached = _read(_cache_key(key))
+        signature = _signature([holdings[j] for j in members[key]])
+        if cached and cached.get("day_start") == day_start and cached.get("signature") == signature and cached["points"]:
+            kept[key] = cached["points"][:-1]
+            since[key] = cached["points"][-1]["time"]
+        else:
+            kept[key] = []
+            since[key] = day_start
+
+    first = min(since.values())
+    grid = np.arange(first, last_bar // INTRADAY_BAR_MS * INTRADAY_BAR_MS + 1, INTRADAY_BAR_MS, dtype=np.float64)
+    # One matmul for every curve: (curves × holdings) @ (holdings × grid)
+    values = membership @ (_prices_on(grid, times, prices) * weights[:, None])
+    previous_close = membership @ (prices[:, 0] * weights)
+
+    now = datetime.utcnow().isoformat()
+    curves = {}
+    for row, key in enumerate(keys):
+        tail = grid >= since[key]
+        curve = {
+            "day_start": day_start,
+            "signature": _signature([holdings[j] for j in members[key]]),
+            "previous_close": round(float(previous_close[row]), 2),
+            "points": kept[key] + [
+                {"time": int(t), "value": round(float(v), 2)} for t, v in zip(grid[tail], values[row, tail])
+            ],
+            "updated_at": now,
+        }
+        _write(_cache_key(key), curve)
+        curves[key] = curve
+    return curves
@@ -0,0 +1,150 @@
+# backend/app/utils/monte_carlo.py (NEW – Monte Carlo projection of portfolio value and dividend income)
+# - Monthly returns come from the held positions' CAD daily returns (cached returns matrix, today's weights),
+#   compounded into non-overlapping 21-session months
+# - "bootstrap" resamples those historical months, "parametric" draws lognormal months with their mean / std
+# - Paths are simulated in vectorized batches of MC_BATCH_PATHS spread over a process pool; each batch has its
+#   own child seed, so a given seed gives the same bands whatever the worker count
+# - Value follows total (dividend-reinvested) returns plus the monthly contribution; dividend income is the
+#   current portfolio yield applied to the projected value
+# - Finished projections are cached in Redis on a hash of every input
+from app.redis_client import r
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import multiprocessing
+import threading
+import hashlib
+import logging
+import redis
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+MC_WORKERS = int(os.getenv("MC_WORKERS", str(os.cpu_count() or 2)))
+MC_BATCH_PATHS = int(os.getenv("MC_BATCH_PATHS", "2000"))
+MC_CACHE_TTL_SECONDS = int(os.getenv("MC_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+SESSIONS_PER_MONTH = 21
+METHODS = ("bootstrap", "parametric")
+PERCENTILES = (5, 25, 50, 75, 95)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def monthly_returns(daily: np.ndarray) -> np.ndarray:
+    """Compound consecutive blocks of SESSIONS_PER_MONTH daily returns (the oldest partial block is dropped)"""
+    months = len(daily) // SESSIONS_PER_MONTH
+    if months == 0:
+        return np.array([])
+    blocks = daily[len(daily) - months * SESSIONS_PER_MONTH:].reshape(months, SESSIONS_PER_MONTH)
+    return np.expm1(np.log1p(blocks).sum(axis=1))
+
+def simulate_batch(job: dict) -> np.ndarray:
+    """(months + 1, paths) float32 values for one batch of paths"""
+    rng = np.random.default_rng(job["seed"])
+    months, paths = job["months"], job["paths"]
+    history = np.asarray(job["history"])
+
+    if job["method"] == "bootstrap":
+        draws = history[rng.integers(0, len(history), size=(months, paths))]
+    else:
+        log_returns = np.log1p(history)
+        draws = np.expm1(rng.normal(log_returns.mean(), log_returns.std(ddof=1), size=(months, paths)))
+
+    values = np.empty((months + 1, paths), dtype=np.float64)
+    values[0] = job["start_value"]
+    contribution = job["monthly_contribution"]
+    for month in range(months):
+        # Contributions land at month end; a portfolio drawn down to zero stays there
+        values[month + 1] = np.maximum(values[month] * (1.0 + draws[month]) + contribution, 0.0)
+    return values.astype(np.float32)
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+def _run_batches(jobs: List[dict], workers: int) -> List[np.ndarray]:
+    # Daemonic processes (Celery prefork children) may not spawn a pool – run in-process there
+    if workers <= 1 or len(jobs) <= 1 or multiprocessing.current_process().daemon:
+        return [simulate_batch(job) for job in jobs]
+    return list(_get_pool(workers).map(simulate_batch, jobs))
+
+def _cache_key(params: dict) -> str:
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"montecarlo:{digest}"
+
+def project(
+    history: np.ndarray,
+    start_value: float,
+    monthly_contribution: float,
+    dividend_yield: float,
+    years: int,
+    paths: int,
+    method: str = "bootstrap",
+    seed: int = 0,
+    cache_params: Optional[dict] = None,
+    workers: int = MC_WORKERS,
+) -> dict:
+    """
+    Percentile bands per month for value and annual dividend income.
+    `history` = historical monthly returns; `cache_params` identifies the inputs behind it (cache key).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}' – expected one of {', '.join(METHODS)}")
+
+    key = None
+    if cache_params is not None:
+        key = _cache_key({
+            **cache_params,
+            "start_value": round(start_value, 2),
+            "monthly_contribution": round(monthly_contribution, 2),
+            "dividend_yield": round(dividend_yield, 6),
+            "years": years, "paths": paths, "method": method, "seed": seed,
+        })
+        try:
+            cached = r.get(key)
+            if cached:
+                return json.loads(cached)
+        except redis.RedisError as e:
+            logger.warning(f"Monte Carlo cache read failed: {e}")
+
+    months = years * 12
+    sizes = [MC_BATCH_PATHS] * (paths // MC_BATCH_PATHS) + ([paths % MC_BATCH_PATHS] if paths % MC_BATCH_PATHS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [
+        {
+            "seed": child, "paths": size, "months": months, "method": method,
+            "history": history.tolist(), "start_value": start_value, "monthly_contribution": monthly_contribution,
+        }
+        for child, size in zip(seeds, sizes)
+    ]
+    values = np.hstack(_run_batches(jobs, workers))
+
+    bands = np.percentile(values, PERCENTILES, axis=1)
+    final = values[-1]
+    result = {
+        "months": list(range(months + 1)),
+        "value": {f"p{p}": np.round(band, 2).tolist() for p, band in zip(PERCENTILES, bands)},
+        # Income is monotonic in value, so value percentiles map straight to income percentiles
+        "dividend_income_annual": {f"p{p}": np.round(band * dividend_yield, 2).tolist() for p, band in zip(PERCENTILES, bands)},
+        "start_value": start_value,
+        "monthly_contribution": monthly_contribution,
+        "dividend_yield": dividend_yield,
+        "method": method,
+        "paths": paths,
+        "years": years,
+        "history_months": int(len(history)),
+        # Share of paths ending below what was put in (start value + all contributions)
+        "probability_below_invested": float((final < start_value + monthly_contribution * months).mean()),
+    }
+
+    if key is not None:
+        try:
+            r.set(key, json.dumps(result), ex=MC_CACHE_TTL_SECONDS)
+        except redis.RedisError as e:
+            logger.warning(f"Monte Carlo cache write failed: {e}")
+    return result
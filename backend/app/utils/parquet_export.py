@@ -0,0 +1,266 @@
+# backend/app/utils/parquet_export.py (NEW – incremental columnar export of history / price data to Parquet or Arrow IPC)
+# - Rows are read in keyset batches of EXPORT_BATCH_ROWS (ORDER BY key, tiebreak LIMIT n) – never the whole table
+# - Each batch becomes one Arrow record batch / Parquet row group and is flushed before the next query runs
+# - Exports cover (after, upto]: `upto` is the dataset's max key taken up front, returned to callers as the
+#   new watermark so the next run appends only newer rows
+# - History tables are keyed on id (sequence order = insertion order) so backfilled past rows still land in
+#   the next export; day_chart prices have no row id and are only ever appended at newer times, so they use time
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, tuple_, cast, BigInteger, Float, column
+from sqlalchemy.dialects.postgresql import JSONB
+from app.models import PortfolioHistory, GlobalHistory, Holding
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Union
+import pyarrow as pa
+import pyarrow.parquet as pq
+import os
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "50000"))
+
+FORMATS = ("parquet", "arrow")
+
+# A watermark is a row id (history tables) or a naive UTC datetime (price points)
+Watermark = Union[int, datetime]
+
+KEY_KINDS = ("id", "timestamp", "ms")
+
+class ExportDataset:
+    """
+    One exportable table: `source` is a subquery whose columns match `schema` (same names, same order);
+    `key` is the watermark column – an insertion-ordered id, a timestamp, or epoch ms (`key_kind`) – and
+    `tiebreak` makes the keyset ordering unique.
+    """
+
+    def __init__(self, name: str, schema: pa.Schema, source, key: str, tiebreak: str, key_kind: str = "id"):
+        if key_kind not in KEY_KINDS:
+            raise ValueError(f"Unknown key kind '{key_kind}' – expected one of {', '.join(KEY_KINDS)}")
+        self.name = name
+        self.schema = schema
+        self.source = source
+        self.key = key
+        self.tiebreak = tiebreak
+        self.key_kind = key_kind
+
+    def to_key(self, watermark: Watermark):
+        if self.key_kind == "ms":
+            return int(watermark.replace(tzinfo=timezone.utc).timestamp() * 1000)
+        return watermark
+
+    def from_key(self, value) -> Watermark:
+        if self.key_kind == "ms":
+            return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(tzinfo=None)
+        return value
+
+    def parse_watermark(self, text: str) -> Watermark:
+        """
+        Inverse of format_watermark – ValueError when `text` is not this dataset's kind of watermark.
+        Times with an offset are converted to naive UTC so they compare with the stored watermark.
+        """
+        if self.key_kind == "id":
+            return int(text)
+        watermark = datetime.fromisoformat(text)
+        if watermark.tzinfo is not None:
+            watermark = watermark.astimezone(timezone.utc).replace(tzinfo=None)
+        return watermark
+
+    def format_watermark(self, watermark: Watermark) -> str:
+        return str(watermark) if self.key_kind == "id" else watermark.isoformat()
+
+HISTORY_VALUE_FIELDS = [
+    pa.field("total_value", pa.float64()),
+    pa.field("daily_change", pa.float64()),
+    pa.field("daily_percent", pa.float64()),
+    pa.field("all_time_gain", pa.float64()),
+    pa.field("all_time_percent", pa.float64()),
+]
+
+def _portfolio_history_dataset() -> ExportDataset:
+    source = select(
+        PortfolioHistory.id,
+        PortfolioHistory.portfolio_id,
+        PortfolioHistory.timestamp,
+        PortfolioHistory.total_value,
+        PortfolioHistory.daily_change,
+        PortfolioHistory.daily_percent,
+        PortfolioHistory.all_time_gain,
+        PortfolioHistory.all_time_percent,
+        func.coalesce(PortfolioHistory.is_eod, False).label("is_eod"),
+    ).subquery("portfolio_history_export")
+    schema = pa.schema([
+        pa.field("id", pa.int64()),
+        pa.field("portfolio_id", pa.int64()),
+        pa.field("timestamp", pa.timestamp("us")),
+    ] + HISTORY_VALUE_FIELDS + [
+        pa.field("is_eod", pa.bool_()),
+    ])
+    return ExportDataset("portfolio_history", schema, source, key="id", tiebreak="id")
+
+def _global_history_dataset() -> ExportDataset:
+    source = select(
+        GlobalHistory.id,
+        GlobalHistory.timestamp,
+        GlobalHistory.total_value,
+        GlobalHistory.daily_change,
+        GlobalHistory.daily_percent,
+        GlobalHistory.all_time_gain,
+        GlobalHistory.all_time_percent,
+        func.coalesce(GlobalHistory.is_eod, False).label("is_eod"),
+    ).subquery("global_history_export")
+    schema = pa.schema([
+        pa.field("id", pa.int64()),
+        pa.field("timestamp", pa.timestamp("us")),
+    ] + HISTORY_VALUE_FIELDS + [
+        pa.field("is_eod", pa.bool_()),
+    ])
+    return ExportDataset("global_history", schema, source, key="id", tiebreak="id")
+
+def _prices_dataset() -> ExportDataset:
+    """Intraday price points stored in holdings.day_chart, one row per (symbol, time)"""
+    point = func.jsonb_array_elements(Holding.day_chart).table_valued(column("value", JSONB)).lateral("point")
+    time_ms = cast(point.c.value["time"].astext, BigInteger)
+    # The same symbol can be held in several portfolios – keep one point per (symbol, time)
+    source = (
+        select(
+            Holding.symbol.label("symbol"),
+            time_ms.label("time"),
+            cast(point.c.value["price"].astext, Float).label("price"),
+        )
+        .select_from(Holding)
+        .join(point, Holding.day_chart.isnot(None))
+        .distinct(Holding.symbol, time_ms)
+        .subquery("prices_export")
+    )
+    schema = pa.schema([
+        pa.field("symbol", pa.string()),
+        pa.field("time", pa.timestamp("ms", tz="UTC")),
+        pa.field("price", pa.float64()),
+    ])
+    return ExportDataset("prices", schema, source, key="time", tiebreak="symbol", key_kind="ms")
+
+EXPORT_DATASETS = {
+    dataset.name: dataset
+    for dataset in (_portfolio_history_dataset(), _global_history_dataset(), _prices_dataset())
+}
+
+def get_export_dataset(name: str) -> ExportDataset:
+    if name not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown dataset '{name}' – expected one of {', '.join(EXPORT_DATASETS)}")
+    return EXPORT_DATASETS[name]
+
+def export_watermark(db: Session, dataset: ExportDataset) -> Optional[Watermark]:
+    """Newest key currently in the dataset (None when empty) – the `upto` bound of an export"""
+    value = db.execute(select(func.max(dataset.source.c[dataset.key]))).scalar()
+    return dataset.from_key(value) if value is not None else None
+
+def iter_record_batches(
+    db: Session,
+    dataset: ExportDataset,
+    after: Optional[Watermark],
+    upto: Watermark,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> Iterator[pa.RecordBatch]:
+    """Keyset-paginated read of (after, upto] as Arrow record batches"""
+    src = dataset.source
+    key, tiebreak = src.c[dataset.key], src.c[dataset.tiebreak]
+    base = select(*[src.c[name] for name in dataset.schema.names]).where(key <= dataset.to_key(upto))
+    if after is not None:
+        base = base.where(key > dataset.to_key(after))
+    base = base.order_by(key, tiebreak).limit(batch_rows)
+
+    last = None
+    while True:
+        stmt = base if last is None else base.where(tuple_(key, tiebreak) > tuple_(*last))
+        rows = db.execute(stmt).all()
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, dataset.schema)],
+            schema=dataset.schema,
+        )
+        if len(rows) < batch_rows:
+            return
+        key_index = dataset.schema.get_field_index(dataset.key)
+        tiebreak_index = dataset.schema.get_field_index(dataset.tiebreak)
+        last = (rows[-1][key_index], rows[-1][tiebreak_index])
+
+class _DrainableSink:
+    """Write-only file object that hands back whatever was written since the last drain()"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _open_writer(sink, schema: pa.Schema, fmt: str):
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    return pq.ParquetWriter(sink, schema, compression="zstd")
+
+def stream_export(
+    db: Session,
+    dataset: ExportDataset,
+    after: Optional[Watermark],
+    upto: Optional[Watermark],
+    fmt: str = "parquet",
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> Iterator[bytes]:
+    """Encoded file contents, one chunk per row group (an empty but valid file when there is nothing new)"""
+    sink = _DrainableSink()
+    writer = _open_writer(sink, dataset.schema, fmt)
+    if upto is not None:
+        for batch in iter_record_batches(db, dataset, after, upto, batch_rows):
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    writer.close()
+    yield sink.drain()
+
+def write_export(
+    db: Session,
+    dataset: ExportDataset,
+    path: str,
+    after: Optional[Watermark],
+    upto: Watermark,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> int:
+    """Write (after, upto] to a Parquet file at `path`; returns the row count (no file when 0)"""
+    rows = 0
+    writer = None
+    try:
+        for batch in iter_record_batches(db, dataset, after, upto, batch_rows):
+            if writer is None:
+                writer = pq.ParquetWriter(path, dataset.schema, compression="zstd")
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
@@ -0,0 +1,318 @@
+# backend/app/utils/price_warehouse.py (NEW – local daily OHLCV warehouse in Parquet)
+# Layout (one directory per symbol and calendar year, append = new part file):
+#   <PRICE_WAREHOUSE_DIR>/symbol=<SYMBOL>/year=<YYYY>/part-<first>-<last>.parquet
+#   <PRICE_WAREHOUSE_DIR>/_manifest.json   {SYMBOL: last stored date}
+#   <PRICE_WAREHOUSE_DIR>/_empty.json      {SYMBOL: day a download last came back empty} (delisted / unknown)
+#   <PRICE_WAREHOUSE_DIR>/_rewritten.json  {SYMBOL: day its history was last re-downloaded}
+# - close (split-adjusted) and adj_close (split- and dividend-adjusted) are Yahoo's values as of the download, so
+#   a dividend or split in a newly downloaded range re-downloads that symbol's whole history and replaces it –
+#   stored rows always share one adjustment basis
+# - Reads are memory-mapped and column-pruned; load_price_matrix aligns many symbols on one date axis
+# - A year directory with more than PRICE_WAREHOUSE_MAX_PARTS parts is compacted into a single file
+# - Writers (API requests and Celery tasks) are serialized by a file lock
+from app.utils.yahoo import fetch_daily_history
+from app.utils.file_lock import file_lock
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import logging
+import shutil
+import json
+import glob
+import os
+
+logger = logging.getLogger(__name__)
+
+PRICE_WAREHOUSE_DIR = os.getenv(
+    "PRICE_WAREHOUSE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "prices"),
+)
+# First date fetched for a symbol that has no history yet
+PRICE_WAREHOUSE_START = date.fromisoformat(os.getenv("PRICE_WAREHOUSE_START", "2015-01-01"))
+PRICE_WAREHOUSE_MAX_PARTS = int(os.getenv("PRICE_WAREHOUSE_MAX_PARTS", "24"))
+# Symbols whose download came back empty are skipped for this many days before being tried again
+PRICE_WAREHOUSE_EMPTY_RETRY_DAYS = int(os.getenv("PRICE_WAREHOUSE_EMPTY_RETRY_DAYS", "7"))
+# An empty answer only counts as "no data" when the requested range is at least this long (holidays / weekends)
+EMPTY_MIN_RANGE_DAYS = 7
+
+MANIFEST_FILE = "_manifest.json"
+EMPTY_FILE = "_empty.json"
+REWRITTEN_FILE = "_rewritten.json"
+LOCK_FILE = ".lock"
+
+SCHEMA = pa.schema([
+    pa.field("date", pa.date32()),
+    pa.field("open", pa.float64()),
+    pa.field("high", pa.float64()),
+    pa.field("low", pa.float64()),
+    pa.field("close", pa.float64()),
+    pa.field("adj_close", pa.float64()),
+    pa.field("volume", pa.float64()),
+])
+PRICE_FIELDS = tuple(SCHEMA.names[1:])
+# Download columns that mark a corporate action on that day (0 = none)
+ACTION_FIELDS = ("dividends", "splits")
+
+def _symbol_dir(symbol: str) -> str:
+    # quote() keeps tickers like ^GSPC or BRK/B file-system safe
+    return os.path.join(PRICE_WAREHOUSE_DIR, f"symbol={quote(symbol.upper(), safe='.-=')}")
+
+def _read_dates(name: str) -> Dict[str, date]:
+    path = os.path.join(PRICE_WAREHOUSE_DIR, name)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {symbol: date.fromisoformat(value) for symbol, value in json.load(f).items()}
+
+def _write_dates(name: str, dates: Dict[str, date]):
+    os.makedirs(PRICE_WAREHOUSE_DIR, exist_ok=True)
+    path = os.path.join(PRICE_WAREHOUSE_DIR, name)
+    with open(path + ".tmp", "w") as f:
+        json.dump({symbol: value.isoformat() for symbol, value in sorted(dates.items())}, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def read_manifest() -> Dict[str, date]:
+    return _read_dates(MANIFEST_FILE)
+
+def _write_manifest(manifest: Dict[str, date]):
+    _write_dates(MANIFEST_FILE, manifest)
+
+def read_empty() -> Dict[str, date]:
+    """{SYMBOL: day its last download came back empty}"""
+    return _read_dates(EMPTY_FILE)
+
+def read_rewritten() -> Dict[str, date]:
+    """{SYMBOL: day its stored history was last replaced} – anything derived from older rows is stale"""
+    return _read_dates(REWRITTEN_FILE)
+
+def last_stored_dates(symbols: Iterable[str]) -> Dict[str, Optional[date]]:
+    manifest = read_manifest()
+    return {symbol.upper(): manifest.get(symbol.upper()) for symbol in symbols}
+
+def _frame_to_table(frame: pd.DataFrame) -> pa.Table:
+    columns = {"date": pa.array(frame.index.date, type=pa.date32())}
+    for name in PRICE_FIELDS:
+        values = frame[name].to_numpy(dtype=np.float64) if name in frame.columns else np.full(len(frame), np.nan)
+        columns[name] = pa.array(values, type=pa.float64(), from_pandas=True)
+    return pa.table(columns, schema=SCHEMA)
+
+def _compact(directory: str):
+    parts = sorted(glob.glob(os.path.join(directory, "part-*.parquet")))
+    if len(parts) <= PRICE_WAREHOUSE_MAX_PARTS:
+        return
+    table = pa.concat_tables([pq.read_table(p, memory_map=True) for p in parts]).sort_by("date")
+    first, last = table["date"][0].as_py(), table["date"][-1].as_py()
+    target = os.path.join(directory, f"part-{first:%Y%m%d}-{last:%Y%m%d}.parquet")
+    pq.write_table(table, target + ".tmp", compression="zstd")
+    for p in parts:
+        os.remove(p)
+    os.replace(target + ".tmp", target)
+
+def _has_corporate_action(frame: pd.DataFrame) -> bool:
+    """A dividend or split re-bases every stored close / adj_close before it"""
+    return any(name in frame.columns and (frame[name].fillna(0) != 0).any() for name in ACTION_FIELDS)
+
+def _write_parts(root: str, frame: pd.DataFrame):
+    """One part file per calendar year of `frame` under `root` (a symbol directory)"""
+    for year, chunk in frame.groupby(frame.index.year):
+        directory = os.path.join(root, f"year={int(year)}")
+        os.makedirs(directory, exist_ok=True)
+        first, last_day = chunk.index[0].date(), chunk.index[-1].date()
+        path = os.path.join(directory, f"part-{first:%Y%m%d}-{last_day:%Y%m%d}.parquet")
+        pq.write_table(_frame_to_table(chunk), path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+        _compact(directory)
+
+def append_prices(symbol: str, frame: pd.DataFrame, manifest: Dict[str, date]) -> int:
+    """
+    Append rows newer than the symbol's last stored date (older/duplicate days are dropped).
+    Updates `manifest` in place; the caller persists it once per batch.
+    """
+    symbol = symbol.upper()
+    last = manifest.get(symbol)
+    if last is not None:
+        frame = frame[frame.index.date > last]
+    if frame.empty:
+        return 0
+
+    frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+    _write_parts(_symbol_dir(symbol), frame)
+    manifest[symbol] = frame.index[-1].date()
+    return len(frame)
+
+def replace_prices(symbol: str, frame: pd.DataFrame, manifest: Dict[str, date]) -> int:
+    """
+    Replace a symbol's whole stored history with `frame`. The new files are built in a sibling directory
+    that is swapped in once complete. Updates `manifest` in place.
+    """
+    symbol = symbol.upper()
+    directory = _symbol_dir(symbol)
+    staging, old = directory + ".tmp", directory + ".old"
+    shutil.rmtree(staging, ignore_errors=True)
+    frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+    _write_parts(staging, frame)
+
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, old)
+    os.replace(staging, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    manifest[symbol] = frame.index[-1].date()
+    return len(frame)
+
+def _rewrite(symbols: List[str], through: date, manifest: Dict[str, date]) -> Dict[str, int]:
+    """Re-download and replace the full history of `symbols` (caller holds the lock and persists the manifest)"""
+    frames = fetch_daily_history(symbols, PRICE_WAREHOUSE_START, through + timedelta(days=1))
+    rewritten = read_rewritten()
+    written: Dict[str, int] = {}
+    for symbol in symbols:
+        frame = frames.get(symbol)
+        if frame is not None:
+            frame = frame[frame.index.date <= through]
+        if frame is None or frame.empty:
+            # Manifest untouched → the next update sees the same action and tries again
+            logger.warning(f"Price warehouse: re-download of {symbol} came back empty – history kept as is")
+            written[symbol] = 0
+            continue
+        written[symbol] = replace_prices(symbol, frame, manifest)
+        rewritten[symbol] = date.today()
+    _write_dates(REWRITTEN_FILE, rewritten)
+    return written
+
+def rewrite_history(symbols: Iterable[str], through: date) -> Dict[str, int]:
+    """Replace the stored history of `symbols` with a fresh download through `through` → {SYMBOL: rows written}"""
+    with file_lock(os.path.join(PRICE_WAREHOUSE_DIR, LOCK_FILE)):
+        manifest = read_manifest()
+        written = _rewrite(sorted({s.upper() for s in symbols}), through, manifest)
+        _write_manifest(manifest)
+        return written
+
+def update_warehouse(symbols: Iterable[str], through: date) -> Dict[str, int]:
+    """
+    Bring every symbol up to `through` (inclusive) with one bulk download per start date: the day after a
+    stored symbol's last date, PRICE_WAREHOUSE_START for new symbols. Symbols that recently came back empty
+    (delisted / unknown, see _empty.json) are skipped for PRICE_WAREHOUSE_EMPTY_RETRY_DAYS.
+    A stored symbol whose new rows include a dividend or split has its whole history replaced instead.
+    Returns {SYMBOL: rows appended} (every row of a replaced history).
+    """
+    with file_lock(os.path.join(PRICE_WAREHOUSE_DIR, LOCK_FILE)):
+        manifest = read_manifest()
+        empty = read_empty()
+        retry_after = through - timedelta(days=PRICE_WAREHOUSE_EMPTY_RETRY_DAYS)
+
+        groups: Dict[date, List[str]] = {}
+        for symbol in sorted({s.upper() for s in symbols}):
+            if symbol in empty and empty[symbol] > retry_after:
+                continue
+            start = manifest[symbol] + timedelta(days=1) if symbol in manifest else PRICE_WAREHOUSE_START
+            if start <= through:
+                groups.setdefault(start, []).append(symbol)
+
+        appended: Dict[str, int] = {}
+        stale: List[str] = []
+        for start, group in sorted(groups.items()):
+            frames = fetch_daily_history(group, start, through + timedelta(days=1))
+            for symbol in group:
+                frame = frames.get(symbol)
+                if frame is not None:
+                    frame = frame[frame.index.date <= through]
+                if frame is None or frame.empty:
+                    appended[symbol] = 0
+                    if (through - start).days >= EMPTY_MIN_RANGE_DAYS:
+                        empty[symbol] = through
+                    continue
+                empty.pop(symbol, None)
+                if symbol in manifest and _has_corporate_action(frame):
+                    stale.append(symbol)
+                    continue
+                appended[symbol] = append_prices(symbol, frame, manifest)
+            _write_manifest(manifest)
+        if groups:
+            _write_dates(EMPTY_FILE, empty)
+        if stale:
+            logger.info(f"Price warehouse: dividend / split in new rows – replacing the history of {', '.join(stale)}")
+            appended.update(_rewrite(stale, through, manifest))
+            _write_manifest(manifest)
+        return appended
+
+def load_symbol_history(
+    symbol: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    columns: Tuple[str, ...] = PRICE_FIELDS,
+) -> pa.Table:
+    """Stored rows for one symbol in [start, end], sorted by date (memory-mapped, only the requested columns)"""
+    first_year = start.year if start else 0
+    last_year = end.year if end else 9999
+
+    def part_paths() -> List[str]:
+        paths = []
+        for directory in sorted(glob.glob(os.path.join(_symbol_dir(symbol), "year=*"))):
+            year = int(directory.rsplit("=", 1)[1])
+            if first_year <= year <= last_year:
+                paths.extend(sorted(glob.glob(os.path.join(directory, "part-*.parquet"))))
+        return paths
+
+    wanted = ["date"] + list(dict.fromkeys(c for c in columns if c != "date"))
+    try:
+        tables = [pq.read_table(p, columns=wanted, memory_map=True) for p in part_paths()]
+    except FileNotFoundError:
+        # A writer compacted or replaced the parts between listing and reading – list them again
+        tables = [pq.read_table(p, columns=wanted, memory_map=True) for p in part_paths()]
+    if not tables:
+        return SCHEMA.empty_table().select(wanted)
+
+    table = pa.concat_tables(tables)
+    dates = table["date"].to_numpy()
+    mask = np.ones(len(dates), dtype=bool)
+    if start:
+        mask &= dates >= np.datetime64(start, "D")
+    if end:
+        mask &= dates <= np.datetime64(end, "D")
+    return table.filter(pa.array(mask)).sort_by("date")
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Column-wise forward fill of NaNs (leading NaNs stay NaN)"""
+    rows = np.arange(matrix.shape[0])[:, None]
+    last_valid = np.where(np.isnan(matrix), 0, rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    # Rows before a column's first observation point at row 0, which is NaN for that column
+    return matrix[last_valid, np.arange(matrix.shape[1])]
+
+def load_price_matrix(
+    symbols: List[str],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    field: str = "adj_close",
+    ffill: bool = True,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aligned prices for a symbol set → (dates: datetime64[D] (n,), values: float64 (n, len(symbols))).
+    The date axis is the union of stored trading days; gaps (holidays on one exchange, missing data)
+    are forward-filled when ffill=True, NaN otherwise. Columns follow the order of `symbols`.
+    """
+    if field not in PRICE_FIELDS:
+        raise ValueError(f"Unknown price field '{field}' – expected one of {', '.join(PRICE_FIELDS)}")
+
+    series = []
+    for symbol in symbols:
+        table = load_symbol_history(symbol, start, end, columns=(field, "close"))
+        values = table[field].to_numpy(zero_copy_only=False).astype(np.float64)
+        if field == "adj_close":
+            # Some tickers (FX, indices) have no adjusted close – use close there
+            values = np.where(np.isnan(values), table["close"].to_numpy(zero_copy_only=False), values)
+        series.append((table["date"].to_numpy().astype("datetime64[D]"), values))
+
+    if not series or all(len(d) == 0 for d, _ in series):
+        return np.array([], dtype="datetime64[D]"), np.empty((0, len(symbols)))
+
+    dates = np.unique(np.concatenate([d for d, _ in series]))
+    matrix = np.full((len(dates), len(symbols)), np.nan)
+    for col, (symbol_dates, values) in enumerate(series):
+        matrix[np.searchsorted(dates, symbol_dates), col] = values
+
+    return dates, forward_fill(matrix) if ffill else matrix
@@ -0,0 +1,205 @@
+# backend/app/utils/rebalance.py (NEW – target-allocation rebalancing for any number of portfolios at once)
+# - Every holding of every portfolio is one row of flat arrays (portfolio index, price, FX, quantity);
+#   per-portfolio totals are segment sums (np.bincount), so one pass handles all portfolios
+# - Symbol targets set a holding's target value directly; sector targets are matched on the look-through
+#   sector matrix by iterative proportional fitting (sectors without a target share the remaining weight)
+# - Holdings without a symbol target are left alone; target weights are of total value including cash
+# - Only positions outside the drift band trade: back to target (mode="target") or to the band edge (mode="edge")
+# - Whole shares: buys round down, sells round to nearest (never more than held); buys are scaled down when
+#   cash + sale proceeds can't cover them. Trades settle in their quote currency – the conversions needed
+#   (CAD into a short currency, or surplus foreign cash into CAD) are reported per currency
+from sqlalchemy.orm import Session
+from app.models import Holding, TargetAllocation
+from app.utils.exposures import holding_sector_matrix
+from app.utils.fx import REPORTING_CURRENCY, FxMatrix, price_unit
+from typing import Dict, List, Optional
+import numpy as np
+
+SYMBOL = "symbol"
+SECTOR = "sector"
+KINDS = (SYMBOL, SECTOR)
+MODES = ("target", "edge")
+IPF_ITERATIONS = 50
+
+def _segment_sum(index: np.ndarray, values: np.ndarray, count: int) -> np.ndarray:
+    if values.ndim == 1:
+        return np.bincount(index, weights=values, minlength=count)
+    out = np.zeros((count,) + values.shape[1:])
+    np.add.at(out, index, values)
+    return out
+
+def rebalance(
+    db: Session,
+    portfolio_ids: List[int],
+    holdings: List[Holding],
+    targets: List[TargetAllocation],
+    fx: FxMatrix,
+    band_percent: float = 2.0,
+    mode: str = "target",
+    cash: Optional[Dict[int, Dict[str, float]]] = None,
+) -> List[dict]:
+    """
+    Trade lists for `portfolio_ids`. `cash` = {portfolio_id: {currency: amount}} available to invest.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}' – expected one of {', '.join(MODES)}")
+    cash = cash or {}
+    p_index = {pid: i for i, pid in enumerate(portfolio_ids)}
+    count = len(portfolio_ids)
+
+    holdings = [h for h in holdings if h.portfolio_id in p_index]
+    prices = np.array([h.current_price or ((h.market_value or 0) / h.quantity if h.quantity else 0) for h in holdings], dtype=np.float64)
+    priced = prices > 0
+    unpriced = [h for h, ok in zip(holdings, priced) if not ok]
+    holdings = [h for h, ok in zip(holdings, priced) if ok]
+    prices = prices[priced]
+
+    pidx = np.array([p_index[h.portfolio_id] for h in holdings], dtype=np.int64)
+    holding_currency = [h.currency.value for h in holdings]
+    currencies = sorted(set(holding_currency) | {c for amounts in cash.values() for c in amounts} | {REPORTING_CURRENCY})
+    c_index = {c: i for i, c in enumerate(currencies)}
+    cidx = np.array([c_index[c] for c in holding_currency], dtype=np.int64)
+    to_cad = fx.factors(currencies)
+    quantity = np.array([h.quantity or 0.0 for h in holdings], dtype=np.float64)
+    units = np.array([price_unit(h.symbol) for h in holdings], dtype=np.float64)
+    price_native = prices * units  # per share in the quote currency (pence → pounds)
+    price_cad = price_native * to_cad[cidx]
+    value = quantity * price_cad
+
+    cash_native = np.array([[cash.get(pid, {}).get(c, 0.0) for c in currencies] for pid in portfolio_ids], dtype=np.float64).reshape(count, len(currencies))
+    cash_total = cash_native @ to_cad
+    total = _segment_sum(pidx, value, count) + cash_total
+
+    # Target value per holding (unmanaged holdings keep their value)
+    by_portfolio: Dict[int, Dict[str, float]] = {}
+    kinds: Dict[int, str] = {}
+    for t in targets:
+        if t.portfolio_id in p_index:
+            by_portfolio.setdefault(t.portfolio_id, {})[t.key] = t.weight_percent / 100.0
+            kinds[t.portfolio_id] = t.kind
+    target_value = value.copy()
+    unplaced: Dict[int, List[dict]] = {}
+
+    symbol_rows = np.array([kinds.get(h.portfolio_id) == SYMBOL and h.symbol.upper() in by_portfolio[h.portfolio_id] for h in holdings], dtype=bool)
+    if symbol_rows.any():
+        weights = np.array([by_portfolio[h.portfolio_id].get(h.symbol.upper(), 0.0) for h in holdings])
+        # The same symbol in several rows of one portfolio shares its target pro rata to current value
+        keys = np.array([f"{h.portfolio_id}:{h.symbol.upper()}" for h in holdings])
+        _, group = np.unique(keys, return_inverse=True)
+        group_value = np.bincount(group, weights=value)[group]
+        share = np.where(group_value > 0, value / np.where(group_value > 0, group_value, 1.0), 1.0 / np.bincount(group)[group])
+        target_value = np.where(symbol_rows, weights * total[pidx] * share, target_value)
+    for pid, kind in kinds.items():
+        if kind != SYMBOL:
+            continue
+        held = {h.symbol.upper() for h in holdings if h.portfolio_id == pid}
+        missing = [(key, w) for key, w in by_portfolio[pid].items() if key not in held]
+        if missing:
+            unplaced[pid] = [{"key": key, "target_weight": w * 100, "target_value": w * total[p_index[pid]]} for key, w in missing]
+
+    sector_rows = np.array([kinds.get(h.portfolio_id) == SECTOR for h in holdings], dtype=bool)
+    if sector_rows.any():
+        sectors, exposure = holding_sector_matrix(db, holdings)
+        s_index = {s: i for i, s in enumerate(sectors)}
+        current = _segment_sum(pidx, value[:, None] * exposure, count)
+        desired = current.copy()
+        for pid, kind in kinds.items():
+            if kind != SECTOR:
+                continue
+            row = p_index[pid]
+            targeted = np.zeros(len(sectors), dtype=bool)
+            for key, w in by_portfolio[pid].items():
+                if key in s_index:
+                    desired[row, s_index[key]] = w * total[row]
+                    targeted[s_index[key]] = True
+                else:
+                    unplaced.setdefault(pid, []).append({"key": key, "target_weight": w * 100, "target_value": w * total[row]})
+            # Sectors without a target share what the targets leave, pro rata to their current value
+            rest = current[row, ~targeted].sum()
+            if rest > 0:
+                residual = max(total[row] - desired[row, targeted].sum(), 0.0)
+                desired[row, ~targeted] = current[row, ~targeted] * residual / rest
+
+        fitted = value.copy()
+        for _ in range(IPF_ITERATIONS):
+            fitted_sectors = _segment_sum(pidx, fitted[:, None] * exposure, count)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(fitted_sectors > 0, desired / fitted_sectors, 1.0)
+            fitted = fitted * (exposure * ratio[pidx]).sum(axis=1)
+        target_value = np.where(sector_rows, fitted, target_value)
+
+    # Drift bands on weights of the portfolio total
+    safe_total = np.where(total > 0, total, 1.0)[pidx]
+    current_w = value / safe_total
+    target_w = target_value / safe_total
+    drift = current_w - target_w
+    band = band_percent / 100.0
+    outside = np.abs(drift) > band
+    desired_value = target_value if mode == "target" else (target_w + np.sign(drift) * band) * safe_total
+    trade_cad = np.where(outside, desired_value - value, 0.0)
+
+    # Whole shares
+    raw = trade_cad / price_cad
+    sell = np.where(raw < 0, -np.minimum(np.round(-raw), quantity), 0.0)
+    buy = np.where(raw > 0, np.floor(raw), 0.0)
+    available = cash_total - _segment_sum(pidx, sell * price_cad, count)
+    cost = _segment_sum(pidx, buy * price_cad, count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(cost > available, np.maximum(available, 0.0) / cost, 1.0)
+    buy = np.floor(buy * scale[pidx])
+    shares = buy + sell
+
+    # Settlement per (portfolio, currency) in native amounts; positive = cash left
+    balance = cash_native.copy()
+    np.add.at(balance, (pidx, cidx), -shares * price_native)
+    balance_cad = balance * to_cad
+    reporting = c_index[REPORTING_CURRENCY]
+    foreign = np.arange(len(currencies)) != reporting
+    # CAD amount converted into each currency (> 0) or out of it (< 0): first cover every foreign shortfall
+    # with CAD, then any CAD shortfall with the foreign surpluses, pro rata
+    conversion_cad = np.where(foreign, np.maximum(-balance_cad, 0.0), 0.0)
+    cad_short = np.maximum(conversion_cad.sum(axis=1) - balance_cad[:, reporting], 0.0)
+    surplus = np.where(foreign, np.maximum(balance_cad, 0.0), 0.0)
+    surplus_total = surplus.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(surplus_total > 0, surplus / surplus_total, 0.0)
+    conversion_cad -= share * np.minimum(cad_short, surplus_total[:, 0])[:, None]
+    conversion_cad[:, reporting] = -conversion_cad.sum(axis=1)
+    balance_after = balance + conversion_cad / to_cad
+
+    new_value = value + shares * price_cad
+    results = []
+    for row, pid in enumerate(portfolio_ids):
+        members = np.nonzero(pidx == row)[0]
+        results.append({
+            "portfolio_id": pid,
+            "kind": kinds.get(pid),
+            "total_value": float(total[row]),
+            "cash": {c: float(cash_native[row, j]) for j, c in enumerate(currencies) if cash_native[row, j]},
+            "trades": [
+                {
+                    "holding_id": holdings[i].id,
+                    "symbol": holdings[i].symbol,
+                    "action": "buy" if shares[i] > 0 else "sell",
+                    "shares": float(abs(shares[i])),
+                    "price": float(prices[i]),
+                    "currency": holding_currency[i],
+                    "value_cad": float(abs(shares[i]) * price_cad[i]),
+                    "current_weight": float(current_w[i] * 100),
+                    "target_weight": float(target_w[i] * 100),
+                    "new_weight": float(new_value[i] / safe_total[i] * 100),
+                }
+                for i in members if shares[i] != 0
+            ],
+            "cash_after": {
+                c: float(balance_after[row, j]) for j, c in enumerate(currencies)
+                if j == reporting or cash_native[row, j] or abs(balance_after[row, j]) > 1e-9
+            },
+            "fx_conversions": {
+                c: float(conversion_cad[row, j]) for j, c in enumerate(currencies)
+                if j != reporting and abs(conversion_cad[row, j]) > 1e-9
+            },
+            "unplaced_targets": unplaced.get(pid, []),
+            "unpriced_holdings": [h.symbol for h in unpriced if h.portfolio_id == pid],
+        })
+    return results
@@ -0,0 +1,106 @@
+# backend/app/utils/response_cache.py (NEW – persistent on-disk cache for slow provider responses, shared by API + Celery worker processes)
+# - diskcache (SQLite + files) → safe across processes, survives restarts
+# - Keyed by (endpoint, symbol) with per-endpoint TTL
+# - Size-bounded: LRU eviction once RESPONSE_CACHE_SIZE_MB is exceeded
+# - Hit / miss / eviction counters kept in a separate non-evicting cache so every process sees the same stats
+# - Empty responses (a throttled / soft-failed provider call) are returned but never cached
+
+import diskcache
+from pathlib import Path
+from typing import Any, Callable, Optional
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_DIR = os.getenv(
+    "RESPONSE_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent.parent / ".cache" / "responses"),
+)
+RESPONSE_CACHE_SIZE_MB = int(os.getenv("RESPONSE_CACHE_SIZE_MB", "256"))
+YAHOO_INFO_CACHE_TTL_SECONDS = int(os.getenv("YAHOO_INFO_CACHE_TTL_SECONDS", str(6 * 3600)))
+# Expired-entry sweep + cull run at most this often across all processes (each sweep scans the whole cache)
+RESPONSE_CACHE_SWEEP_SECONDS = int(os.getenv("RESPONSE_CACHE_SWEEP_SECONDS", "60"))
+SWEEP_KEY = "sweep"
+
+_MISSING = object()
+
+_cache: Optional[diskcache.Cache] = None
+_stats: Optional[diskcache.Cache] = None
+_lock = threading.Lock()
+
+def _open():
+    """Open lazily – Celery prefork children must not inherit the parent's SQLite handles"""
+    global _cache, _stats
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _stats = diskcache.Cache(os.path.join(RESPONSE_CACHE_DIR, "stats"), eviction_policy="none")
+                # cull_limit=0: never cull inside set() – cached_call culls explicitly so evictions can be counted
+                _cache = diskcache.Cache(
+                    os.path.join(RESPONSE_CACHE_DIR, "data"),
+                    size_limit=RESPONSE_CACHE_SIZE_MB * 1024 * 1024,
+                    eviction_policy="least-recently-used",
+                    cull_limit=0,
+                )
+    return _cache, _stats
+
+def cached_call(endpoint: str, key: str, fetch: Callable[[], Any], ttl: int) -> Any:
+    """
+    Return the cached response for (endpoint, key) if younger than ttl, else call fetch() and store it.
+    Exceptions from fetch() propagate and are never cached; neither are empty results.
+    """
+    cache, stats = _open()
+    cache_key = (endpoint, key)
+
+    value = cache.get(cache_key, default=_MISSING, retry=True)
+    if value is not _MISSING:
+        stats.incr(f"{endpoint}:hits", retry=True)
+        return value
+
+    stats.incr(f"{endpoint}:misses", retry=True)
+    value = fetch()
+    if value is None or (isinstance(value, (dict, list, tuple, str)) and not value):
+        logger.warning(f"Empty {endpoint} response for {key} – not cached")
+        return value
+    cache.set(cache_key, value, expire=ttl, retry=True)
+
+    # add() only succeeds for the first process once the previous sweep marker has expired
+    if not stats.add(SWEEP_KEY, True, expire=RESPONSE_CACHE_SWEEP_SECONDS, retry=True):
+        return value
+    expired = cache.expire(retry=True)
+    evicted = cache.cull(retry=True)
+    if expired:
+        stats.incr("expired", expired, retry=True)
+    if evicted:
+        stats.incr("evictions", evicted, retry=True)
+        logger.info(f"Response cache over {RESPONSE_CACHE_SIZE_MB} MB – evicted {evicted} entries")
+    return value
+
+def get_cache_stats() -> dict:
+    cache, stats = _open()
+    endpoints = {}
+    for name in stats.iterkeys():
+        if isinstance(name, str) and ":" in name:
+            endpoint, counter = name.rsplit(":", 1)
+            endpoints.setdefault(endpoint, {"hits": 0, "misses": 0})[counter] = stats.get(name, 0)
+
+    hits = sum(e["hits"] for e in endpoints.values())
+    misses = sum(e["misses"] for e in endpoints.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        "evictions": stats.get("evictions", 0),
+        "expired": stats.get("expired", 0),
+        "entries": len(cache),
+        "volume_bytes": cache.volume(),
+        "size_limit_bytes": cache.size_limit,
+        "endpoints": endpoints,
+    }
+
+def clear_cache() -> int:
+    """Drop all cached responses (stats are kept)"""
+    cache, _ = _open()
+    return cache.clear(retry=True)
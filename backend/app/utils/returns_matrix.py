@@ -0,0 +1,156 @@
+# backend/app/utils/returns_matrix.py (NEW – cached, date-aligned daily returns for every held symbol)
+# - Built from the local price warehouse (adj. close), never from the network
+# - Stored as one .npz (dates, symbols, returns, built) next to the warehouse and kept in memory per process
+#   (reloaded only when the file's mtime changes)
+# - update_returns_matrix appends only the sessions after the last stored date and adds columns for
+#   newly held symbols; rows older than RISK_LOOKBACK_DAYS sessions are trimmed
+# - A column is rebuilt from scratch when the warehouse replaced its symbol's history after the column was built
+# - Read-modify-write of the file is serialized across processes (API risk requests + Celery task) by a file lock
+from app.utils.price_warehouse import PRICE_WAREHOUSE_DIR, load_price_matrix, read_rewritten
+from app.utils.file_lock import file_lock
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+RETURNS_MATRIX_PATH = os.getenv(
+    "RETURNS_MATRIX_PATH",
+    os.path.join(os.path.dirname(PRICE_WAREHOUSE_DIR), "risk", "returns.npz"),
+)
+# Trading sessions kept (≈ 5 years)
+RISK_LOOKBACK_DAYS = int(os.getenv("RISK_LOOKBACK_DAYS", "1260"))
+# Calendar-day margin loaded before the first needed session so its previous close is available
+PRICE_LOOKBACK_MARGIN = timedelta(days=10)
+
+_loaded = {"mtime": None, "data": None}
+
+class ReturnsMatrix:
+    """
+    dates: datetime64[D] (n,), symbols: list (m,), returns: float64 (n, m) – NaN before a symbol's history,
+    built: datetime64[D] (m,) – day each column was (re)computed from its full history
+    """
+
+    def __init__(self, dates: np.ndarray, symbols: List[str], returns: np.ndarray, built: Optional[np.ndarray] = None):
+        self.dates = dates
+        self.symbols = symbols
+        self.returns = returns
+        # Files written before columns carried a build day count as built before any rewrite
+        self.built = built if built is not None else np.full(len(symbols), np.datetime64("NaT"), dtype="datetime64[D]")
+        self._index = {symbol: i for i, symbol in enumerate(symbols)}
+
+    def built_on(self, symbol: str) -> Optional[date]:
+        day = self.built[self._index[symbol]]
+        return None if np.isnat(day) else day.astype(object)
+
+    def columns(self, symbols: List[str]) -> np.ndarray:
+        """(n, len(symbols)) view in the requested order – all-NaN columns for unknown symbols"""
+        out = np.full((len(self.dates), len(symbols)), np.nan)
+        known = [(i, self._index[s]) for i, s in enumerate(symbols) if s in self._index]
+        if known:
+            dst, src = zip(*known)
+            out[:, list(dst)] = self.returns[:, list(src)]
+        return out
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+def _empty() -> ReturnsMatrix:
+    return ReturnsMatrix(np.array([], dtype="datetime64[D]"), [], np.empty((0, 0)))
+
+def load_returns_matrix() -> ReturnsMatrix:
+    """Current matrix (memory-cached until the file on disk changes)"""
+    try:
+        mtime = os.path.getmtime(RETURNS_MATRIX_PATH)
+    except OSError:
+        return _empty()
+    if _loaded["mtime"] != mtime:
+        with np.load(RETURNS_MATRIX_PATH, allow_pickle=False) as data:
+            matrix = ReturnsMatrix(data["dates"], data["symbols"].tolist(), data["returns"], data["built"] if "built" in data else None)
+        _loaded.update(mtime=mtime, data=matrix)
+    return _loaded["data"]
+
+def _save(matrix: ReturnsMatrix):
+    os.makedirs(os.path.dirname(RETURNS_MATRIX_PATH), exist_ok=True)
+    tmp = RETURNS_MATRIX_PATH + ".tmp.npz"
+    np.savez(tmp, dates=matrix.dates, symbols=np.array(matrix.symbols, dtype=str), returns=matrix.returns, built=matrix.built)
+    os.replace(tmp, RETURNS_MATRIX_PATH)
+
+def _price_returns(symbols: List[str], start: Optional[date], end: date) -> Tuple[np.ndarray, np.ndarray]:
+    """Simple daily returns from forward-filled adj. closes (first row dropped)"""
+    dates, prices = load_price_matrix(symbols, start, end, field="adj_close")
+    if len(dates) < 2:
+        return np.array([], dtype="datetime64[D]"), np.empty((0, len(symbols)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1.0
+    returns[~np.isfinite(returns)] = np.nan
+    return dates[1:], returns
+
+def _align(dates: np.ndarray, values: np.ndarray, axis: np.ndarray) -> np.ndarray:
+    """Rows of `values` placed on `axis` (dates outside it are dropped, missing dates are NaN)"""
+    out = np.full((len(axis), values.shape[1]), np.nan)
+    inside = np.isin(dates, axis)
+    out[np.searchsorted(axis, dates[inside])] = values[inside]
+    return out
+
+def update_returns_matrix(symbols: Iterable[str], through: date) -> ReturnsMatrix:
+    """
+    Extend the stored matrix through `through` for `symbols` (other stored columns are dropped).
+    Columns whose warehouse history was replaced since they were built are recomputed like new ones.
+    """
+    wanted = sorted({s.upper() for s in symbols})
+    with file_lock(RETURNS_MATRIX_PATH + ".lock"):
+        current = load_returns_matrix()
+        rewritten = read_rewritten()
+        stale = {
+            s for s in wanted
+            if s in current and s in rewritten and (current.built_on(s) is None or current.built_on(s) <= rewritten[s])
+        }
+        kept = [s for s in wanted if s in current and s not in stale]
+        new = [s for s in wanted if s not in current or s in stale]
+        last = current.dates[-1].astype(object) if len(current.dates) else None
+
+        # Sessions after the last stored date for the columns we already have
+        tail_dates, tail = np.array([], dtype="datetime64[D]"), np.empty((0, len(kept)))
+        if kept and last is not None and last < through:
+            tail_dates, tail = _price_returns(kept, last - PRICE_LOOKBACK_MARGIN, through)
+            newer = tail_dates > np.datetime64(last, "D")
+            tail_dates, tail = tail_dates[newer], tail[newer]
+
+        # Full lookback for newly held symbols
+        new_dates, new_returns = np.array([], dtype="datetime64[D]"), np.empty((0, len(new)))
+        if new:
+            start = current.dates[0].astype(object) if len(current.dates) else through - timedelta(days=RISK_LOOKBACK_DAYS * 366 // 252)
+            new_dates, new_returns = _price_returns(new, start - PRICE_LOOKBACK_MARGIN, through)
+
+        axis = np.unique(np.concatenate([current.dates, tail_dates, new_dates])).astype("datetime64[D]")
+        axis = axis[-RISK_LOOKBACK_DAYS:]
+        old = _align(current.dates, current.columns(kept), axis)
+        if len(tail_dates):
+            old[np.isin(axis, tail_dates)] = tail[np.isin(tail_dates, axis)]
+        added = _align(new_dates, new_returns, axis)
+
+        built = np.concatenate([
+            np.array([current.built[current._index[s]] for s in kept], dtype="datetime64[D]"),
+            np.full(len(new), np.datetime64(date.today(), "D")),
+        ])
+        matrix = ReturnsMatrix(axis, kept + new, np.hstack([old, added]), built)
+        # Column order = sorted symbols so lookups stay stable across updates
+        order = np.argsort(matrix.symbols, kind="stable")
+        matrix = ReturnsMatrix(axis, [matrix.symbols[i] for i in order], matrix.returns[:, order], matrix.built[order])
+        _save(matrix)
+        logger.info(
+            f"Returns matrix: {len(axis)} sessions × {len(matrix.symbols)} symbols "
+            f"({len(tail_dates)} new sessions, {len(new) - len(stale)} new symbols, {len(stale)} rebuilt)"
+        )
+        return load_returns_matrix()
+
+def ensure_symbols(symbols: Iterable[str]) -> ReturnsMatrix:
+    """Matrix that has a column for every symbol – adds missing ones from the local warehouse only"""
+    current = load_returns_matrix()
+    missing = {s.upper() for s in symbols} - set(current.symbols)
+    if not missing or not len(current.dates):
+        return current
+    return update_returns_matrix(set(current.symbols) | missing, current.dates[-1].astype(object))
@@ -0,0 +1,135 @@
+# backend/app/utils/risk.py (NEW – covariance-based risk numbers on the cached returns matrix)
+# - Weights = CAD market value per symbol; foreign symbols are measured in CAD: (1 + r)(1 + r_FX) - 1, with the
+#   currency's CAD return derived from the USD{CCY}=X pairs (see utils.fx)
+# - Historical VaR/CVaR from the portfolio's simulated daily P&L over the lookback, parametric (normal)
+#   VaR/CVaR from w'Σw, per-symbol contribution to volatility w_i(Σw)_i / σ_p and the correlation matrix
+# - Only sessions where every held symbol has a return are used (reported as `observations`); symbols with
+#   no stored history at all are listed in `missing_symbols` and excluded from the weights
+from app.models import Holding
+from app.utils.returns_matrix import ensure_symbols
+from app.utils.fx import FxMatrix, REPORTING_CURRENCY, conversion_factors, pair_symbol
+from statistics import NormalDist
+from typing import Dict, List, Optional
+import numpy as np
+
+RISK_MIN_OBSERVATIONS = 20
+
+def symbol_exposures(holdings: List[Holding], fx: FxMatrix) -> Dict[str, dict]:
+    """{SYMBOL: {"value": CAD market value, "currency": quote currency}} summed over holdings of the same symbol"""
+    factors = conversion_factors([h.symbol for h in holdings], currencies=[h.currency.value for h in holdings], fx=fx)
+    exposures: Dict[str, dict] = {}
+    for h, factor in zip(holdings, factors):
+        symbol = h.symbol.upper()
+        native_market = h.market_value or (h.current_price or 0) * (h.quantity or 0)
+        entry = exposures.setdefault(symbol, {"value": 0.0, "currency": h.currency.value})
+        entry["value"] += native_market * factor
+    return {symbol: entry for symbol, entry in exposures.items() if entry["value"] > 0}
+
+def _tail_stats(pnl: np.ndarray, confidence: float):
+    """Historical VaR / CVaR as positive loss fractions"""
+    cutoff = np.quantile(pnl, 1.0 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return float(-cutoff), float(-tail.mean()) if len(tail) else float(-cutoff)
+
+def _horizon_returns(returns: np.ndarray, horizon: int) -> np.ndarray:
+    """Overlapping compounded `horizon`-day returns of each column"""
+    if horizon <= 1:
+        return returns
+    growth = np.cumsum(np.log1p(returns), axis=0)
+    growth = np.vstack([np.zeros((1, returns.shape[1])), growth])
+    return np.expm1(growth[horizon:] - growth[:-horizon])
+
+def exposure_returns(exposures: Dict[str, dict]) -> dict:
+    """
+    CAD daily returns of every exposure on the sessions where all of them have data →
+    {"symbols", "values", "missing", "dates", "returns" (sessions × symbols)}.
+    Symbols without any stored history are listed in "missing" and left out.
+    """
+    currencies = sorted({entry["currency"] for entry in exposures.values()} | {REPORTING_CURRENCY})
+    pairs = [pair_symbol(c) for c in currencies if pair_symbol(c)]
+    matrix = ensure_symbols(list(exposures) + pairs)
+    missing = sorted(s for s in exposures if np.isnan(matrix.columns([s])).all())
+    symbols = sorted(s for s in exposures if s not in missing)
+
+    # Daily return of each currency against the reporting currency: (1 + r_USD→CAD) / (1 + r_USD→CCY) - 1
+    per_usd = np.column_stack([
+        matrix.columns([pair_symbol(c)])[:, 0] if pair_symbol(c) else np.zeros(len(matrix.dates)) for c in currencies
+    ])
+    reporting = currencies.index(REPORTING_CURRENCY)
+    fx = (1.0 + per_usd[:, [reporting]]) / (1.0 + per_usd) - 1.0
+    fx[:, reporting] = 0.0
+    columns = [currencies.index(exposures[s]["currency"]) for s in symbols]
+    returns = (1.0 + matrix.columns(symbols)) * (1.0 + fx[:, columns]) - 1.0
+    complete = ~np.isnan(returns).any(axis=1) if symbols else np.zeros(len(matrix.dates), dtype=bool)
+    return {
+        "symbols": symbols,
+        "values": np.array([exposures[s]["value"] for s in symbols]),
+        "missing": missing,
+        "dates": matrix.dates[complete],
+        "returns": returns[complete],
+    }
+
+def compute_risk(exposures: Dict[str, dict], confidence: float = 0.95, horizon: int = 1) -> Optional[dict]:
+    """Risk summary for a set of symbol exposures (None when there are no positions)"""
+    if not exposures:
+        return None
+
+    data = exposure_returns(exposures)
+    symbols, values, dates, returns = data["symbols"], data["values"], data["dates"], data["returns"]
+    total = float(values.sum())
+    observations = len(dates)
+    result = {
+        "total_value": float(sum(entry["value"] for entry in exposures.values())),
+        "covered_value": total,
+        "confidence": confidence,
+        "horizon_days": horizon,
+        "observations": observations,
+        "start_date": None,
+        "end_date": None,
+        "missing_symbols": data["missing"],
+    }
+    if observations < RISK_MIN_OBSERVATIONS + horizon:
+        return {**result, "historical": None, "parametric": None, "volatility": None, "contributions": [], "correlation": None}
+
+    weights = values / total
+    result["start_date"] = str(dates[0])
+    result["end_date"] = str(dates[-1])
+
+    # Historical: revalue today's weights on every past (horizon-day) move
+    pnl = _horizon_returns(returns, horizon) @ weights
+    hist_var, hist_cvar = _tail_stats(pnl, confidence)
+
+    # Parametric: normal with the sample mean / covariance, scaled by √horizon
+    cov = np.cov(returns, rowvar=False).reshape(len(symbols), len(symbols))
+    mean = returns.mean(axis=0) @ weights * horizon
+    marginal = cov @ weights
+    sigma_daily = float(np.sqrt(max(weights @ marginal, 0.0)))
+    sigma = sigma_daily * np.sqrt(horizon)
+    z = NormalDist().inv_cdf(confidence)
+    param_var = float(z * sigma - mean)
+    param_cvar = float(sigma * np.exp(-z * z / 2) / (np.sqrt(2 * np.pi) * (1 - confidence)) - mean)
+
+    contribution = weights * marginal / sigma_daily if sigma_daily > 0 else np.zeros(len(symbols))
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = cov / np.outer(std, std)
+    correlation = np.where(np.isfinite(correlation), correlation, 0.0)
+    np.fill_diagonal(correlation, 1.0)
+
+    result.update({
+        "volatility": float(sigma_daily * np.sqrt(252)),
+        "historical": {"var": hist_var, "cvar": hist_cvar, "var_value": hist_var * total, "cvar_value": hist_cvar * total},
+        "parametric": {"var": param_var, "cvar": param_cvar, "var_value": param_var * total, "cvar_value": param_cvar * total},
+        "contributions": [
+            {
+                "symbol": symbol,
+                "weight": float(weights[i]),
+                "value": float(values[i]),
+                "volatility_contribution": float(contribution[i] * np.sqrt(252)),
+                "percent_of_risk": float(contribution[i] / sigma_daily * 100) if sigma_daily > 0 else 0.0,
+            }
+            for i, symbol in enumerate(symbols)
+        ],
+        "correlation": {"symbols": symbols, "matrix": np.round(correlation, 4).tolist()},
+    })
+    return result
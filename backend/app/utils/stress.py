@@ -0,0 +1,99 @@
+# backend/app/utils/stress.py (NEW – what-if shocks by sector, symbol and FX for all portfolios at once)
+# - Scenarios become a shock matrix: sector shocks (K × sectors) are mapped to underlying symbols through the
+#   sector weights, symbol shocks override that for the symbols they name, and the look-through matrix turns
+#   them into per-holding returns (K × holdings) – a few matrix products for any number of scenarios
+# - A shock on a held ETF's own symbol applies to the whole holding instead of its underlyings
+# - FX shocks ("USDCAD", "GBPCAD", … – quote currency against CAD) move the CAD value of every holding quoted
+#   in that currency on top of its price shock
+# - P&L per portfolio is one more product with the holdings × portfolios membership matrix
+from sqlalchemy.orm import Session
+from app.models import Holding
+from app.utils.exposures import look_through_matrix, sector_matrix
+from app.utils.fx import CURRENCIES, REPORTING_CURRENCY, FxMatrix, conversion_factors
+from typing import Dict, List
+import numpy as np
+
+FOREIGN_CURRENCIES = [c for c in CURRENCIES if c != REPORTING_CURRENCY]
+FX_PAIRS = [f"{c}{REPORTING_CURRENCY}" for c in FOREIGN_CURRENCIES]
+
+def _shock_rows(scenarios: List[dict], field: str, keys: List[str], normalize=lambda k: k):
+    """(K × len(keys)) shock fractions and a mask of which entries were given"""
+    index = {k: i for i, k in enumerate(keys)}
+    shocks = np.zeros((len(scenarios), len(keys)))
+    given = np.zeros((len(scenarios), len(keys)), dtype=bool)
+    for row, scenario in enumerate(scenarios):
+        for key, percent in (scenario.get(field) or {}).items():
+            col = index.get(normalize(key))
+            if col is not None:
+                shocks[row, col] = percent / 100.0
+                given[row, col] = True
+    return shocks, given
+
+def stress_test(db: Session, holdings: List[Holding], portfolios: Dict[int, str], scenarios: List[dict], fx: FxMatrix) -> dict:
+    """
+    P&L of every scenario on every portfolio in `portfolios` ({id: name}).
+    Each scenario: {"name", "sector_shocks", "symbol_shocks", "fx_shocks"} with shocks in percent.
+    """
+    portfolio_ids = list(portfolios)
+    p_index = {pid: i for i, pid in enumerate(portfolio_ids)}
+    holdings = [h for h in holdings if h.portfolio_id in p_index]
+
+    native = np.array([h.market_value or (h.current_price or 0) * (h.quantity or 0) for h in holdings], dtype=np.float64)
+    value = native * conversion_factors([h.symbol for h in holdings], currencies=[h.currency.value for h in holdings], fx=fx)
+    membership = np.zeros((len(holdings), len(portfolio_ids)))
+    membership[np.arange(len(holdings)), [p_index[h.portfolio_id] for h in holdings]] = 1.0
+
+    symbols, look_through = look_through_matrix(db, holdings)
+    sectors, weights = sector_matrix(db, symbols)
+    upper = [s.upper() for s in symbols]
+
+    sector_shocks, _ = _shock_rows(scenarios, "sector_shocks", sectors)
+    symbol_shocks, symbol_given = _shock_rows(scenarios, "symbol_shocks", upper, str.upper)
+    # Underlying returns: sector-weighted unless the symbol itself is shocked
+    underlying = np.where(symbol_given, symbol_shocks, sector_shocks @ weights.T)
+    holding_returns = underlying @ look_through.T
+
+    held = sorted({h.symbol.upper() for h in holdings})
+    own_shocks, own_given = _shock_rows(scenarios, "symbol_shocks", held, str.upper)
+    own_index = {s: i for i, s in enumerate(held)}
+    own_cols = np.array([own_index[h.symbol.upper()] for h in holdings], dtype=np.int64)
+    holding_returns = np.where(own_given[:, own_cols], own_shocks[:, own_cols], holding_returns)
+
+    # FX: one column per foreign currency plus a zero column for CAD holdings
+    fx_shocks, _ = _shock_rows(scenarios, "fx_shocks", FX_PAIRS, str.upper)
+    fx_shocks = np.hstack([fx_shocks, np.zeros((len(scenarios), 1))])
+    fx_cols = [FOREIGN_CURRENCIES.index(c) if c in FOREIGN_CURRENCIES else len(FOREIGN_CURRENCIES)
+               for c in (h.currency.value for h in holdings)]
+    holding_returns = (1.0 + holding_returns) * (1.0 + fx_shocks[:, fx_cols]) - 1.0
+
+    pnl = (holding_returns * value) @ membership  # K × portfolios
+    base = value @ membership
+    total = float(base.sum())
+
+    known_sectors = set(sectors)
+    known_symbols = set(upper) | set(held)
+    results = []
+    for k, scenario in enumerate(scenarios):
+        scenario_pnl = float(pnl[k].sum())
+        results.append({
+            "name": scenario["name"],
+            "total_value": total,
+            "pnl": scenario_pnl,
+            "pnl_percent": scenario_pnl / total * 100 if total > 0 else 0.0,
+            "portfolios": [
+                {
+                    "portfolio_id": pid,
+                    "name": portfolios[pid],
+                    "value": float(base[i]),
+                    "pnl": float(pnl[k, i]),
+                    "pnl_percent": float(pnl[k, i] / base[i] * 100) if base[i] > 0 else 0.0,
+                }
+                for i, pid in enumerate(portfolio_ids)
+            ],
+            "unmatched": sorted(
+                [s for s in (scenario.get("sector_shocks") or {}) if s not in known_sectors]
+                + [s for s in (scenario.get("symbol_shocks") or {}) if s.upper() not in known_symbols]
+                + [s for s in (scenario.get("fx_shocks") or {}) if s.upper() not in FX_PAIRS]
+            ),
+        })
+    return {"sectors": sectors, "scenarios": results}
@@ -0,0 +1,23 @@
+# backend/app/utils/symbol_info.py (NEW – read helpers for the shared SymbolInfo store; never calls providers)
+from sqlalchemy.orm import Session
+from app.models import SymbolInfo
+from app.utils.currencies import currency_from_suffix
+from typing import Dict, Iterable, Optional
+
+def get_symbol_info_map(db: Session, symbols: Iterable[str]) -> Dict[str, SymbolInfo]:
+    """One query for many symbols → {symbol: SymbolInfo} (missing symbols are simply absent)"""
+    symbols = {s.upper() for s in symbols if s}
+    if not symbols:
+        return {}
+    rows = db.query(SymbolInfo).filter(SymbolInfo.symbol.in_(symbols)).all()
+    return {row.symbol: row for row in rows}
+
+def get_symbol_info(db: Session, symbol: str) -> Optional[SymbolInfo]:
+    return db.get(SymbolInfo, symbol.upper())
+
+def resolve_currency(db: Optional[Session], symbol: str) -> str:
+    """Stored profile currency when known, otherwise the suffix rule"""
+    info = get_symbol_info(db, symbol) if db is not None else None
+    if info is not None and info.currency:
+        return info.currency.upper()
+    return currency_from_suffix(symbol)
@@ -0,0 +1,181 @@
+# backend/app/utils/xirr.py (NEW – money-weighted return (XIRR) per portfolio from the cash-flow ledger)
+# - Investor view: contributions are outflows, withdrawals inflows, the latest EOD value is the final inflow
+# - When the ledger does not reach back to the first EOD snapshot, that first value counts as the opening contribution
+# - All portfolios are solved together: flows are padded into (portfolios × flows) arrays and one safeguarded
+#   Newton/bisection iteration runs on every row at once
+# - Results are cached per portfolio against the latest EOD timestamp; ledger edits call invalidate_xirr(),
+#   backfills (past EOD rows change, the latest does not) call invalidate_all_xirr()
+from sqlalchemy.orm import Session
+from app.models import PortfolioHistory
+from app.utils.cash_flows import load_cash_flows, flows_by_portfolio
+from app.utils.history import MARKET_TZ
+from app.redis_client import r
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import numpy as np
+import redis
+import json
+import logging
+import pytz
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365.0
+
+# Bracket for the annual rate: -99.99 % … +100,000 %
+XIRR_LOWER = -0.9999
+XIRR_UPPER = 1000.0
+XIRR_TOLERANCE = 1e-10
+XIRR_MAX_ITERATIONS = 100
+
+def _npv(rates: np.ndarray, amounts: np.ndarray, years: np.ndarray):
+    """Σ a·(1+r)^-t and its derivative for every row (padding has amount 0)"""
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        discount = np.exp(-years * np.log1p(rates)[:, None])
+        value = (amounts * discount).sum(axis=1)
+        slope = (-years * amounts * discount / (1.0 + rates)[:, None]).sum(axis=1)
+    return value, slope
+
+def xirr_batch(amounts: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """
+    Annual rates solving Σ amounts·(1+r)^-years = 0 for each row of the (P × F) arrays; NaN when the
+    flows have no sign change inside [XIRR_LOWER, XIRR_UPPER].
+    """
+    count = amounts.shape[0]
+    lo = np.full(count, XIRR_LOWER)
+    hi = np.full(count, XIRR_UPPER)
+    f_lo, _ = _npv(lo, amounts, years)
+    f_hi, _ = _npv(hi, amounts, years)
+    solvable = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) != np.sign(f_hi))
+
+    rate = np.full(count, 0.1)
+    done = ~solvable
+    for _ in range(XIRR_MAX_ITERATIONS):
+        if done.all():
+            break
+        value, slope = _npv(rate, amounts, years)
+        # Keep the root bracketed: replace the end whose NPV has the same sign
+        same_as_lo = np.sign(value) == np.sign(f_lo)
+        lo = np.where(same_as_lo, rate, lo)
+        f_lo = np.where(same_as_lo, value, f_lo)
+        hi = np.where(same_as_lo, hi, rate)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = rate - value / slope
+        # Newton where it stays strictly inside the bracket, bisection otherwise
+        inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        # An exact root stays put (it is already a bracket end, so Newton is never strictly inside)
+        step = np.where(value == 0, rate, np.where(inside, newton, (lo + hi) / 2))
+
+        converged = (np.abs(step - rate) <= XIRR_TOLERANCE * (1.0 + np.abs(rate))) | (value == 0)
+        rate = np.where(done, rate, step)
+        done |= converged
+
+    return np.where(solvable, rate, np.nan)
+
+def _toronto_date(ts: datetime) -> date:
+    return pytz.utc.localize(ts).astimezone(pytz.timezone(MARKET_TZ)).date()
+
+def _eod_endpoints(db: Session, portfolio_ids: Optional[List[int]], newest: bool) -> Dict[int, tuple]:
+    """{portfolio_id: (timestamp, total_value)} of the newest (or oldest) EOD row per portfolio"""
+    order = PortfolioHistory.timestamp.desc() if newest else PortfolioHistory.timestamp.asc()
+    query = db.query(PortfolioHistory.portfolio_id, PortfolioHistory.timestamp, PortfolioHistory.total_value)\
+              .filter(PortfolioHistory.is_eod == True, PortfolioHistory.portfolio_id.isnot(None))
+    if portfolio_ids is not None:
+        query = query.filter(PortfolioHistory.portfolio_id.in_(portfolio_ids))
+    rows = query.distinct(PortfolioHistory.portfolio_id)\
+                .order_by(PortfolioHistory.portfolio_id, order)\
+                .all()
+    return {row.portfolio_id: (row.timestamp, row.total_value or 0.0) for row in rows}
+
+def _investor_flows(flows: List[tuple], first: tuple, last: tuple) -> List[tuple]:
+    """Ledger flows (portfolio view) → investor-view (date, amount) list ending with the final value"""
+    first_day, last_day = _toronto_date(first[0]), _toronto_date(last[0])
+    series = [(day, -amount) for day, amount in flows if day <= last_day]
+    if not series or series[0][0] > first_day:
+        series.insert(0, (first_day, -first[1]))
+    series.append((last_day, last[1]))
+    return series
+
+def compute_xirr(series_by_portfolio: Dict[int, List[tuple]]) -> Dict[int, Optional[float]]:
+    """Solve every portfolio's investor-view series in one batch"""
+    ids = list(series_by_portfolio)
+    if not ids:
+        return {}
+    width = max(len(series) for series in series_by_portfolio.values())
+    amounts = np.zeros((len(ids), width))
+    years = np.zeros((len(ids), width))
+    for row, pid in enumerate(ids):
+        series = series_by_portfolio[pid]
+        origin = series[0][0]
+        amounts[row, :len(series)] = [amount for _, amount in series]
+        years[row, :len(series)] = [(day - origin).days / DAYS_PER_YEAR for day, _ in series]
+
+    rates = xirr_batch(amounts, years)
+    return {pid: (float(rate) if np.isfinite(rate) else None) for pid, rate in zip(ids, rates)}
+
+def _cache_key(portfolio_id: int) -> str:
+    return f"xirr:{portfolio_id}"
+
+def invalidate_xirr(portfolio_id: int) -> None:
+    try:
+        r.delete(_cache_key(portfolio_id))
+    except redis.RedisError as e:
+        logger.warning(f"XIRR cache invalidation failed for portfolio {portfolio_id}: {e}")
+
+def invalidate_all_xirr() -> None:
+    """Call after rewriting past EOD rows (backfill) – every portfolio is solved again next time"""
+    try:
+        keys = list(r.scan_iter(match=_cache_key("*"), count=500))
+        if keys:
+            r.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"XIRR cache invalidation failed: {e}")
+
+def get_xirr(db: Session, portfolio_ids: Optional[List[int]] = None) -> Dict[int, dict]:
+    """XIRR results for portfolios with EOD history (all of them when portfolio_ids is None)"""
+    latest = _eod_endpoints(db, portfolio_ids, newest=True)
+    if not latest:
+        return {}
+
+    ids = sorted(latest)
+    results: Dict[int, dict] = {}
+    try:
+        cached = r.mget([_cache_key(pid) for pid in ids])
+    except redis.RedisError as e:
+        logger.warning(f"XIRR cache read failed: {e}")
+        cached = [None] * len(ids)
+    for pid, value in zip(ids, cached):
+        if value:
+            entry = json.loads(value)
+            if entry.get("as_of") == latest[pid][0].isoformat():
+                results[pid] = entry
+
+    missing = [pid for pid in ids if pid not in results]
+    if not missing:
+        return results
+
+    first = _eod_endpoints(db, missing, newest=False)
+    ledger = flows_by_portfolio(db, load_cash_flows(db, missing))
+    series = {pid: _investor_flows(ledger.get(pid, []), first[pid], latest[pid]) for pid in missing}
+    rates = compute_xirr(series)
+
+    fresh = {}
+    for pid in missing:
+        contributions = -sum(amount for _, amount in series[pid][:-1])
+        fresh[pid] = {
+            "portfolio_id": pid,
+            "xirr": rates[pid],
+            "as_of": latest[pid][0].isoformat(),
+            "start_date": series[pid][0][0].isoformat(),
+            "final_value": latest[pid][1],
+            "net_contributions": contributions,
+            "flow_count": len(series[pid]) - 1,
+        }
+    try:
+        r.mset({_cache_key(pid): json.dumps(entry) for pid, entry in fresh.items()})
+    except redis.RedisError as e:
+        logger.warning(f"XIRR cache write failed: {e}")
+
+    results.update(fresh)
+    return results
@@ -3,8 +3,9 @@ import yfinance as yf
 from typing import Dict, Optional, List
 import logging
 from redis import Redis
-from datetime import timedelta
+from datetime import date, timedelta
 import pandas as pd
+from app.utils.response_cache import cached_call, YAHOO_INFO_CACHE_TTL_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +86,90 @@ def get_cached_price(symbol: str) -> Optional[Dict[str, float]]:
             }
     return None
 
+DAILY_HISTORY_COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+    "Dividends": "dividends",
+    "Stock Splits": "splits",
+}
+
+def fetch_daily_history(symbols: List[str], start: date, end: date) -> Dict[str, pd.DataFrame]:
+    """
+    Daily OHLCV for many symbols in ONE yf.download call, [start, end) like yfinance.
+    Returns {SYMBOL: DataFrame indexed by date with open/high/low/close/adj_close/volume plus the
+    dividends / splits paid on each day (0 = none)}. close is split-adjusted and adj_close split- and
+    dividend-adjusted as of the download. Symbols Yahoo returned nothing for are omitted. Raises on provider errors.
+    """
+    symbols = sorted({s.upper().strip() for s in symbols if s.strip()})
+    if not symbols:
+        return {}
+
+    logger.info(f"fetch_daily_history: {len(symbols)} symbols {start} → {end}")
+    data = yf.download(
+        tickers=symbols,
+        start=start.isoformat(),
+        end=end.isoformat(),
+        interval="1d",
+        auto_adjust=False,  # keep both Close and Adj Close
+        actions=True,  # dividends / splits in the range tell the warehouse its stored history went stale
+        group_by="column",
+        progress=False,
+        threads=True,
+    )
+    if data is None or data.empty:
+        return {}
+
+    results = {}
+    for symbol in symbols:
+        frame = pd.DataFrame(index=data.index)
+        for source, target in DAILY_HISTORY_COLUMNS.items():
+            if isinstance(data.columns, pd.MultiIndex):
+                if (source, symbol) not in data.columns:
+                    continue
+                frame[target] = data[(source, symbol)]
+            elif source in data.columns:
+                frame[target] = data[source]
+        if "close" not in frame.columns:
+            continue
+        frame = frame.dropna(subset=["close"])
+        if frame.empty:
+            continue
+        frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+        results[symbol] = frame
+    return results
+
+def fetch_yahoo_info(symbol: str) -> dict:
+    """
+    Raw yfinance .info dict (slow: one HTTP round trip per symbol), served from the shared
+    on-disk response cache for YAHOO_INFO_CACHE_TTL_SECONDS. Raises on provider errors (not cached).
+    """
+    symbol = symbol.upper().strip()
+    return cached_call(
+        "yahoo.info",
+        symbol,
+        lambda: yf.Ticker(symbol).info or {},
+        ttl=YAHOO_INFO_CACHE_TTL_SECONDS,
+    )
+
+def fetch_yahoo_dividends(symbol: str) -> List[Dict]:
+    """
+    Dividend history from yfinance → [{"ex_date", "pay_date", "amount"}] oldest first.
+    Yahoo only has ex-dates, so pay_date is always None. Raises on provider errors.
+    """
+    series = yf.Ticker(symbol.upper().strip()).dividends
+    if series is None or series.empty:
+        return []
+    index = pd.DatetimeIndex(series.index).tz_localize(None)
+    return [
+        {"ex_date": day.date(), "pay_date": None, "amount": float(amount)}
+        for day, amount in zip(index, series.values)
+        if amount > 0
+    ]
+
 # NEW: Yahoo sector fallback (reuses existing yfinance import)
 def fetch_yahoo_sector_weightings(symbol: str) -> List[Dict[str, float]]:
     """
@@ -94,8 +179,7 @@ def fetch_yahoo_sector_weightings(symbol: str) -> List[Dict[str, float]]:
     """
     logger.info(f"Yahoo fallback: Fetching sector data for {symbol}")
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = fetch_yahoo_info(symbol)
 
         logger.info(f"yfinance info keys for {symbol}: {list(info.keys())}")
         logger.info(f"  sectorWeightings: {info.get('sectorWeightings')}")
@@ -7,6 +7,7 @@ from alembic import context
 
 # Custom fixes for path and .env
 import os
+import re
 import sys
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/..")
 
@@ -32,12 +33,21 @@ if config.config_file_name is not None:
 # Target metadata for autogenerate
 target_metadata = Base.metadata
 
+# Monthly history partitions are managed by app.tasks.history_partition_task, not by models
+PARTITION_TABLE_RE = re.compile(r"^(portfolio_history|global_history)_(p\d{6}|default)$")
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and reflected and PARTITION_TABLE_RE.match(name or ""):
+        return False
+    return True
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -56,7 +66,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
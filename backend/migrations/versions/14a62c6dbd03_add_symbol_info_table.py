@@ -0,0 +1,50 @@
+"""add symbol_info table
+
+Revision ID: 14a62c6dbd03
+Revises: 8ac2646a9d5e
+Create Date: 2026-02-22 14:37:05.118240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '14a62c6dbd03'
+down_revision: Union[str, Sequence[str], None] = '8ac2646a9d5e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('symbol_info',
+    sa.Column('symbol', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('exchange', sa.String(), nullable=True),
+    sa.Column('currency', sa.String(length=3), nullable=True),
+    sa.Column('profile_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('sectors_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('dividend_rate', sa.Float(), nullable=True),
+    sa.Column('dividend_yield_percent', sa.Float(), nullable=True),
+    sa.Column('dividends_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('last_refreshed', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('symbol')
+    )
+    op.create_index(op.f('ix_symbol_info_symbol'), 'symbol_info', ['symbol'], unique=False)
+
+    # Seed from the sector cache so existing sectors aren't refetched immediately
+    op.execute("""
+        INSERT INTO symbol_info (symbol, sectors_updated_at, last_refreshed)
+        SELECT symbol, last_updated, last_updated
+        FROM symbol_sector_cache
+        ON CONFLICT (symbol) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_symbol_info_symbol'), table_name='symbol_info')
+    op.drop_table('symbol_info')
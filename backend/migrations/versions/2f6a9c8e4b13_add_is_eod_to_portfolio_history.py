@@ -0,0 +1,30 @@
+"""add is_eod to portfolio_history
+
+Revision ID: 2f6a9c8e4b13
+Revises: 9b4e7d2c1a06
+Create Date: 2026-02-26 10:48:33.115820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6a9c8e4b13'
+down_revision: Union[str, Sequence[str], None] = '9b4e7d2c1a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('portfolio_history', sa.Column('is_eod', sa.Boolean(), server_default='false', nullable=True))
+    op.create_index('ix_portfolio_history_eod', 'portfolio_history', ['portfolio_id', 'timestamp'], unique=False, postgresql_where=sa.text('is_eod'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_portfolio_history_eod', table_name='portfolio_history', postgresql_where=sa.text('is_eod'))
+    op.drop_column('portfolio_history', 'is_eod')
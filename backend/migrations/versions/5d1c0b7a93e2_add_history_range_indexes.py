@@ -0,0 +1,34 @@
+"""add history range indexes
+
+Revision ID: 5d1c0b7a93e2
+Revises: eb71c5feceeb
+Create Date: 2026-02-24 09:41:18.220561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1c0b7a93e2'
+down_revision: Union[str, Sequence[str], None] = 'eb71c5feceeb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_portfolio_history_portfolio_timestamp', 'portfolio_history', ['portfolio_id', 'timestamp'], unique=False)
+    op.create_index('ix_global_history_eod_timestamp', 'global_history', ['timestamp'], unique=False, postgresql_where=sa.text('is_eod'))
+    op.create_index('ix_portfolio_history_rollups_lookup', 'portfolio_history_rollups', ['portfolio_id', 'resolution', 'timestamp'], unique=False)
+    op.create_index('ix_global_history_rollups_lookup', 'global_history_rollups', ['resolution', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_global_history_rollups_lookup', table_name='global_history_rollups')
+    op.drop_index('ix_portfolio_history_rollups_lookup', table_name='portfolio_history_rollups')
+    op.drop_index('ix_global_history_eod_timestamp', table_name='global_history', postgresql_where=sa.text('is_eod'))
+    op.drop_index('ix_portfolio_history_portfolio_timestamp', table_name='portfolio_history')
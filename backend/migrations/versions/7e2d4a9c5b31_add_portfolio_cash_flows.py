@@ -0,0 +1,45 @@
+"""add portfolio_cash_flows table
+
+Revision ID: 7e2d4a9c5b31
+Revises: 2f6a9c8e4b13
+Create Date: 2026-02-27 10:41:18.530927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2d4a9c5b31'
+down_revision: Union[str, Sequence[str], None] = '2f6a9c8e4b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+currency_enum = postgresql.ENUM('CAD', 'USD', name='currency', create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('portfolio_cash_flows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('portfolio_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('currency', currency_enum, server_default='CAD', nullable=False),
+    sa.Column('note', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_portfolio_cash_flows_id'), 'portfolio_cash_flows', ['id'], unique=False)
+    op.create_index('ix_portfolio_cash_flows_portfolio_date', 'portfolio_cash_flows', ['portfolio_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_portfolio_cash_flows_portfolio_date', table_name='portfolio_cash_flows')
+    op.drop_index(op.f('ix_portfolio_cash_flows_id'), table_name='portfolio_cash_flows')
+    op.drop_table('portfolio_cash_flows')
@@ -0,0 +1,48 @@
+"""add symbol_sector_weights table
+
+Revision ID: 8ac2646a9d5e
+Revises: f5e6f741f047
+Create Date: 2026-02-20 10:12:41.532907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8ac2646a9d5e'
+down_revision: Union[str, Sequence[str], None] = 'f5e6f741f047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('symbol_sector_weights',
+    sa.Column('symbol', sa.String(), nullable=False),
+    sa.Column('sector', sa.String(), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('symbol', 'sector')
+    )
+    op.create_index('ix_symbol_sector_weights_symbol_covering', 'symbol_sector_weights', ['symbol'], unique=False, postgresql_include=['sector', 'weight'])
+    op.create_index('ix_symbol_sector_weights_sector', 'symbol_sector_weights', ['sector'], unique=False)
+
+    # Backfill from the existing JSONB cache (duplicate sectors per symbol are summed)
+    op.execute("""
+        INSERT INTO symbol_sector_weights (symbol, sector, weight)
+        SELECT c.symbol, elem->>'sector', SUM((elem->>'weight')::float)
+        FROM symbol_sector_cache c,
+             jsonb_array_elements(c.weightings) AS elem
+        WHERE elem->>'sector' IS NOT NULL
+        GROUP BY c.symbol, elem->>'sector'
+        ON CONFLICT (symbol, sector) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_symbol_sector_weights_sector', table_name='symbol_sector_weights')
+    op.drop_index('ix_symbol_sector_weights_symbol_covering', table_name='symbol_sector_weights')
+    op.drop_table('symbol_sector_weights')
@@ -0,0 +1,126 @@
+"""partition history tables by month
+
+Revision ID: 9b4e7d2c1a06
+Revises: c3f8a2d9e471
+Create Date: 2026-02-25 11:27:09.604118
+
+"""
+from typing import Sequence, Union
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e7d2c1a06'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a2d9e471'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created up front past the current month (the maintenance task keeps this window rolling)
+MONTHS_AHEAD = 3
+
+VALUE_COLUMNS = """
+    total_value double precision,
+    daily_change double precision,
+    daily_percent double precision,
+    all_time_gain double precision,
+    all_time_percent double precision"""
+
+TABLES = {
+    'portfolio_history': {
+        'columns': """
+    id integer NOT NULL DEFAULT nextval('portfolio_history_id_seq'::regclass),
+    portfolio_id integer REFERENCES portfolios (id),
+    "timestamp" timestamp without time zone NOT NULL,""" + VALUE_COLUMNS,
+        'indexes': [
+            ('ix_portfolio_history_id', '(id)', ''),
+            ('ix_portfolio_history_timestamp', '("timestamp")', ''),
+            ('ix_portfolio_history_portfolio_timestamp', '(portfolio_id, "timestamp")', ''),
+        ],
+    },
+    'global_history': {
+        'columns': """
+    id integer NOT NULL DEFAULT nextval('global_history_id_seq'::regclass),
+    "timestamp" timestamp without time zone NOT NULL,""" + VALUE_COLUMNS + """,
+    is_eod boolean DEFAULT false""",
+        'indexes': [
+            ('ix_global_history_id', '(id)', ''),
+            ('ix_global_history_timestamp', '("timestamp")', ''),
+            ('ix_global_history_eod_timestamp', '("timestamp")', ' WHERE is_eod'),
+        ],
+    },
+}
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _swap_table(table: str, partitioned: bool) -> None:
+    """Rebuild `table` as partitioned (or back to a plain heap), copying rows and keeping the id sequence"""
+    spec = TABLES[table]
+    new = f'{table}_new'
+    seq = f'{table}_id_seq'
+    conn = op.get_bind()
+
+    if partitioned:
+        # The partition key is NOT NULL – refuse to run rather than silently drop rows without a timestamp
+        missing = conn.execute(sa.text(f'SELECT count(*) FROM {table} WHERE "timestamp" IS NULL')).scalar()
+        if missing:
+            raise RuntimeError(
+                f'{table} has {missing} rows with a NULL "timestamp" – set or delete them before partitioning '
+                f'(e.g. DELETE FROM {table} WHERE "timestamp" IS NULL), then re-run the migration'
+            )
+
+    partition_clause = ' PARTITION BY RANGE ("timestamp")' if partitioned else ''
+    op.execute(f'CREATE TABLE {new} ({spec["columns"]}\n){partition_clause}')
+
+    if partitioned:
+        first = conn.execute(sa.text(f'SELECT min("timestamp") FROM {table}')).scalar()
+        current = datetime.utcnow().date().replace(day=1)
+        month = first.date().replace(day=1) if first else current
+        while month <= _add_months(current, MONTHS_AHEAD):
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {new} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            )
+            month = _add_months(month, 1)
+        # Safety net for rows outside every monthly range (kept empty by the maintenance task)
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {new} DEFAULT')
+
+    op.execute(f'INSERT INTO {new} SELECT {", ".join(_column_names(table))} FROM {table}')
+
+    # The sequence is owned by the old id column – detach it first or DROP TABLE takes it along
+    op.execute(f'ALTER SEQUENCE {seq} OWNED BY NONE')
+    op.execute(f'DROP TABLE {table}')
+    op.execute(f'ALTER TABLE {new} RENAME TO {table}')
+    op.execute(f'ALTER SEQUENCE {seq} OWNED BY {table}.id')
+    op.execute(f"SELECT setval('{seq}', COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)")
+
+    pk = '(id, "timestamp")' if partitioned else '(id)'
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY {pk}')
+    for name, columns, where in spec['indexes']:
+        op.execute(f'CREATE INDEX {name} ON {table} {columns}{where}')
+
+
+def _column_names(table: str) -> list:
+    names = ['id', 'portfolio_id'] if table == 'portfolio_history' else ['id']
+    names += ['"timestamp"', 'total_value', 'daily_change', 'daily_percent', 'all_time_gain', 'all_time_percent']
+    if table == 'global_history':
+        names.append('is_eod')
+    return names
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        _swap_table(table, partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        _swap_table(table, partitioned=False)
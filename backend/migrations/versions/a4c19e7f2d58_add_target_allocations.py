@@ -0,0 +1,39 @@
+"""add target_allocations table
+
+Revision ID: a4c19e7f2d58
+Revises: 7e2d4a9c5b31
+Create Date: 2026-02-28 09:12:44.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c19e7f2d58'
+down_revision: Union[str, Sequence[str], None] = '7e2d4a9c5b31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('target_allocations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('portfolio_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('weight_percent', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('portfolio_id', 'kind', 'key', name='uq_target_allocations_portfolio_kind_key')
+    )
+    op.create_index(op.f('ix_target_allocations_id'), 'target_allocations', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_target_allocations_id'), table_name='target_allocations')
+    op.drop_table('target_allocations')
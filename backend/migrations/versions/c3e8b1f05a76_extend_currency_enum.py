@@ -0,0 +1,58 @@
+"""extend currency enum with GBP, EUR, AUD
+
+Revision ID: c3e8b1f05a76
+Revises: a4c19e7f2d58
+Create Date: 2026-03-01 10:05:37.914520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8b1f05a76'
+down_revision: Union[str, Sequence[str], None] = 'a4c19e7f2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEW_CURRENCIES = ('GBP', 'EUR', 'AUD')
+
+# Exchange suffix → currency (same rule as app.utils.fx; holdings on these exchanges were stored as USD)
+SUFFIX_CURRENCIES = {
+    '.V': 'CAD', '.NE': 'CAD', '.CN': 'CAD',
+    '.L': 'GBP',
+    '.AX': 'AUD',
+    '.PA': 'EUR', '.DE': 'EUR', '.AS': 'EUR', '.MI': 'EUR', '.MC': 'EUR',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # New enum values must be committed before rows can use them
+    with op.get_context().autocommit_block():
+        for currency in NEW_CURRENCIES:
+            op.execute(f"ALTER TYPE currency ADD VALUE IF NOT EXISTS '{currency}'")
+
+    for suffix, currency in SUFFIX_CURRENCIES.items():
+        op.execute(
+            sa.text("UPDATE holdings SET currency = CAST(:currency AS currency) WHERE UPPER(symbol) LIKE :pattern")
+            .bindparams(currency=currency, pattern=f"%{suffix}")
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres can't drop enum values: map the rows back to the old values and rebuild the type
+    for table in ('holdings', 'portfolio_cash_flows'):
+        op.execute(f"UPDATE {table} SET currency = 'USD' WHERE currency::text IN ('GBP', 'EUR', 'AUD')")
+    op.execute("ALTER TYPE currency RENAME TO currency_old")
+    op.execute("CREATE TYPE currency AS ENUM ('CAD', 'USD')")
+    op.execute("ALTER TABLE holdings ALTER COLUMN currency DROP DEFAULT")
+    op.execute("ALTER TABLE portfolio_cash_flows ALTER COLUMN currency DROP DEFAULT")
+    op.execute("ALTER TABLE holdings ALTER COLUMN currency TYPE currency USING currency::text::currency")
+    op.execute("ALTER TABLE portfolio_cash_flows ALTER COLUMN currency TYPE currency USING currency::text::currency")
+    op.execute("ALTER TABLE holdings ALTER COLUMN currency SET DEFAULT 'USD'")
+    op.execute("ALTER TABLE portfolio_cash_flows ALTER COLUMN currency SET DEFAULT 'CAD'")
+    op.execute("DROP TYPE currency_old")
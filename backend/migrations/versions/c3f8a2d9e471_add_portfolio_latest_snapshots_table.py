@@ -0,0 +1,49 @@
+"""add portfolio_latest_snapshots table
+
+Revision ID: c3f8a2d9e471
+Revises: 5d1c0b7a93e2
+Create Date: 2026-02-24 15:06:52.817304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a2d9e471'
+down_revision: Union[str, Sequence[str], None] = '5d1c0b7a93e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('portfolio_latest_snapshots',
+    sa.Column('portfolio_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('total_value', sa.Float(), nullable=True),
+    sa.Column('daily_change', sa.Float(), nullable=True),
+    sa.Column('daily_percent', sa.Float(), nullable=True),
+    sa.Column('all_time_gain', sa.Float(), nullable=True),
+    sa.Column('all_time_percent', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('portfolio_id')
+    )
+
+    # Seed from the newest existing snapshot per portfolio (uses ix_portfolio_history_portfolio_timestamp)
+    op.execute("""
+        INSERT INTO portfolio_latest_snapshots
+            (portfolio_id, timestamp, total_value, daily_change, daily_percent, all_time_gain, all_time_percent)
+        SELECT DISTINCT ON (portfolio_id)
+            portfolio_id, timestamp, total_value, daily_change, daily_percent, all_time_gain, all_time_percent
+        FROM portfolio_history
+        WHERE portfolio_id IS NOT NULL AND timestamp IS NOT NULL
+        ORDER BY portfolio_id, timestamp DESC
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('portfolio_latest_snapshots')
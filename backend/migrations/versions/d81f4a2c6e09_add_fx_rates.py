@@ -0,0 +1,33 @@
+"""add fx_rates table
+
+Revision ID: d81f4a2c6e09
+Revises: c3e8b1f05a76
+Create Date: 2026-03-02 08:47:12.603158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4a2c6e09'
+down_revision: Union[str, Sequence[str], None] = 'c3e8b1f05a76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fx_rates',
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('usd_rate', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('currency', 'date')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('fx_rates')
@@ -0,0 +1,36 @@
+"""add dividend_events table and symbol_info.ex_dividend_date
+
+Revision ID: e5b2c7d94a13
+Revises: d81f4a2c6e09
+Create Date: 2026-03-03 09:12:40.271853
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b2c7d94a13'
+down_revision: Union[str, Sequence[str], None] = 'd81f4a2c6e09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('dividend_events',
+    sa.Column('symbol', sa.String(), nullable=False),
+    sa.Column('ex_date', sa.Date(), nullable=False),
+    sa.Column('pay_date', sa.Date(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('symbol', 'ex_date')
+    )
+    op.add_column('symbol_info', sa.Column('ex_dividend_date', sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('symbol_info', 'ex_dividend_date')
+    op.drop_table('dividend_events')
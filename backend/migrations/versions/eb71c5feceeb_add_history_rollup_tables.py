@@ -0,0 +1,55 @@
+"""add history rollup tables
+
+Revision ID: eb71c5feceeb
+Revises: 14a62c6dbd03
+Create Date: 2026-02-24 09:41:18.604512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eb71c5feceeb'
+down_revision: Union[str, Sequence[str], None] = '14a62c6dbd03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('portfolio_history_rollups',
+    sa.Column('portfolio_id', sa.Integer(), nullable=False),
+    sa.Column('resolution', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('total_value', sa.Float(), nullable=True),
+    sa.Column('daily_change', sa.Float(), nullable=True),
+    sa.Column('daily_percent', sa.Float(), nullable=True),
+    sa.Column('all_time_gain', sa.Float(), nullable=True),
+    sa.Column('all_time_percent', sa.Float(), nullable=True),
+    sa.Column('samples', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
+    sa.PrimaryKeyConstraint('portfolio_id', 'resolution', 'bucket_start')
+    )
+    op.create_table('global_history_rollups',
+    sa.Column('resolution', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('total_value', sa.Float(), nullable=True),
+    sa.Column('daily_change', sa.Float(), nullable=True),
+    sa.Column('daily_percent', sa.Float(), nullable=True),
+    sa.Column('all_time_gain', sa.Float(), nullable=True),
+    sa.Column('all_time_percent', sa.Float(), nullable=True),
+    sa.Column('samples', sa.Integer(), nullable=True),
+    sa.Column('is_eod', sa.Boolean(), server_default='false', nullable=True),
+    sa.PrimaryKeyConstraint('resolution', 'bucket_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('global_history_rollups')
+    op.drop_table('portfolio_history_rollups')
@@ -0,0 +1,28 @@
+"""add fx_rates.is_live (EOD snapshot rows, replaced by downloaded closes)
+
+Revision ID: f2a7c4e81b35
+Revises: e5b2c7d94a13
+Create Date: 2026-03-04 10:05:18.447201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c4e81b35'
+down_revision: Union[str, Sequence[str], None] = 'e5b2c7d94a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('fx_rates', sa.Column('is_live', sa.Boolean(), server_default='false', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('fx_rates', 'is_live')
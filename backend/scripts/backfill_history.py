@@ -0,0 +1,50 @@
+"""
+Reconstruct daily (EOD) portfolio and global history for a past date range from the
+local price warehouse. Idempotent: days that already have an EOD row are skipped.
+
+Usage: python scripts/backfill_history.py --start 2024-01-01 [--end 2025-12-31] [--portfolio ID ...] [--workers N]
+"""
+import os
+import sys
+# Add the backend directory to Python path (parent of scripts/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import argparse
+from datetime import date, timedelta
+from app.database import SessionLocal
+from app.tasks.backfill_history import BACKFILL_WORKERS, backfill_history
+from app.utils.chart_cache import bump_history_version
+from app.utils.analytics import invalidate_analytics
+from app.utils.xirr import invalidate_all_xirr
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill EOD portfolio/global history from daily prices")
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today() - timedelta(days=1), help="Last day (default: yesterday)")
+    parser.add_argument("--portfolio", type=int, action="append", dest="portfolio_ids", help="Only this portfolio (repeatable; skips the global series)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Worker processes (one portfolio per job)")
+    args = parser.parse_args()
+
+    if args.start > args.end:
+        parser.error("--start must be on or before --end")
+
+    session = SessionLocal()
+    try:
+        inserted = backfill_history(session, args.start, args.end, portfolio_ids=args.portfolio_ids, workers=args.workers)
+        session.commit()
+        bump_history_version()
+        if inserted["portfolio"]:
+            invalidate_analytics()
+            invalidate_all_xirr()
+        print(f"Backfill {args.start} → {args.end}: {inserted['portfolio']} portfolio rows, {inserted['global']} global rows")
+        for portfolio_id, symbols in inserted["unpriced"].items():
+            print(f"  portfolio {portfolio_id}: no prices for {', '.join(symbols)} – left out")
+    except Exception as e:
+        session.rollback()
+        print(f"Error during backfill: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
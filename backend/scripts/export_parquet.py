@@ -0,0 +1,111 @@
+"""
+Incremental Parquet export of history / price data for offline analysis.
+
+Each run appends one part file per dataset containing only rows added since the
+watermark saved by the previous run (row id for history tables, time for prices):
+
+    exports/<dataset>/part-<watermark>.parquet
+    exports/<dataset>/_watermark.json
+
+--full rewrites a dataset from scratch and replaces its directory once the new
+file is complete.
+
+Read a dataset back with pyarrow.dataset / pandas.read_parquet on its directory.
+
+Usage: python scripts/export_parquet.py [dataset ...] [--out DIR] [--batch-rows N] [--full]
+"""
+import os
+import sys
+# Add the backend directory to Python path (parent of scripts/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import argparse
+import shutil
+import json
+from datetime import datetime
+from app.database import SessionLocal
+from app.utils.parquet_export import EXPORT_BATCH_ROWS, EXPORT_DATASETS, export_watermark, write_export
+
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "exports")
+WATERMARK_FILE = "_watermark.json"
+
+def read_watermark(directory: str, dataset):
+    path = os.path.join(directory, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        saved = json.load(f)
+    # Watermarks written before history exports were keyed on id are timestamps – those parts can't be
+    # continued incrementally without gaps / duplicates
+    key = saved.get("key", "timestamp" if dataset.key_kind == "id" else dataset.key)
+    if key != dataset.key:
+        raise SystemExit(f"{dataset.name}: saved watermark is keyed on {key}, not {dataset.key} – re-run with --full")
+    return dataset.parse_watermark(saved["watermark"])
+
+def save_watermark(directory: str, dataset, watermark, rows: int):
+    path = os.path.join(directory, WATERMARK_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump({
+            "key": dataset.key,
+            "watermark": dataset.format_watermark(watermark),
+            "rows": rows,
+            "exported_at": datetime.utcnow().isoformat(),
+        }, f)
+    os.replace(path + ".tmp", path)
+
+def part_name(watermark) -> str:
+    label = f"{watermark:012d}" if isinstance(watermark, int) else f"{watermark:%Y%m%dT%H%M%S%f}"
+    return f"part-{label}.parquet"
+
+def export(session, name: str, out: str, batch_rows: int, full: bool):
+    dataset = EXPORT_DATASETS[name]
+    directory = os.path.join(out, name)
+    os.makedirs(directory, exist_ok=True)
+
+    after = None if full else read_watermark(directory, dataset)
+    upto = export_watermark(session, dataset)
+    if upto is None or (after is not None and upto <= after):
+        print(f"{name}: nothing newer than {after}")
+        return
+
+    # A full export is built in a sibling directory that replaces the old one only once it is complete
+    target = directory + ".full.tmp" if full else directory
+    if full:
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target)
+
+    # Written under a temp name so a crashed run never leaves a half file next to the good parts
+    path = os.path.join(target, part_name(upto))
+    rows = write_export(session, dataset, path + ".tmp", after, upto, batch_rows)
+    if rows:
+        os.replace(path + ".tmp", path)
+    save_watermark(target, dataset, upto, rows)
+    if full:
+        shutil.rmtree(directory)
+        os.replace(target, directory)
+        path = os.path.join(directory, part_name(upto))
+    print(f"{name}: {rows} rows ({after} → {upto}) → {path if rows else 'no file'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental Parquet export of history and price data")
+    parser.add_argument("datasets", nargs="*", help=f"Datasets to export: {', '.join(EXPORT_DATASETS)} (default: all)")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="Output directory (one sub-directory per dataset)")
+    parser.add_argument("--batch-rows", type=int, default=EXPORT_BATCH_ROWS, help="Rows per Parquet row group")
+    parser.add_argument("--full", action="store_true", help="Ignore saved watermarks and replace each dataset with a fresh export")
+    args = parser.parse_args()
+    unknown = [name for name in args.datasets if name not in EXPORT_DATASETS]
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(unknown)}")
+
+    session = SessionLocal()
+    try:
+        for name in args.datasets or list(EXPORT_DATASETS):
+            export(session, name, args.out, args.batch_rows, args.full)
+    except Exception as e:
+        print(f"Error during export: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
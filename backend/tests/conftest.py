@@ -0,0 +1,47 @@
+# backend/tests/conftest.py – app modules read these at import time; nothing here opens a connection
+# (SQLAlchemy engines and Redis clients connect lazily), so the pure engines run without services.
+import os
+import sys
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/portfolio_manager_test")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils import price_warehouse as warehouse
+
+# Price warehouse on a temp directory, fed by a fake Yahoo instead of the network
+DAYS = pd.bdate_range("2024-01-02", periods=40)
+
+
+def history(closes, dividends=None, splits=None) -> pd.DataFrame:
+    """What Yahoo would answer today for the first len(closes) sessions"""
+    index = DAYS[:len(closes)]
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({
+        "open": closes, "high": closes, "low": closes, "close": closes, "adj_close": closes,
+        "volume": np.full(len(closes), 1000.0),
+        "dividends": np.zeros(len(closes)) if dividends is None else dividends,
+        "splits": np.zeros(len(closes)) if splits is None else splits,
+    }, index=index)
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    """Stored under tmp_path; downloads are served from `provider["XYZ"]` like yf.download would ([start, end))"""
+    frames = {}
+
+    def fetch(symbols, start, end):
+        return {
+            s: frames[s][(frames[s].index.date >= start) & (frames[s].index.date < end)]
+            for s in symbols if s in frames
+        }
+
+    monkeypatch.setattr(warehouse, "PRICE_WAREHOUSE_DIR", str(tmp_path))
+    monkeypatch.setattr(warehouse, "PRICE_WAREHOUSE_START", DAYS[0].date())
+    monkeypatch.setattr(warehouse, "fetch_daily_history", fetch)
+    return frames
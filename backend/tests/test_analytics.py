@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.utils.analytics import RISK_FREE_RATE, TRADING_DAYS, empty_state, fold, metrics
+
+DAY0 = datetime(2026, 1, 5, 21, 30)
+
+
+def days(count, start=0):
+    return [DAY0 + timedelta(days=start + i) for i in range(count)]
+
+
+def test_fold_returns_drawdown_and_extremes():
+    # 100 → 110 (+10 %) → 99 (-10 %): wealth 1.1, 0.99; drawdown 0.99 / 1.1 - 1 = -10 %
+    state = fold(empty_state(), days(3), np.array([100.0, 110.0, 99.0]))
+    assert state["n"] == 2
+    assert state["sum_r"] == pytest.approx(0.0)
+    assert state["sum_r2"] == pytest.approx(0.02)
+    assert np.exp(state["log_growth"]) == pytest.approx(0.99)
+    assert state["max_drawdown"] == pytest.approx(-0.1)
+    assert state["drawdown_peak"] == "2026-01-06"
+    assert state["drawdown_trough"] == "2026-01-07"
+    assert state["best_day"] == {"date": "2026-01-06", "value": pytest.approx(0.1)}
+    assert state["worst_day"] == {"date": "2026-01-07", "value": pytest.approx(-0.1)}
+
+
+def test_flows_are_removed_from_returns():
+    # A 50 deposit on day 2: (160 - 50) / 100 - 1 = 10 %, not 60 %
+    state = fold(empty_state(), days(2), np.array([100.0, 160.0]), flows=np.array([0.0, 50.0]))
+    assert state["sum_r"] == pytest.approx(0.1)
+
+
+def test_incremental_fold_matches_one_pass():
+    values = np.array([100.0, 104.0, 98.0, 101.0, 97.0, 110.0])
+    once = fold(empty_state(), days(6), values)
+    twice = fold(fold(empty_state(), days(3), values[:3]), days(3, start=3), values[3:])
+    for key in ("n", "sum_r", "sum_r2", "sum_down2", "log_growth", "max_drawdown", "peak"):
+        assert twice[key] == pytest.approx(once[key]), key
+    assert twice["window"] == pytest.approx(once["window"])
+    assert twice["drawdown_trough"] == once["drawdown_trough"]
+
+
+def test_metrics_from_running_sums():
+    result = metrics(fold(empty_state(), days(3), np.array([100.0, 110.0, 99.0])))
+    daily_vol = 0.02 ** 0.5  # sample std of [+0.1, -0.1]
+    assert result["days"] == 2
+    assert result["total_return"] == pytest.approx(-0.01)
+    assert result["annualized_return"] == pytest.approx(0.99 ** (TRADING_DAYS / 2) - 1)
+    assert result["volatility"] == pytest.approx(daily_vol * TRADING_DAYS ** 0.5)
+    assert result["sharpe"] == pytest.approx(-RISK_FREE_RATE / TRADING_DAYS / daily_vol * TRADING_DAYS ** 0.5)
+    assert result["max_drawdown"] == pytest.approx(-0.1)
+    assert result["rolling_returns"]["1M"] is None
+
+
+def test_metrics_without_returns():
+    result = metrics(fold(empty_state(), days(1), np.array([100.0])))
+    assert result["days"] == 0
+    assert result["total_return"] is None and result["volatility"] is None and result["max_drawdown"] is None
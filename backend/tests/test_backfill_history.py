@@ -0,0 +1,40 @@
+import numpy as np
+
+from app.tasks.backfill_history import compute_portfolio_series
+from app.utils import price_warehouse as warehouse
+from app.utils.history import is_trading_day
+from conftest import DAYS, history
+
+
+def job(symbols, quantities):
+    fx_dates = np.arange(np.datetime64(DAYS[0].date(), "D") - 30, np.datetime64(DAYS[-1].date(), "D") + 1)
+    return {
+        "portfolio_id": 1,
+        "symbols": symbols,
+        "quantities": quantities,
+        "purchase_prices": [10.0] * len(symbols),
+        "units": [1.0] * len(symbols),
+        "fx_dates": fx_dates,
+        "fx_rates": np.ones((len(fx_dates), len(symbols))),
+        "start": DAYS[0].date(),
+        "end": DAYS[9].date(),
+    }
+
+
+def test_unpriced_holdings_are_left_out_and_reported(provider):
+    provider["AAA"] = history(np.arange(10.0, 20.0))
+    warehouse.update_warehouse(["AAA"], DAYS[9].date())
+
+    series = compute_portfolio_series(job(["AAA", "GONE"], [2.0, 5.0]))
+
+    trading = [d for d in DAYS[:10] if is_trading_day(d.date())]
+    assert series["unpriced"] == ["GONE"]
+    assert len(series["dates"]) == len(trading)
+    assert series["total_value"][0] == 20.0  # AAA only
+    assert np.all(series["cost_basis"] == 20.0)
+
+
+def test_a_portfolio_without_any_prices_is_empty(provider):
+    series = compute_portfolio_series(job(["GONE"], [1.0]))
+    assert series["unpriced"] == ["GONE"]
+    assert len(series["dates"]) == 0
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from app.utils.analytics import RISK_FREE_RATE, TRADING_DAYS
+from app.utils.benchmarks import compare
+
+DATES = np.arange(np.datetime64("2026-01-05"), np.datetime64("2026-01-09"))
+
+
+def test_twice_the_benchmark():
+    # Portfolio returns +10 %, -5 %, +2 %; the benchmark exactly half of that → beta 2, correlation 1
+    values = 100.0 * np.cumprod([1.0, 1.10, 0.95, 1.02])
+    bench = 50.0 * np.cumprod([1.0, 1.05, 0.975, 1.01])
+    result = compare(DATES, values, np.zeros(4), ["XIC.TO"], bench[:, None])
+    [stats] = result["stats"]
+    rp, rb = np.array([0.10, -0.05, 0.02]), np.array([0.05, -0.025, 0.01])
+    rf = RISK_FREE_RATE / TRADING_DAYS
+    assert stats["observations"] == 3
+    assert stats["beta"] == pytest.approx(2.0)
+    assert stats["correlation"] == pytest.approx(1.0)
+    assert stats["alpha"] == pytest.approx(((rp.mean() - rf) - 2.0 * (rb.mean() - rf)) * TRADING_DAYS)
+    assert stats["tracking_error"] == pytest.approx(np.std(rp - rb, ddof=1) * TRADING_DAYS ** 0.5)
+    assert stats["portfolio_return"] == pytest.approx(1.10 * 0.95 * 1.02 - 1)
+    assert stats["excess_return"] == pytest.approx(1.10 * 0.95 * 1.02 - 1.05 * 0.975 * 1.01)
+    assert result["portfolio"] == pytest.approx([100.0, 110.0, 104.5, 106.59])
+    assert result["dates"][0] == "2026-01-05"
+
+
+def test_flows_and_missing_prices():
+    # Deposit of 100 on day 2: (210 - 100) / 100 - 1 = 10 %. Benchmark has no price on day 3 → that
+    # session is skipped in its stats and its index holds flat, reported as None where the price is missing
+    values = np.array([100.0, 210.0, 210.0, 231.0])
+    flows = np.array([0.0, 100.0, 0.0, 0.0])
+    bench = np.array([[10.0], [11.0], [np.nan], [12.1]])
+    result = compare(DATES, values, flows, ["SPY"], bench)
+    assert result["portfolio"] == pytest.approx([100.0, 110.0, 110.0, 121.0])
+    assert result["benchmarks"]["SPY"] == [100.0, 110.0, None, 110.0]
+    assert result["stats"][0]["observations"] == 1
+    assert "beta" not in result["stats"][0]  # fewer than two common sessions
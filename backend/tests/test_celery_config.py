@@ -0,0 +1,26 @@
+from app.celery_config import TASK_MODULES, celery_app
+
+EXPECTED_TASKS = {
+    "app.tasks.update_prices.update_all_prices",
+    "app.tasks.portfolio_history_task.save_portfolio_history_snapshot",
+    "app.tasks.portfolio_history_task.save_daily_global_snapshot",
+    "app.tasks.update_symbol_sectors.update_symbol_sectors",
+    "app.tasks.refresh_symbol_info.refresh_symbol_info",
+    "app.tasks.history_rollup_task.rollup_history",
+    "app.tasks.history_partition_task.maintain_history_partitions",
+    "app.tasks.update_price_warehouse.update_price_warehouse",
+    "app.tasks.backfill_history.backfill_history_task",
+}
+
+
+def test_worker_registers_every_task():
+    # What the worker does at boot – any ImportError in a task module fails here
+    celery_app.loader.import_default_modules()
+    assert EXPECTED_TASKS <= set(celery_app.tasks)
+    assert set(celery_app.conf.imports) == set(TASK_MODULES)
+
+
+def test_beat_schedule_targets_registered_tasks():
+    celery_app.loader.import_default_modules()
+    for name, entry in celery_app.conf.beat_schedule.items():
+        assert entry["task"] in celery_app.tasks, name
@@ -0,0 +1,48 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.utils import dividends
+from app.utils.dividends import DEFAULT_PAY_LAG_DAYS, SCHEDULE_EVENTS, infer_schedules
+
+TODAY = date(2026, 10, 1)
+T = (TODAY - date(1970, 1, 1)).days
+
+
+def right_aligned(rows):
+    out = np.full((len(rows), SCHEDULE_EVENTS), np.nan)
+    for i, row in enumerate(rows):
+        if row:
+            out[i, -len(row):] = row
+    return out
+
+
+@pytest.fixture
+def events(monkeypatch):
+    quarterly = [T - 10 - 91 * k for k in range(7, -1, -1)]
+    monthly = [T - 5 - 30 * k for k in range(12, -1, -1)]
+    stale = [T - 400 - 91 * k for k in range(3, -1, -1)]
+    ex = right_aligned([quarterly, monthly, [], stale])
+    amounts = right_aligned([[0.5] * 8, [0.1] * 12 + [3.0], [], [0.2] * 4])
+    lags = right_aligned([[20.0] * 8, [np.nan] * 13, [], [15.0] * 4])
+    monkeypatch.setattr(dividends, "event_matrices", lambda db, symbols, width=SCHEDULE_EVENTS: (ex, amounts, lags))
+
+
+def test_infer_schedules(events):
+    s = infer_schedules(None, ["QTR", "MON", "NONE", "STALE"], TODAY)
+    np.testing.assert_array_equal(s["frequency"], [4, 12, 0, 0])
+    # Quarterly: 0.5 every 91 days, paid 20 days after the ex-date
+    assert s["regular"][0] == pytest.approx(0.5)
+    assert s["last_ex"][0] == T - 10
+    assert s["last_pay"][0] == T - 10 + 20
+    # Monthly: the 3.00 special is > 2× the trailing median (0.10) → regular stays 0.10; no pay dates → default lag
+    assert s["last_amount"][1] == pytest.approx(3.0)
+    assert s["regular"][1] == pytest.approx(0.1)
+    assert s["lag"][1] == DEFAULT_PAY_LAG_DAYS
+    assert s["last_pay"][1] == T - 5 + DEFAULT_PAY_LAG_DAYS
+    # No history: no schedule, default lag
+    assert np.isnan(s["last_ex"][2])
+    assert s["lag"][2] == DEFAULT_PAY_LAG_DAYS
+    # Last ex-date 400 days ago on a 91-day schedule: more than two missed payments → suspended
+    assert s["period"][3] == pytest.approx(365.25 / 4)
@@ -0,0 +1,30 @@
+import numpy as np
+
+from app.utils.downsample import downsample, lttb_indices
+
+
+def test_short_series_is_kept():
+    x = np.arange(5.0)
+    np.testing.assert_array_equal(lttb_indices(x, x, 5), np.arange(5))
+    np.testing.assert_array_equal(lttb_indices(x, x, 2), np.arange(5))  # < 3 points can't hold a bucket
+
+
+def test_single_bucket_keeps_the_spike():
+    # One bucket over indices 1..5; the spike at 3 spans the largest triangle with (0, 0) and (6, 0)
+    x = np.arange(7.0)
+    y = np.array([0.0, 0.0, 0.0, 10.0, 0.0, 0.0, 0.0])
+    np.testing.assert_array_equal(lttb_indices(x, y, 3), [0, 3, 6])
+
+
+def test_two_buckets_keep_peak_and_trough():
+    # Buckets [1, 3) and [3, 5): the peak at 2 and the trough at 3 win their buckets
+    x = np.arange(6.0)
+    y = np.array([0.0, 1.0, 5.0, -5.0, 0.0, 0.0])
+    np.testing.assert_array_equal(lttb_indices(x, y, 4), [0, 2, 3, 5])
+
+
+def test_downsample_returns_items():
+    items = [{"t": i, "v": v} for i, v in enumerate([0, 0, 0, 10, 0, 0, 0])]
+    kept = downsample(items, 3, x=lambda p: p["t"], y=lambda p: p["v"])
+    assert [p["t"] for p in kept] == [0, 3, 6]
+    assert downsample(items, None, x=lambda p: p["t"], y=lambda p: p["v"]) == items
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.models import Currency, Holding
+from app.utils import dividends, drip
+from app.utils import price_warehouse as warehouse
+from app.utils.fx import FxMatrix
+from conftest import DAYS, history
+
+EPOCH = date(1970, 1, 1)
+
+
+def day(value: date) -> float:
+    return float((value - EPOCH).days)
+
+
+def test_events_without_a_close_are_skipped(provider, monkeypatch):
+    provider["AAA.TO"] = history([10.0] * 21)
+    warehouse.update_warehouse(["AAA.TO"], DAYS[20].date())
+
+    # The first ex-date predates the stored history – nothing to buy at
+    ex = np.array([[day(DAYS[0].date() - timedelta(days=20)), day(DAYS[5].date()), day(DAYS[10].date())]])
+    amounts = np.full((1, 3), 0.5)
+    lags = np.zeros((1, 3))
+
+    def event_matrices(db, symbols, width=dividends.SCHEDULE_EVENTS):
+        pad = np.full((1, (width or 3) - 3), np.nan)
+        return tuple(np.hstack([pad, m]) for m in (ex, amounts, lags))
+
+    for module in (drip, dividends):
+        monkeypatch.setattr(module, "event_matrices", event_matrices)
+
+    holding = Holding(id=1, portfolio_id=1, symbol="AAA.TO", quantity=100.0, current_price=10.0,
+                      purchase_price=8.0, currency=Currency.CAD)
+    inputs = drip.prepare_drip(None, [holding], FxMatrix({"USD": 1.0, "CAD": 1.25}),
+                               start=DAYS[0].date() - timedelta(days=30), today=DAYS[20].date())
+    [result] = drip.simulate_batch(inputs, np.array([0]), years=1)["holdings"]
+
+    backtest = result["backtest"]
+    assert backtest["events"] == 2
+    assert backtest["events_skipped"] == 1
+    # 100 shares × 0.50, then 105 shares × 0.50 (the first reinvestment bought 5 shares at 10.00)
+    assert backtest["dividends_reinvested_cad"] == pytest.approx(102.5)
+    assert backtest["dividends_cash_cad"] == pytest.approx(100.0)
+    assert backtest["drip_shares"] == pytest.approx(110.25)
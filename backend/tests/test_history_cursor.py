@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models import GlobalHistory, GlobalHistoryRollup
+from app.utils.history import DAY, RAW, _history_query, next_cursor, parse_cursor
+
+
+class _Query:
+    """Records filters / ordering instead of hitting the database"""
+
+    def __init__(self):
+        self.filters, self.order = [], []
+
+    def filter(self, clause):
+        self.filters.append(clause)
+        return self
+
+    def order_by(self, *clauses):
+        self.order.extend(clauses)
+        return self
+
+    def limit(self, _):
+        return self
+
+    def all(self):
+        return []
+
+
+def _sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trips_for_raw_and_rollup_rows():
+    ts = datetime(2024, 3, 1, 14, 30)
+    raw = [GlobalHistory(id=41, timestamp=ts), GlobalHistory(id=42, timestamp=ts)]
+    assert next_cursor(raw, 2) == "2024-03-01T14:30:00|42"
+    assert parse_cursor(next_cursor(raw, 2), RAW) == (ts, 42)
+    assert next_cursor(raw, 3) is None  # short page → last page
+
+    bucket = datetime(2024, 3, 1, 5)
+    rollup = [GlobalHistoryRollup(resolution=DAY, bucket_start=bucket, timestamp=ts)]
+    assert parse_cursor(next_cursor(rollup, 1), DAY) == (ts, bucket)
+
+
+def test_bare_timestamp_cursor_is_still_accepted():
+    assert parse_cursor("2024-03-01T14:30:00+00:00") == (datetime(2024, 3, 1, 14, 30), None)
+    with pytest.raises(ValueError):
+        parse_cursor("2024-03-01T14:30:00|abc", RAW)
+
+
+def test_keyset_filter_and_order_include_the_tiebreak():
+    query = _Query()
+    _history_query(query, GlobalHistory, None, None, (datetime(2024, 3, 1), 42), 10, descending=True)
+    assert _sql(query.filters[0]) == "(global_history.timestamp, global_history.id) < (%(param_1)s, %(param_2)s)"
+    assert [_sql(c) for c in query.order] == ["global_history.timestamp DESC", "global_history.id DESC"]
@@ -0,0 +1,84 @@
+from datetime import date
+
+from app.tasks import history_partition_task as partitions
+from app.tasks.history_partition_task import add_months, ensure_partition_range, expire_partitions
+
+
+class FakeSession:
+    """Answers the pg_inherits lookup with `children` and records every other statement"""
+
+    def __init__(self, children):
+        self.children = list(children)
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        if "pg_inherits" in sql:
+            return _Result(self.children)
+        self.statements.append(sql)
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_only_missing_months_are_created():
+    db = FakeSession(["global_history_p202401"])
+    created = ensure_partition_range(db, "global_history", date(2024, 1, 15), date(2024, 3, 2))
+    assert created == ["global_history_p202402", "global_history_p202403"]
+    assert db.statements == [
+        'CREATE TABLE IF NOT EXISTS "global_history_p202402" PARTITION OF "global_history" '
+        "FOR VALUES FROM ('2024-02-01') TO ('2024-03-01')",
+        'CREATE TABLE IF NOT EXISTS "global_history_p202403" PARTITION OF "global_history" '
+        "FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')",
+    ]
+
+
+def test_rows_in_the_default_partition_move_to_the_new_month():
+    db = FakeSession(["portfolio_history_default"])
+    ensure_partition_range(db, "portfolio_history", date(2023, 12, 1), date(2023, 12, 31))
+    in_range = "\"timestamp\" >= '2023-12-01' AND \"timestamp\" < '2024-01-01'"
+    assert db.statements == [
+        'CREATE TABLE "portfolio_history_p202312" (LIKE "portfolio_history" INCLUDING DEFAULTS)',
+        f'INSERT INTO "portfolio_history_p202312" SELECT * FROM "portfolio_history_default" WHERE {in_range}',
+        f'DELETE FROM "portfolio_history_default" WHERE {in_range}',
+        'ALTER TABLE "portfolio_history" ATTACH PARTITION "portfolio_history_p202312" '
+        "FOR VALUES FROM ('2023-12-01') TO ('2024-01-01')",
+    ]
+
+
+def test_expiry_is_opt_in_and_skips_the_default_partition():
+    children = ["global_history_default", "global_history_p202312", "global_history_p202401", "global_history_p202402"]
+    assert expire_partitions(FakeSession(children), "global_history", date(2024, 3, 10), retention_months=0) == []
+
+    db = FakeSession(children)
+    # Cutoff 2024-02-01: December and January have ended before it, February hasn't
+    expired = expire_partitions(db, "global_history", date(2024, 3, 10), retention_months=1, mode="drop")
+    assert expired == ["global_history_p202312", "global_history_p202401"]
+    assert db.statements == [
+        'ALTER TABLE "global_history" DETACH PARTITION "global_history_p202312"',
+        'DROP TABLE "global_history_p202312"',
+        'ALTER TABLE "global_history" DETACH PARTITION "global_history_p202401"',
+        'DROP TABLE "global_history_p202401"',
+    ]
+
+
+def test_archived_partitions_move_schema():
+    db = FakeSession(["global_history_p202312"])
+    expire_partitions(db, "global_history", date(2024, 3, 10), retention_months=2, mode="archive")
+    assert db.statements[1:] == [
+        f'CREATE SCHEMA IF NOT EXISTS "{partitions.ARCHIVE_SCHEMA}"',
+        f'ALTER TABLE "global_history_p202312" SET SCHEMA "{partitions.ARCHIVE_SCHEMA}"',
+    ]
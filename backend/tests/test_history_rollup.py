@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from app.tasks import history_rollup_task as rollup
+from app.utils.history import DAY, HOUR, current_bucket_start
+
+
+class FakeSession:
+    """Records executed statements instead of running them"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement.compile(dialect=postgresql.dialect()))
+        return type("Result", (), {"rowcount": 0})()
+
+
+def sql(compiled) -> str:
+    return " ".join(str(compiled).split())
+
+
+def test_day_buckets_start_at_toronto_midnight():
+    # 03:00 UTC on 15 Jan is still 14 Jan in Toronto (EST, UTC-5); in July it is EDT (UTC-4)
+    assert current_bucket_start(DAY, datetime(2024, 1, 15, 3)) == datetime(2024, 1, 14, 5)
+    assert current_bucket_start(DAY, datetime(2024, 7, 15, 3)) == datetime(2024, 7, 14, 4)
+    assert current_bucket_start(HOUR, datetime(2024, 7, 15, 3, 59, 12)) == datetime(2024, 7, 15, 3)
+
+
+def test_daily_rollup_keeps_the_eod_snapshot_per_bucket():
+    db = FakeSession()
+    rollup.rollup_portfolio_history(db, DAY, datetime(2024, 3, 1), since=datetime(2024, 2, 1))
+    [statement] = db.statements
+    text = sql(statement)
+
+    assert text.startswith("INSERT INTO portfolio_history_rollups (portfolio_id, resolution, bucket_start, timestamp,")
+    assert "SELECT DISTINCT ON (portfolio_history.portfolio_id, timezone(" in text
+    assert "ORDER BY portfolio_history.portfolio_id, timezone(" in text
+    assert text.index("is_eod DESC NULLS LAST") < text.index("portfolio_history.timestamp DESC")
+    assert "count(*) OVER (PARTITION BY portfolio_history.portfolio_id, timezone(" in text
+    assert "ON CONFLICT (portfolio_id, resolution, bucket_start) DO UPDATE SET timestamp = excluded.timestamp" in text
+    assert "portfolio_history.timestamp < %(timestamp_1)s" in text
+    assert "portfolio_history.timestamp >= %(timestamp_2)s" in text
+    assert statement.params["timestamp_1"] == datetime(2024, 3, 1)
+    assert statement.params["timestamp_2"] == datetime(2024, 2, 1)
+    assert statement.params["date_trunc_1"] == "day"
+
+
+def test_hourly_global_rollup_has_no_eod_preference():
+    db = FakeSession()
+    rollup.rollup_global_history(db, HOUR, datetime(2024, 3, 1, 12), since=datetime(2024, 3, 1, 9))
+    text = sql(db.statements[0])
+    assert "SELECT DISTINCT ON (date_trunc(" in text
+    assert "ORDER BY date_trunc(%(date_trunc_1)s, global_history.timestamp), global_history.timestamp DESC" in text
+    assert "ON CONFLICT (resolution, bucket_start) DO UPDATE" in text
+    assert "is_eod = excluded.is_eod" in text
+
+
+def test_retention_keeps_eod_rows_and_unrolled_days():
+    now = datetime(2024, 3, 10, 12)
+    db = FakeSession()
+
+    # Rollups only reached 1 Feb: raw rows after that stay even though they are past retention
+    rolled_until = now - timedelta(days=rollup.HISTORY_RAW_RETENTION_DAYS + 8)
+    rollup.apply_retention(db, now, rolled_until)
+    portfolio_raw, global_raw, portfolio_hourly, global_hourly = db.statements
+
+    assert sql(portfolio_raw) == (
+        "DELETE FROM portfolio_history WHERE portfolio_history.timestamp < %(timestamp_1)s "
+        "AND (portfolio_history.is_eod IS NULL OR portfolio_history.is_eod = false)"
+    )
+    assert portfolio_raw.params["timestamp_1"] == rolled_until
+    assert "global_history.is_eod IS NULL OR global_history.is_eod = false" in sql(global_raw)
+    assert sql(portfolio_hourly).endswith("resolution = %(resolution_1)s AND portfolio_history_rollups.bucket_start < %(bucket_start_1)s")
+    assert portfolio_hourly.params == {
+        "resolution_1": HOUR,
+        "bucket_start_1": now - timedelta(days=rollup.HISTORY_HOURLY_RETENTION_DAYS),
+    }
+    assert global_hourly.params["resolution_1"] == HOUR
+
+    # Fully rolled up: the retention window is the limit
+    db = FakeSession()
+    rollup.apply_retention(db, now, now)
+    assert db.statements[0].params["timestamp_1"] == now - timedelta(days=rollup.HISTORY_RAW_RETENTION_DAYS)
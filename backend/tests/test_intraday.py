@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.models import Currency, Holding
+from app.utils.intraday import INTRADAY_BAR_MS, SESSION_TZ, _bar_matrix, _prices_on, session_start
+
+OPEN = int(SESSION_TZ.localize(datetime(2026, 10, 16, 9, 30)).timestamp() * 1000)
+YESTERDAY_CLOSE = int(SESSION_TZ.localize(datetime(2026, 10, 15, 15, 55)).timestamp() * 1000)
+
+
+def test_prices_on_forward_fills():
+    inf = np.inf
+    times = np.array([[-inf, 10.0, 20.0, inf], [-inf, 15.0, inf, inf]])
+    prices = np.array([[1.0, 2.0, 3.0, np.nan], [5.0, 6.0, np.nan, np.nan]])
+    grid = np.array([5.0, 10.0, 15.0, 20.0, 25.0])
+    expected = np.array([
+        [1.0, 2.0, 2.0, 3.0, 3.0],  # previous close before the first bar, then the last bar at or before t
+        [5.0, 5.0, 6.0, 6.0, 6.0],
+    ])
+    np.testing.assert_array_equal(_prices_on(grid, times, prices), expected)
+
+
+def test_session_start_is_toronto_midnight():
+    midnight = int(SESSION_TZ.localize(datetime(2026, 10, 16)).timestamp() * 1000)
+    assert session_start(OPEN + 3 * INTRADAY_BAR_MS) == midnight
+
+
+def test_bar_matrix_drops_previous_sessions():
+    live = Holding(symbol="AAA.TO", current_price=11.0, daily_change=1.0, currency=Currency.CAD, day_chart=[
+        {"time": OPEN + INTRADAY_BAR_MS, "price": 11.0},
+        {"time": YESTERDAY_CLOSE, "price": 9.5},
+        {"time": OPEN, "price": 10.5},
+    ])
+    closed = Holding(symbol="BBB.L", current_price=50.0, daily_change=2.0, currency=Currency.GBP, day_chart=[
+        {"time": YESTERDAY_CLOSE, "price": 50.0},
+    ])
+    times, prices = _bar_matrix([live, closed], session_start(OPEN))
+    np.testing.assert_array_equal(times[0], [-np.inf, OPEN, OPEN + INTRADAY_BAR_MS])
+    np.testing.assert_array_equal(prices[0], [10.0, 10.5, 11.0])  # previous close = price − daily change
+    # Only yesterday's bars: flat at the last price all session
+    assert times[1, 1:].tolist() == [np.inf, np.inf]
+    assert prices[1, 0] == pytest.approx(50.0)
+    grid = np.arange(OPEN, OPEN + 3 * INTRADAY_BAR_MS, INTRADAY_BAR_MS, dtype=np.float64)
+    np.testing.assert_array_equal(_prices_on(grid, times, prices), [[10.5, 11.0, 11.0], [50.0, 50.0, 50.0]])
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+import pytest
+
+from app.utils.parquet_export import EXPORT_DATASETS
+
+
+def test_offset_watermarks_become_naive_utc():
+    prices = EXPORT_DATASETS["prices"]
+    after = prices.parse_watermark("2024-03-01T10:00:00-05:00")
+    assert after == datetime(2024, 3, 1, 15, 0)
+    assert after <= datetime(2024, 3, 2)  # comparable with the naive stored watermark
+    assert prices.parse_watermark(prices.format_watermark(after)) == after
+
+
+def test_history_watermarks_are_row_ids():
+    history = next(d for d in EXPORT_DATASETS.values() if d.key_kind == "id")
+    assert history.parse_watermark("42") == 42
+    with pytest.raises(ValueError):
+        history.parse_watermark("2024-03-01T10:00:00")
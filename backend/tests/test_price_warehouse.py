@@ -0,0 +1,54 @@
+from datetime import date
+
+import numpy as np
+
+from app.utils import price_warehouse as warehouse
+from conftest import DAYS, history
+
+def closes(symbol="XYZ"):
+    return warehouse.load_symbol_history(symbol, columns=("close",))["close"].to_pylist()
+
+
+def test_daily_appends_are_compacted(provider, monkeypatch, tmp_path):
+    monkeypatch.setattr(warehouse, "PRICE_WAREHOUSE_MAX_PARTS", 3)
+    provider["XYZ"] = history(np.arange(10.0, 20.0))
+
+    for day in DAYS[4:10]:
+        warehouse.update_warehouse(["xyz"], day.date())
+
+    parts = list((tmp_path / "symbol=XYZ" / "year=2024").glob("part-*.parquet"))
+    assert 1 <= len(parts) <= 3
+    assert closes() == list(np.arange(10.0, 20.0))
+    assert warehouse.read_manifest() == {"XYZ": DAYS[9].date()}
+
+
+def test_a_split_replaces_the_stored_history(provider):
+    provider["XYZ"] = history([100.0] * 5)
+    assert warehouse.update_warehouse(["XYZ"], DAYS[4].date()) == {"XYZ": 5}
+
+    # 2:1 split on day 6 – Yahoo now reports every earlier close halved
+    provider["XYZ"] = history([50.0] * 6, splits=[0, 0, 0, 0, 0, 2.0])
+    assert warehouse.update_warehouse(["XYZ"], DAYS[5].date()) == {"XYZ": 6}
+
+    assert closes() == [50.0] * 6
+    assert warehouse.read_rewritten() == {"XYZ": date.today()}
+    assert warehouse.read_manifest() == {"XYZ": DAYS[5].date()}
+    _, prices = warehouse.load_price_matrix(["XYZ"], field="adj_close")
+    assert np.allclose(prices[1:] / prices[:-1], 1.0)  # no fake −50% step
+
+
+def test_a_failed_rewrite_keeps_history_and_retries(provider, monkeypatch):
+    provider["XYZ"] = history([100.0] * 5)
+    warehouse.update_warehouse(["XYZ"], DAYS[4].date())
+
+    # The range download sees the dividend, the full re-download comes back empty
+    provider["XYZ"] = history([99.0] * 6, dividends=[0, 0, 0, 0, 0, 1.0])
+    fetch = warehouse.fetch_daily_history
+    with monkeypatch.context() as patch:
+        patch.setattr(warehouse, "fetch_daily_history", lambda s, start, end: fetch(s, start, end) if start != DAYS[0].date() else {})
+        assert warehouse.update_warehouse(["XYZ"], DAYS[5].date()) == {"XYZ": 0}
+    assert closes() == [100.0] * 5
+    assert warehouse.read_manifest() == {"XYZ": DAYS[4].date()}
+
+    assert warehouse.update_warehouse(["XYZ"], DAYS[5].date()) == {"XYZ": 6}
+    assert closes() == [99.0] * 6
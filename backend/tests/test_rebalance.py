@@ -0,0 +1,51 @@
+import pytest
+
+from app.models import Currency, Holding, TargetAllocation
+from app.utils.fx import FxMatrix
+from app.utils.rebalance import rebalance
+
+FX = FxMatrix({"USD": 1.0, "CAD": 1.25})
+
+
+def holding(id, symbol, quantity, price, currency=Currency.CAD):
+    return Holding(id=id, portfolio_id=1, symbol=symbol, quantity=quantity, current_price=price,
+                   market_value=quantity * price, currency=currency)
+
+
+def targets(**weights):
+    return [TargetAllocation(portfolio_id=1, kind="symbol", key=key, weight_percent=w) for key, w in weights.items()]
+
+
+def trades(result):
+    return {t["symbol"]: (t["action"], t["shares"]) for t in result["trades"]}
+
+
+def test_back_to_target():
+    # 100 + 300 CAD, 50 / 50 target → buy 10 AAA, sell 10 BBB (sales fund the buys)
+    holdings = [holding(1, "AAA.TO", 10, 10.0), holding(2, "BBB.TO", 30, 10.0)]
+    [result] = rebalance(None, [1], holdings, targets(**{"AAA.TO": 50, "BBB.TO": 50}), FX)
+    assert result["total_value"] == pytest.approx(400.0)
+    assert trades(result) == {"AAA.TO": ("buy", 10.0), "BBB.TO": ("sell", 10.0)}
+    assert result["cash_after"]["CAD"] == pytest.approx(0.0)
+
+
+def test_edge_mode_trades_to_the_band():
+    # Targets 50 %, band 2 % → AAA to 48 % (192 CAD: +92 → 9 shares), BBB to 52 % (208 CAD: -92 → 9 shares)
+    holdings = [holding(1, "AAA.TO", 10, 10.0), holding(2, "BBB.TO", 30, 10.0)]
+    [result] = rebalance(None, [1], holdings, targets(**{"AAA.TO": 50, "BBB.TO": 50}), FX, mode="edge")
+    assert trades(result) == {"AAA.TO": ("buy", 9.0), "BBB.TO": ("sell", 9.0)}
+
+
+def test_inside_band_no_trades():
+    holdings = [holding(1, "AAA.TO", 10, 10.0), holding(2, "BBB.TO", 10, 10.0)]
+    [result] = rebalance(None, [1], holdings, targets(**{"AAA.TO": 51, "BBB.TO": 49}), FX)
+    assert result["trades"] == []
+
+
+def test_foreign_buy_reports_the_conversion():
+    # 100 CAD of AAA + 100 CAD cash, target 50 % SPY (USD 10 = 12.50 CAD): 100 / 12.5 = 8 shares, 80 USD
+    holdings = [holding(1, "AAA.TO", 10, 10.0), holding(2, "SPY", 0, 10.0, Currency.USD)]
+    [result] = rebalance(None, [1], holdings, targets(**{"AAA.TO": 50, "SPY": 50}), FX, cash={1: {"CAD": 100.0}})
+    assert trades(result)["SPY"] == ("buy", 8.0)
+    assert result["fx_conversions"]["USD"] == pytest.approx(100.0)
+    assert result["cash_after"]["CAD"] == pytest.approx(0.0)
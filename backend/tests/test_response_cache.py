@@ -0,0 +1,36 @@
+import pytest
+
+from app.utils import response_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setattr(response_cache, "_stats", None)
+    yield tmp_path
+    response_cache._cache.close()
+    response_cache._stats.close()
+
+
+def test_empty_responses_are_not_cached(cache_dir):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {} if len(calls) == 1 else {"sector": "Energy"}
+
+    assert response_cache.cached_call("yahoo.info", "XOM", fetch, ttl=60) == {}
+    assert response_cache.cached_call("yahoo.info", "XOM", fetch, ttl=60) == {"sector": "Energy"}
+    assert response_cache.cached_call("yahoo.info", "XOM", fetch, ttl=60) == {"sector": "Energy"}
+    assert len(calls) == 2
+
+
+def test_sweep_runs_at_most_once_per_interval(cache_dir, monkeypatch):
+    response_cache._open()
+    sweeps = []
+    monkeypatch.setattr(response_cache._cache, "cull", lambda retry=False: sweeps.append(1) or 0)
+
+    for symbol in ("A", "B", "C"):
+        response_cache.cached_call("yahoo.info", symbol, lambda: {"symbol": symbol}, ttl=60)
+    assert len(sweeps) == 1
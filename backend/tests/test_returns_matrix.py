@@ -0,0 +1,82 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils import price_warehouse as warehouse
+from app.utils import returns_matrix
+from app.utils.risk import compute_risk
+from conftest import DAYS, history
+
+
+@pytest.fixture
+def matrix_path(provider, tmp_path, monkeypatch):
+    monkeypatch.setattr(returns_matrix, "RETURNS_MATRIX_PATH", str(tmp_path / "risk" / "returns.npz"))
+    monkeypatch.setattr(returns_matrix, "_loaded", {"mtime": None, "data": None})
+    return provider
+
+
+def column(symbol="XYZ"):
+    matrix = returns_matrix.load_returns_matrix()
+    return matrix.columns([symbol])[:, 0]
+
+
+def test_a_split_leaves_no_fake_crash(matrix_path):
+    matrix_path["XYZ"] = history([100.0] * 5)
+    warehouse.update_warehouse(["XYZ"], DAYS[4].date())
+    returns_matrix.update_returns_matrix(["XYZ"], DAYS[4].date())
+
+    # 2:1 split on day 6: the warehouse replaces the history, the new session's return is flat
+    matrix_path["XYZ"] = history([50.0] * 6, splits=[0, 0, 0, 0, 0, 2.0])
+    warehouse.update_warehouse(["XYZ"], DAYS[5].date())
+    returns_matrix.update_returns_matrix(["XYZ"], DAYS[5].date())
+
+    assert np.allclose(column(), 0.0)
+    assert len(column()) == 5
+
+
+def test_columns_are_rebuilt_after_a_history_rewrite(matrix_path):
+    # Warehouse filled before corporate actions were tracked: the split shows up as a −50% day
+    manifest = {}
+    warehouse.append_prices("XYZ", history([100.0] * 5 + [50.0]), manifest)
+    warehouse._write_dates(warehouse.MANIFEST_FILE, manifest)
+    returns_matrix.update_returns_matrix(["XYZ"], DAYS[5].date())
+    assert column()[-1] == pytest.approx(-0.5)
+
+    matrix_path["XYZ"] = history([50.0] * 6, splits=[0, 0, 0, 0, 0, 2.0])
+    warehouse.rewrite_history(["XYZ"], DAYS[5].date())
+    matrix = returns_matrix.update_returns_matrix(["XYZ"], DAYS[5].date())
+
+    assert np.allclose(column(), 0.0)
+    assert matrix.built_on("XYZ") == date.today()
+
+
+def test_historical_var_ignores_a_split(matrix_path):
+    rng = np.random.default_rng(7)
+    n = len(DAYS)
+    aaa = 100.0 * np.cumprod(1.0 + rng.normal(0.0, 0.01, n))
+    bbb = 50.0 * np.cumprod(1.0 + rng.normal(0.0, 0.02, n))
+    matrix_path["USDCAD=X"] = history(np.full(n, 1.35))
+    matrix_path["BBB"] = history(bbb)
+
+    # AAA splits 2:1 on the last day – Yahoo's split-adjusted closes are halved throughout
+    matrix_path["AAA"] = history(aaa[:-1])
+    warehouse.update_warehouse(["AAA", "BBB", "USDCAD=X"], DAYS[-2].date())
+    returns_matrix.update_returns_matrix(["AAA", "BBB", "USDCAD=X"], DAYS[-2].date())
+    splits = np.zeros(n)
+    splits[-1] = 2.0
+    matrix_path["AAA"] = history(aaa / 2, splits=splits)
+    warehouse.update_warehouse(["AAA", "BBB", "USDCAD=X"], DAYS[-1].date())
+    returns_matrix.update_returns_matrix(["AAA", "BBB", "USDCAD=X"], DAYS[-1].date())
+
+    exposures = {"AAA": {"value": 6000.0, "currency": "CAD"}, "BBB": {"value": 4000.0, "currency": "CAD"}}
+    risk = compute_risk(exposures, confidence=0.95)
+
+    expected = np.column_stack([aaa[1:] / aaa[:-1] - 1, bbb[1:] / bbb[:-1] - 1]) @ np.array([0.6, 0.4])
+    assert risk["observations"] == n - 1
+    assert risk["missing_symbols"] == []
+    assert risk["historical"]["var"] == pytest.approx(-np.quantile(expected, 0.05))
+    assert risk["historical"]["var"] < 0.05
+    assert risk["end_date"] == str(DAYS[-1].date())
+    assert pd.Timestamp(risk["start_date"]) == DAYS[1]
@@ -0,0 +1,23 @@
+import numpy as np
+
+from app.utils.xirr import xirr_batch
+
+
+def test_single_period_rates():
+    # -100 now, +110 in a year → 10 %; -1000 now, +1210 in two years → 10 %; -100, +50 in a year → -50 %
+    amounts = np.array([[-100.0, 110.0], [-1000.0, 1210.0], [-100.0, 50.0]])
+    years = np.array([[0.0, 1.0], [0.0, 2.0], [0.0, 1.0]])
+    np.testing.assert_allclose(xirr_batch(amounts, years), [0.10, 0.10, -0.50], atol=1e-9)
+
+
+def test_padding_and_intermediate_flows():
+    # -100 at 0, -100 at 1, +231 at 2: 100·1.1² + 100·1.1 = 231 → 10 %; second row padded with zeros
+    amounts = np.array([[-100.0, -100.0, 231.0], [-100.0, 121.0, 0.0]])
+    years = np.array([[0.0, 1.0, 2.0], [0.0, 2.0, 0.0]])
+    np.testing.assert_allclose(xirr_batch(amounts, years), [0.10, 0.10], atol=1e-9)
+
+
+def test_no_sign_change_is_nan():
+    amounts = np.array([[-100.0, -10.0], [100.0, 10.0]])
+    years = np.array([[0.0, 1.0], [0.0, 1.0]])
+    assert np.isnan(xirr_batch(amounts, years)).all()